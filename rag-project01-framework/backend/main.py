@@ -1,23 +1,49 @@
 import os
 import json
+import asyncio
+import hashlib
+import io
+import shutil
+import threading
+import uuid
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from services.loading_service import LoadingService
 from services.chunking_service import ChunkingService
-from services.embedding_service import EmbeddingService, EmbeddingConfig
+from services.embedding_service import EmbeddingService, EmbeddingConfig, EmbeddingFactory, get_model_registry
+from services.embedding_cache import get_embedding_cache
+from services.ocr_service import get_ocr_cache
 from services.vector_store_service import VectorStoreService, VectorDBConfig
-from services.search_service import SearchService
+from services.search_service import SearchService, load_query_embedding_cache, save_query_embedding_cache
 from services.parsing_service import ParsingService
+from services.milvus_manager import get_milvus_manager
+from services.lexical_index_service import LexicalIndexService
+from services.rerank_service import RerankService
+from services.artifact_catalog import get_artifact_catalog
+from services.job_manager import get_job_manager, ProgressCallback, SUCCEEDED, FAILED
+from services.dedup_service import ChunkDeduplicator
 import logging
 from enum import Enum
-from utils.config import VectorDBProvider, MILVUS_CONFIG, CHROMA_CONFIG
+from utils.config import VectorDBProvider, MILVUS_CONFIG, CHROMA_CONFIG, NUMPY_STORE_CONFIG, SEARCH_CONFIG, UPLOAD_CONFIG, DEDUP_CONFIG
+from utils.config import EMBEDDING_RESPONSE_CONFIG
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from services.generation_service import GenerationService
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from logging.config import dictConfig
 from config.logging_config import logging_config
+from utils.embedding_storage import (
+    load_embedding_file, delete_embedding_file, get_vector_path, read_embedding_range, encode_vectors,
+    VECTOR_ENCODINGS
+)
+from utils.document_storage import (
+    save_document_file, load_document_file, read_document_header, read_document_range,
+    iter_document_chunks, iter_document_json, delete_document_file
+)
+from utils.text_utils import count_words
 
 # 最先初始化日志
 dictConfig(logging_config)
@@ -26,7 +52,7 @@ logger = logging.getLogger(__name__)
 app = FastAPI()
 
 # 确保必要的目录存在
-os.makedirs("temp", exist_ok=True)
+os.makedirs(UPLOAD_CONFIG["temp_dir"], exist_ok=True)
 os.makedirs("01-chunked-docs", exist_ok=True)
 os.makedirs("02-embedded-docs", exist_ok=True)
 
@@ -40,6 +66,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def preload_embedding_models():
+    """在后台线程中预加载常用嵌入模型，不阻塞服务启动"""
+    threading.Thread(target=EmbeddingFactory.preload_models, name="embedding-preload", daemon=True).start()
+    load_query_embedding_cache()
+
+@app.on_event("startup")
+async def reconcile_artifact_catalog():
+    """启动时将产物目录与磁盘文件对账，只解析新增或变化的文件"""
+    get_artifact_catalog().reconcile()
+
+@app.on_event("startup")
+async def start_job_manager():
+    """启动时创建任务管理器，上次未完成的任务立即标记为失败"""
+    get_job_manager()
+
+@app.on_event("shutdown")
+async def persist_caches():
+    """服务关闭时保存查询向量缓存"""
+    save_query_embedding_cache()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    """服务关闭时停止后台任务线程池，未完成的任务下次启动时标记为失败"""
+    get_job_manager().shutdown()
+
 @app.post("/process")
 async def process_file(
     file: UploadFile = File(...),
@@ -49,37 +101,36 @@ async def process_file(
 ):
     try:
         # 保存上传的文件
-        temp_path = os.path.join("temp", file.filename)
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        temp_path, file_size, file_sha256 = await _save_upload(file)
         
         # 准备元数据
         metadata = {
             "filename": file.filename,
             "loading_method": loading_method,
-            "original_file_size": len(content),
+            "original_file_size": file_size,
+            "file_sha256": file_sha256,
             "processing_date": datetime.now().isoformat(),
             "chunking_method": chunking_option,
         }
         
-        loading_service = LoadingService()
-        raw_text = loading_service.load_pdf(temp_path, loading_method)
-        metadata["total_pages"] = loading_service.get_total_pages()
-        
-        page_map = loading_service.get_page_map()
-        
-        chunking_service = ChunkingService()
-        chunks = chunking_service.chunk_text(
-            raw_text, 
-            chunking_option, 
-            metadata,
-            page_map=page_map,
-            chunk_size=chunk_size
-        )
-        
-        # 清理临时文件
-        os.remove(temp_path)
+        try:
+            loading_service = LoadingService()
+            raw_text = loading_service.load_pdf(temp_path, loading_method)
+            metadata["total_pages"] = loading_service.get_total_pages()
+            
+            page_map = loading_service.get_page_map()
+            
+            chunking_service = ChunkingService()
+            chunks = chunking_service.chunk_text(
+                raw_text, 
+                chunking_option, 
+                {"chunk_size": chunk_size},
+                metadata,
+                page_map=page_map
+            )
+        finally:
+            # 清理临时文件
+            _remove_upload(temp_path)
         
         return {"chunks": chunks}
     except Exception as e:
@@ -107,8 +158,14 @@ async def save_chunks(data: dict):
             "chunks": chunks
         }
         
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(document_data, f, ensure_ascii=False, indent=2)
+        header = save_document_file(filepath, document_data, chunks)
+        get_artifact_catalog().upsert("chunked", filepath, header=header)
+        
+        # 为保存的文档建立词法检索索引
+        ChunkingService().build_lexical_index(filename, {
+            "filename": metadata.get("filename", doc_name),
+            "chunks": chunks
+        })
         
         return {
             "status": "success",
@@ -125,107 +182,163 @@ async def save_chunks(data: dict):
 @app.get("/list-docs")
 async def list_documents():
     try:
-        docs = []
-        docs_dir = "01-chunked-docs"
-        for filename in os.listdir(docs_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(docs_dir, filename)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    doc_data = json.load(f)
-                    docs.append({
-                        "id": filename,
-                        "name": doc_data["document_name"]
-                    })
+        docs = [
+            {
+                "id": entry["name"],
+                "name": entry["header"].get("document_name") or entry["header"].get("filename") or entry["name"]
+            }
+            for entry in get_artifact_catalog().list("chunked")
+        ]
         return {"documents": docs}
     except Exception as e:
         logger.error(f"Error listing documents: {str(e)}")
         raise
 
-@app.post("/embed")
-async def embed_document(data: dict = Body(...)):
-    try:
-        doc_id = data.get("documentId")
-        provider = data.get("provider")
-        model = data.get("model")
-        
-        if not all([doc_id, provider, model]):
-            raise HTTPException(status_code=400, detail="Missing required parameters")
-            
-        # 直接使用完整文件名查找
-        loaded_path = os.path.join("01-loaded-docs", doc_id)
-        chunked_path = os.path.join("01-chunked-docs", doc_id)
-        
-        doc_path = None
-        if os.path.exists(loaded_path):
-            doc_path = loaded_path
-        elif os.path.exists(chunked_path):
-            doc_path = chunked_path
-            
-        if not doc_path:
-            raise HTTPException(status_code=404, detail=f"Document not found: {doc_id}")
-            
-        with open(doc_path, 'r', encoding='utf-8') as f:
-            doc_data = json.load(f)
-        
-        # 创建 EmbeddingConfig 和 EmbeddingService
-        config = EmbeddingConfig(provider=provider, model_name=model)
-        embedding_service = EmbeddingService()
-        
-        # 准备输入数据
-        input_data = {
-            "chunks": doc_data["chunks"],
-            "metadata": {
-                "filename": doc_data["filename"],
-                "total_chunks": doc_data["total_chunks"],
-                "total_pages": doc_data["total_pages"],
-                "loading_method": doc_data["loading_method"],
-                "chunking_method": doc_data["chunking_method"]
-            }
-        }
-        
-        # 创建嵌入 - 只接收两个返回值
-        embeddings, _ = embedding_service.create_embeddings(input_data, config)
+def _resolve_embed_source(data: dict) -> str:
+    """校验嵌入参数并返回源文档路径"""
+    doc_id = data.get("documentId")
+    provider = data.get("provider")
+    model = data.get("model")
+    
+    if not all([doc_id, provider, model]):
+        raise HTTPException(status_code=400, detail="Missing required parameters")
         
-        # 保存嵌入结果
-        output_path = embedding_service.save_embeddings(doc_id, embeddings)
+    # 直接使用完整文件名查找
+    loaded_path = os.path.join("01-loaded-docs", doc_id)
+    chunked_path = os.path.join("01-chunked-docs", doc_id)
+    
+    if os.path.exists(loaded_path):
+        return loaded_path
+    if os.path.exists(chunked_path):
+        return chunked_path
+    raise HTTPException(status_code=404, detail=f"Document not found: {doc_id}")
+
+def _run_embed(doc_path: str, data: dict, progress: ProgressCallback = None) -> Dict[str, Any]:
+    """
+    创建并保存文档的嵌入向量（在工作线程中执行）
+    
+    参数:
+        doc_path: 源文档路径
+        data: /embed 请求参数
+        progress: 可选的进度回调
         
-        return {
-            "status": "success",
-            "message": "Embeddings created successfully",
-            "filepath": output_path,
-            "embeddings": embeddings  # 添加embeddings到响应中
+    返回:
+        /embed 的响应数据
+    """
+    doc_id = data["documentId"]
+    doc_data = load_document_file(doc_path)
+    
+    # 创建 EmbeddingConfig 和 EmbeddingService（batchSize/maxWorkers 可选，默认取 EMBEDDING_CONFIG）
+    config = EmbeddingConfig(
+        provider=data["provider"],
+        model_name=data["model"],
+        batch_size=data.get("batchSize"),
+        max_workers=data.get("maxWorkers")
+    )
+    embedding_service = EmbeddingService()
+    
+    # 合并近似重复的块（页眉、免责声明等），只为每组中的第一个块计算嵌入
+    chunks = doc_data["chunks"]
+    dedup_stats = None
+    duplicate_chunk_ids = None
+    if data.get("dedup", DEDUP_CONFIG["enabled"]):
+        chunks, dedup_stats = ChunkDeduplicator().deduplicate(chunks)
+        duplicate_chunk_ids = ChunkDeduplicator.duplicate_chunk_ids(chunks)
+    
+    # 准备输入数据
+    input_data = {
+        "chunks": chunks,
+        "metadata": {
+            "filename": doc_data["filename"],
+            "total_chunks": doc_data["total_chunks"],
+            "total_pages": doc_data["total_pages"],
+            "loading_method": doc_data["loading_method"],
+            "chunking_method": doc_data["chunking_method"]
         }
+    }
+    
+    # 创建嵌入，第二个返回值为缓存命中统计
+    if progress:
+        progress(0.05, f"Embedding {len(input_data['chunks'])} chunks")
+    # 批次进度映射到 0.05 ~ 0.9 区间
+    batch_progress = None
+    if progress:
+        def batch_progress(done: int, total: int) -> None:
+            progress(0.05 + 0.85 * done / max(total, 1), f"Embedded {done}/{total} chunks")
+    embeddings, cache_stats = embedding_service.create_embeddings(input_data, config, batch_progress)
+    
+    # 保存嵌入结果
+    if progress:
+        progress(0.9, "Saving embeddings")
+    output_path = embedding_service.save_embeddings(doc_id, embeddings, duplicate_chunk_ids)
+    
+    return {
+        "status": "success",
+        "message": "Embeddings created successfully",
+        "filepath": output_path,
+        "cache_stats": cache_stats,
+        "dedup_stats": dedup_stats,
+        "total_embeddings": len(embeddings)
+    }
+
+@app.post("/embed")
+async def embed_document(data: dict = Body(...)):
+    try:
+        doc_path = _resolve_embed_source(data)
+        vector_encoding = data.get("vectorEncoding") or EMBEDDING_RESPONSE_CONFIG["vector_encoding"]
+        if vector_encoding not in VECTOR_ENCODINGS:
+            raise HTTPException(status_code=400, detail=f"Unsupported vector encoding: {vector_encoding}")
+        # 模型推理在工作线程中执行，不阻塞事件循环
+        result = await asyncio.to_thread(_run_embed, doc_path, data)
+        # 响应中只带第一页摘要，默认不含向量，其余页通过 /embedded-docs 读取
+        page = await asyncio.to_thread(
+            _embedded_doc_page,
+            result["filepath"],
+            int(data.get("offset") or 0),
+            data.get("limit"),
+            vector_encoding
+        )
+        return {**result, **page}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating embeddings: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/embedding-cache/stats")
+async def get_embedding_cache_stats():
+    """获取嵌入缓存的累计统计信息"""
+    cache = get_embedding_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/ocr-cache/stats")
+async def get_ocr_cache_stats():
+    """获取 OCR 缓存的累计统计信息"""
+    cache = get_ocr_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/embedding-models/loaded")
+async def get_loaded_embedding_models():
+    """获取当前已加载到内存中的嵌入模型"""
+    return {"models": get_model_registry().stats()}
+
 @app.get("/list-embedded")
 async def list_embedded_docs():
     """获取所有已嵌入的文件列表"""
     try:
-        embedded_dir = "02-embedded-docs"
-        logger.info(f"Scanning directory: {embedded_dir}")
+        documents = [
+            {
+                "name": entry["name"],
+                "metadata": entry["header"].get("metadata", {})
+            }
+            for entry in get_artifact_catalog().list("embedded")
+        ]
         
-        if not os.path.exists(embedded_dir):
-            logger.warning(f"Directory not found: {embedded_dir}")
-            return {"documents": []}
-            
-        documents = []
-        for filename in os.listdir(embedded_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(embedded_dir, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        documents.append({
-                            "name": filename,
-                            "metadata": data.get("metadata", {})
-                        })
-                except Exception as e:
-                    logger.error(f"Error reading {filename}: {str(e)}")
-                    continue
-                    
         logger.info(f"Total documents found: {len(documents)}")
         return {"documents": documents}
         
@@ -236,53 +349,87 @@ async def list_embedded_docs():
             detail=str(e)
         )
 
+def _resolve_index_file(data: dict) -> str:
+    """校验索引参数并返回嵌入文件路径"""
+    # 提取并验证参数
+    file_id = data.get("fileId")
+    vector_db = data.get("vectorDb") 
+    index_mode = data.get("indexMode")
+    
+    missing_fields = []
+    if not file_id:
+        missing_fields.append("fileId")
+    if not vector_db:
+        missing_fields.append("vectorDb") 
+    if not index_mode:
+        missing_fields.append("indexMode")
+        
+    if missing_fields:
+        error_msg = f"缺少必要参数: {', '.join(missing_fields)}"
+        logger.error(error_msg)
+        raise HTTPException(
+            status_code=400,
+            detail=error_msg,
+            headers={"X-Error-Type": "missing_parameters"}
+        )
+        
+    # 检查文件是否存在
+    embedding_file = os.path.join("02-embedded-docs", file_id)
+    if not os.path.exists(embedding_file):
+        error_msg = f"嵌入文件不存在: {file_id}"
+        logger.error(error_msg)
+        raise HTTPException(
+            status_code=404,
+            detail=error_msg,
+            headers={"X-Error-Type": "file_not_found"}
+        )
+    return embedding_file
+
+def _run_index(embedding_file: str, data: dict, progress: ProgressCallback = None) -> Dict[str, Any]:
+    """
+    将嵌入文件写入向量数据库（在工作线程中执行）
+    
+    参数:
+        embedding_file: 嵌入文件路径
+        data: /index 请求参数
+        progress: 可选的进度回调
+        
+    返回:
+        索引结果
+    """
+    vector_db = data["vectorDb"]
+    logger.info(f"开始索引文件: {data['fileId']}")
+    provider_configs = {
+        VectorDBProvider.MILVUS: MILVUS_CONFIG,
+        VectorDBProvider.CHROMA: CHROMA_CONFIG,
+        VectorDBProvider.NUMPY: NUMPY_STORE_CONFIG
+    }
+    config = VectorDBConfig(
+        provider=vector_db,
+        index_mode=data["indexMode"],
+        **provider_configs.get(vector_db, CHROMA_CONFIG)
+    )
+    if data.get("vectorDtype"):
+        config.vector_dtype = data["vectorDtype"]
+    if data.get("batchSize"):
+        config.insert_batch_size = int(data["batchSize"])
+    # 增量模式：更新同名集合，只写入变化的块
+    config.incremental = bool(data.get("incremental", False))
+    
+    progress_callback = None
+    if progress:
+        progress_callback = lambda done, total: progress(done / total if total else None, f"{done}/{total or '?'} vectors")
+    result = VectorStoreService().index_embeddings(embedding_file, config, progress_callback)
+    
+    logger.info(f"索引成功: {data['fileId']} -> 集合: {result.get('collection_name')}")
+    return result
+
 @app.post("/index")
 async def index_embeddings(data: dict = Body(...)):
     try:
-        # 提取并验证参数
-        file_id = data.get("fileId")
-        vector_db = data.get("vectorDb") 
-        index_mode = data.get("indexMode")
-        
-        missing_fields = []
-        if not file_id:
-            missing_fields.append("fileId")
-        if not vector_db:
-            missing_fields.append("vectorDb") 
-        if not index_mode:
-            missing_fields.append("indexMode")
-            
-        if missing_fields:
-            error_msg = f"缺少必要参数: {', '.join(missing_fields)}"
-            logger.error(error_msg)
-            raise HTTPException(
-                status_code=400,
-                detail=error_msg,
-                headers={"X-Error-Type": "missing_parameters"}
-            )
-            
-        # 检查文件是否存在
-        embedding_file = os.path.join("02-embedded-docs", file_id)
-        if not os.path.exists(embedding_file):
-            error_msg = f"嵌入文件不存在: {file_id}"
-            logger.error(error_msg)
-            raise HTTPException(
-                status_code=404,
-                detail=error_msg,
-                headers={"X-Error-Type": "file_not_found"}
-            )
-            
-        # 执行索引
-        logger.info(f"开始索引文件: {file_id}")
-        config = VectorDBConfig(
-            provider=vector_db,
-            index_mode=index_mode,
-            **MILVUS_CONFIG if vector_db == VectorDBProvider.MILVUS else CHROMA_CONFIG
-        )
-        result = VectorStoreService().index_embeddings(embedding_file, config)
-        
-        logger.info(f"索引成功: {file_id} -> 集合: {result.get('collection_name')}")
-        return result
+        embedding_file = _resolve_index_file(data)
+        # 索引在工作线程中执行，不阻塞事件循环
+        return await asyncio.to_thread(_run_index, embedding_file, data)
         
     except HTTPException:
         raise
@@ -331,9 +478,16 @@ async def search_endpoint(
     top_k: int = Body(3),
     threshold: float = Body(0.7),
     word_count_threshold: int = Body(20),
-    save_results: bool = Body(False)
+    save_results: bool = Body(False),
+    search_mode: str = Body("vector"),
+    provider: str = Body(VectorDBProvider.MILVUS.value),
+    rerank: bool = Body(False)
 ):
-    """执行向量搜索"""
+    """
+    执行搜索，search_mode 为 "vector"（向量检索）或 "hybrid"（向量 + BM25 混合检索）
+    
+    rerank 为 True 时多取候选并用交叉编码器重排序
+    """
     try:
         # 记录原始请求体
         logger.info(f"原始请求体: {await request.body()}")
@@ -351,7 +505,10 @@ async def search_endpoint(
             top_k=top_k,
             threshold=threshold,
             word_count_threshold=word_count_threshold,
-            save_results=save_results
+            save_results=save_results,
+            search_mode=search_mode,
+            provider=provider,
+            rerank=rerank
         )
         
         # Log the search results
@@ -365,6 +522,47 @@ async def search_endpoint(
             detail=str(e)
         )
 
+@app.post("/search/batch")
+async def search_batch_endpoint(
+    queries: List[str] = Body(...),
+    collection_id: str = Body(...),
+    top_k: int = Body(3),
+    threshold: Any = Body(0.7),
+    word_count_threshold: Any = Body(20),
+    provider: str = Body(VectorDBProvider.MILVUS.value)
+):
+    """
+    批量向量搜索：所有查询一次嵌入、一次多向量搜索
+    
+    threshold 和 word_count_threshold 可以是单个值，也可以是与 queries 等长的列表
+    """
+    try:
+        if not queries:
+            raise ValueError("queries 不能为空")
+        search_service = SearchService()
+        return await search_service.search_batch(
+            queries=queries,
+            collection_id=collection_id,
+            top_k=top_k,
+            threshold=threshold,
+            word_count_threshold=word_count_threshold,
+            provider=provider
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error performing batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/search/cache-stats")
+async def get_search_cache_stats():
+    """获取查询向量缓存、重排序打分缓存的命中统计和 Milvus 连接状态"""
+    return {
+        **SearchService().get_query_cache_stats(),
+        "rerank": RerankService.get_cache_stats(),
+        "milvus": get_milvus_manager().stats()
+    }
+
 @app.get("/collections/{provider}")
 async def get_provider_collections(provider: str):
     """Get collections for a specific vector database provider"""
@@ -418,42 +616,33 @@ async def get_documents(type: str = Query("all")):
     try:
         documents = []
         
+        catalog = get_artifact_catalog()
+        
         # 读取loaded文档
         if type in ["all", "loaded"]:
-            loaded_dir = "01-loaded-docs"
-            if os.path.exists(loaded_dir):
-                for filename in os.listdir(loaded_dir):
-                    if filename.endswith('.json'):
-                        file_path = os.path.join(loaded_dir, filename)
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            doc_data = json.load(f)
-                            documents.append({
-                                "id": filename,
-                                "name": filename,
-                                "type": "loaded",
-                                "metadata": {
-                                    "total_pages": doc_data.get("total_pages"),
-                                    "total_chunks": doc_data.get("total_chunks"),
-                                    "loading_method": doc_data.get("loading_method"),
-                                    "chunking_method": doc_data.get("chunking_method"),
-                                    "timestamp": doc_data.get("timestamp")
-                                }
-                            })
+            for entry in catalog.list("loaded"):
+                header = entry["header"]
+                documents.append({
+                    "id": entry["name"],
+                    "name": entry["name"],
+                    "type": "loaded",
+                    "metadata": {
+                        "total_pages": header.get("total_pages"),
+                        "total_chunks": header.get("total_chunks"),
+                        "loading_method": header.get("loading_method"),
+                        "chunking_method": header.get("chunking_method"),
+                        "timestamp": header.get("timestamp")
+                    }
+                })
 
         # 读取chunked文档
         if type in ["all", "chunked"]:
-            chunked_dir = "01-chunked-docs"
-            if os.path.exists(chunked_dir):
-                for filename in os.listdir(chunked_dir):
-                    if filename.endswith('.json'):
-                        file_path = os.path.join(chunked_dir, filename)
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            doc_data = json.load(f)
-                            documents.append({
-                                "id": filename,
-                                "name": filename,  # 保持原始文件名
-                                "type": "chunked"
-                            })
+            for entry in catalog.list("chunked"):
+                documents.append({
+                    "id": entry["name"],
+                    "name": entry["name"],  # 保持原始文件名
+                    "type": "chunked"
+                })
         
         return {"documents": documents}
     except Exception as e:
@@ -461,7 +650,14 @@ async def get_documents(type: str = Query("all")):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/documents/{doc_name}")
-async def get_document(doc_name: str, type: str = Query("loaded")):
+async def get_document(doc_name: str, type: str = Query("loaded"), offset: int = Query(0, ge=0),
+                       limit: Optional[int] = Query(None, ge=1)):
+    """
+    获取文档内容
+    
+    不提供 limit 时流式返回完整文档；提供 limit 时只读取 [offset, offset + limit) 范围的文本块，
+    分块存储的文档只解压覆盖该范围的数据块。
+    """
     try:
 
         base_name = doc_name.replace('.json', '')
@@ -477,10 +673,10 @@ async def get_document(doc_name: str, type: str = Query("loaded")):
             logger.error(f"Document not found at path: {file_path}")
             raise HTTPException(status_code=404, detail="Document not found")
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            doc_data = json.load(f)
-            
-        return doc_data
+        if limit is None:
+            return StreamingResponse(iter_document_json(file_path), media_type="application/json")
+        
+        return await asyncio.to_thread(read_document_range, file_path, offset, limit)
     except HTTPException:
         raise
     except Exception as e:
@@ -504,8 +700,11 @@ async def delete_document(doc_name: str, type: str = Query("loaded")):
             logger.error(f"Document not found at path: {file_path}")
             raise HTTPException(status_code=404, detail="Document not found")
             
-        # 删除文件
-        os.remove(file_path)
+        # 删除文件（分块存储的文档同时删除文本块数据文件）
+        delete_document_file(file_path)
+        get_artifact_catalog().remove("loaded" if type == "loaded" else "chunked", file_name)
+        if type != "loaded":
+            LexicalIndexService().delete_index(file_name)
         
         return {
             "status": "success",
@@ -517,9 +716,70 @@ async def delete_document(doc_name: str, type: str = Query("loaded")):
         logger.error(f"Error deleting document: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _embedded_doc_page(file_path: str, offset: int = 0, limit: Optional[int] = None,
+                       vector_encoding: str = "none") -> Dict[str, Any]:
+    """
+    读取嵌入文件中一页块的摘要
+    
+    参数:
+        file_path: 嵌入元数据文件路径
+        offset: 起始下标
+        limit: 每页块数，默认取 EMBEDDING_RESPONSE_CONFIG，不超过 max_page_size
+        vector_encoding: 向量编码，VECTOR_ENCODINGS 之一，none 表示不返回向量
+        
+    返回:
+        {"embeddings": [...], "total", "offset", "limit", "vector_encoding"}
+    """
+    if vector_encoding not in VECTOR_ENCODINGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported vector encoding: {vector_encoding}. Expected one of {list(VECTOR_ENCODINGS)}"
+        )
+    offset = max(0, int(offset))
+    limit = int(limit or EMBEDDING_RESPONSE_CONFIG["page_size"])
+    limit = min(max(1, limit), EMBEDDING_RESPONSE_CONFIG["max_page_size"])
+    doc_name = os.path.basename(file_path)
+    
+    # 只读取请求范围内的记录和向量
+    doc_data, total, records, vectors = read_embedding_range(file_path, offset, offset + limit)
+    encoded = None
+    if vector_encoding != "none" and records:
+        encoded = encode_vectors(vectors, vector_encoding)
+    
+    embeddings = []
+    for idx, embedding in enumerate(records, offset):
+        item = {
+            "metadata": {
+                "document_name": doc_data.get("document_name", doc_name),
+                "chunk_id": idx + 1,
+                "total_chunks": total,
+                "content": embedding["metadata"].get("content", ""),
+                "page_number": embedding["metadata"].get("page_number", ""),
+                "page_range": embedding["metadata"].get("page_range", ""),
+                "page_refs": embedding["metadata"].get("page_refs", embedding["metadata"].get("page_range", "")),
+                # "chunking_method": embedding["metadata"].get("chunking_method", ""),
+                "embedding_model": doc_data.get("embedding_model", ""),
+                "embedding_provider": doc_data.get("embedding_provider", ""),
+                "embedding_timestamp": doc_data.get("created_at", ""),
+                "vector_dimension": doc_data.get("vector_dimension", 0)
+            }
+        }
+        if encoded is not None:
+            item["embedding"] = encoded[idx - offset]
+        embeddings.append(item)
+    
+    return {
+        "embeddings": embeddings,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "vector_encoding": vector_encoding
+    }
+
 @app.get("/embedded-docs/{doc_name}")
-async def get_embedded_doc(doc_name: str):
-    """Get specific embedded document"""
+async def get_embedded_doc(doc_name: str, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1),
+                           vector_encoding: str = Query(EMBEDDING_RESPONSE_CONFIG["vector_encoding"])):
+    """Get specific embedded document, one page of chunk summaries at a time"""
     try:
         logger.info(f"Attempting to read document: {doc_name}")
         file_path = os.path.join("02-embedded-docs", doc_name)
@@ -531,37 +791,51 @@ async def get_embedded_doc(doc_name: str):
                 detail=f"Document {doc_name} not found"
             )
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            doc_data = json.load(f)
-            logger.info(f"Successfully read document: {doc_name}")
-            
-            return {
-                "embeddings": [
-                    {
-                        "embedding": embedding["embedding"],
-                        "metadata": {
-                            "document_name": doc_data.get("document_name", doc_name),
-                            "chunk_id": idx + 1,
-                            "total_chunks": len(doc_data["embeddings"]),
-                            "content": embedding["metadata"].get("content", ""),
-                            "page_number": embedding["metadata"].get("page_number", ""),
-                            "page_range": embedding["metadata"].get("page_range", ""),
-                            # "chunking_method": embedding["metadata"].get("chunking_method", ""),
-                            "embedding_model": doc_data.get("embedding_model", ""),
-                            "embedding_provider": doc_data.get("embedding_provider", ""),
-                            "embedding_timestamp": doc_data.get("created_at", ""),
-                            "vector_dimension": doc_data.get("vector_dimension", 0)
-                        }
-                    }
-                    for idx, embedding in enumerate(doc_data["embeddings"])
-                ]
-            }
+        page = await asyncio.to_thread(_embedded_doc_page, file_path, offset, limit, vector_encoding)
+        logger.info(f"Successfully read document: {doc_name}")
+        return page
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting embedded document {doc_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/embedded-docs/{doc_name}/vectors")
+async def download_embedded_vectors(doc_name: str, dtype: str = Query("float32")):
+    """
+    以 .npy 二进制格式下载嵌入文件的完整向量矩阵，第 i 行对应第 i 个块
+    
+    float32 且已是 npy 存储的文件直接返回磁盘上的矩阵文件。
+    """
+    try:
+        if dtype not in ("float32", "float16"):
+            raise HTTPException(status_code=400, detail=f"Unsupported dtype: {dtype}")
+        file_path = os.path.join("02-embedded-docs", doc_name)
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail=f"Document {doc_name} not found")
+        
+        download_name = f"{os.path.splitext(doc_name)[0]}_{dtype}.npy"
+        vector_path = get_vector_path(file_path)
+        if dtype == "float32" and os.path.exists(vector_path):
+            return FileResponse(vector_path, media_type="application/octet-stream", filename=download_name)
+        
+        def encode() -> bytes:
+            _, vectors = load_embedding_file(file_path)
+            buffer = io.BytesIO()
+            np.save(buffer, np.asarray(vectors, dtype=dtype))
+            return buffer.getvalue()
+        
+        return Response(
+            content=await asyncio.to_thread(encode),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{download_name}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error downloading vectors for {doc_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/embedded-docs/{doc_name}")
 async def delete_embedded_doc(doc_name: str):
     """Delete specific embedded document"""
@@ -573,7 +847,8 @@ async def delete_embedded_doc(doc_name: str):
                 detail=f"Document {doc_name} not found"
             )
             
-        os.remove(file_path)
+        delete_embedding_file(file_path)
+        get_artifact_catalog().remove("embedded", doc_name)
         return {"message": f"Document {doc_name} deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting embedded document {doc_name}: {str(e)}")
@@ -590,8 +865,8 @@ async def parse_file(
     解析上传的文件，支持多种文件类型和解析选项
     """
     try:
-        # 读取文件内容
-        content = await file.read()
+        # 保存上传的文件，解析器直接从文件读取
+        temp_path, file_size, file_sha256 = await _save_upload(file)
         
         # 创建解析服务实例
         parsing_service = ParsingService()
@@ -601,16 +876,22 @@ async def parse_file(
             "filename": file.filename,
             "file_type": file_type,
             "loading_method": loading_method,
-            "parsing_option": parsing_option
+            "parsing_option": parsing_option,
+            "original_file_size": file_size,
+            "file_sha256": file_sha256
         }
         
-        # 解析文件
-        result = parsing_service.parse_document(
-            file_content=content,
-            file_type=file_type,
-            method=parsing_option,
-            metadata=metadata
-        )
+        # 解析文件（在工作线程中执行，不阻塞事件循环）
+        try:
+            result = await asyncio.to_thread(
+                parsing_service.parse_document,
+                file_path=temp_path,
+                file_type=file_type,
+                method=parsing_option,
+                metadata=metadata
+            )
+        finally:
+            _remove_upload(temp_path)
         
         return {"parsed_content": result}
         
@@ -618,26 +899,65 @@ async def parse_file(
         logger.error(f"Error parsing file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/load")
-async def load_file(
-    file: UploadFile = File(...),
-    loading_method: str = Form(...),
-    strategy: str = Form(None),
-    chunking_strategy: str = Form(None),
-    chunking_options: str = Form(None),
-    preprocess_options: str = Form(None),
-    quality_check: bool = Form(False)
-):
+async def _save_upload(file: UploadFile) -> Tuple[str, int, str]:
+    """
+    将上传文件按块流式写入 temp/<随机目录>/ 下，同时计算 SHA-256
+
+    随机目录避免并发上传同名文件互相覆盖；分块写入使内存占用与文件大小无关。
+
+    返回:
+        (临时文件路径, 文件字节数, SHA-256)
+    """
+    temp_dir = os.path.join(UPLOAD_CONFIG["temp_dir"], uuid.uuid4().hex)
+    os.makedirs(temp_dir, exist_ok=True)
+    temp_path = os.path.join(temp_dir, os.path.basename(file.filename))
+    digest = hashlib.sha256()
+    size = 0
     try:
-        # 保存上传的文件
-        temp_path = os.path.join("temp", file.filename)
         with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            while True:
+                block = await file.read(UPLOAD_CONFIG["chunk_size"])
+                if not block:
+                    break
+                digest.update(block)
+                buffer.write(block)
+                size += len(block)
+    except Exception:
+        _remove_upload(temp_path)
+        raise
+    logger.info(f"Upload saved: {file.filename} | {size} bytes | sha256: {digest.hexdigest()[:16]}")
+    return temp_path, size, digest.hexdigest()
+
+def _remove_upload(temp_path: str) -> None:
+    """删除 _save_upload 保存的临时文件及其目录"""
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    temp_dir = os.path.dirname(temp_path)
+    if os.path.abspath(os.path.dirname(temp_dir)) == os.path.abspath(UPLOAD_CONFIG["temp_dir"]):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def _run_load(temp_path: str, filename: str, options: dict, progress: ProgressCallback = None) -> Dict[str, Any]:
+    """
+    解析上传的PDF并保存为已加载文档（在工作线程中执行），完成后删除临时文件
+    
+    参数:
+        temp_path: 上传文件的临时路径
+        filename: 原始文件名
+        options: /load 的表单参数
+        progress: 可选的进度回调
+        
+    返回:
+        /load 的响应数据
+    """
+    try:
+        loading_method = options["loading_method"]
+        strategy = options.get("strategy")
+        chunking_strategy = options.get("chunking_strategy")
+        quality_check = options.get("quality_check", False)
         
         # 准备元数据
         metadata = {
-            "filename": file.filename,
+            "filename": filename,
             "total_chunks": 0,  # 将在后面更新
             "total_pages": 0,   # 将在后面更新
             "loading_method": loading_method,
@@ -648,15 +968,17 @@ async def load_file(
         
         # 解析预处理选项
         preprocess_options_dict = None
-        if preprocess_options:
-            preprocess_options_dict = json.loads(preprocess_options)
+        if options.get("preprocess_options"):
+            preprocess_options_dict = json.loads(options["preprocess_options"])
         
         # 解析分块选项
         chunking_options_dict = None
-        if chunking_options:
-            chunking_options_dict = json.loads(chunking_options)
+        if options.get("chunking_options"):
+            chunking_options_dict = json.loads(options["chunking_options"])
         
         # 使用 LoadingService 加载文档
+        if progress:
+            progress(0.05, f"Loading {filename} with {loading_method}")
         loading_service = LoadingService()
         raw_text = loading_service.load_pdf(
             temp_path, 
@@ -679,7 +1001,7 @@ async def load_file(
                 "chunk_id": idx,
                 "page_number": page["page"],
                 "page_range": str(page["page"]),
-                "word_count": len(page["text"].split())
+                "word_count": count_words(page["text"])
             }
             if "metadata" in page:
                 chunk_metadata.update(page["metadata"])
@@ -690,8 +1012,10 @@ async def load_file(
             })
         
         # 使用 LoadingService 保存文档
+        if progress:
+            progress(0.9, "Saving document")
         filepath = loading_service.save_document(
-            filename=file.filename,
+            filename=filename,
             chunks=chunks,
             metadata=metadata,
             loading_method=loading_method,
@@ -700,8 +1024,7 @@ async def load_file(
         )
         
         # 读取保存的文档以返回
-        with open(filepath, "r", encoding="utf-8") as f:
-            document_data = json.load(f)
+        document_data = load_document_file(filepath)
         
         # 准备返回数据
         response_data = {
@@ -713,72 +1036,227 @@ async def load_file(
         if quality_check:
             response_data["quality_metrics"] = loading_service.quality_metrics
         
-        # 清理临时文件
-        os.remove(temp_path)
-        
         return response_data
+    finally:
+        # 清理临时文件
+        _remove_upload(temp_path)
+
+@app.post("/load")
+async def load_file(
+    file: UploadFile = File(...),
+    loading_method: str = Form(...),
+    strategy: str = Form(None),
+    chunking_strategy: str = Form(None),
+    chunking_options: str = Form(None),
+    preprocess_options: str = Form(None),
+    quality_check: bool = Form(False)
+):
+    try:
+        # 保存上传的文件
+        temp_path, _, _ = await _save_upload(file)
+        options = {
+            "loading_method": loading_method,
+            "strategy": strategy,
+            "chunking_strategy": chunking_strategy,
+            "chunking_options": chunking_options,
+            "preprocess_options": preprocess_options,
+            "quality_check": quality_check
+        }
+        # PDF 解析在工作线程中执行，不阻塞事件循环
+        return await asyncio.to_thread(_run_load, temp_path, file.filename, options)
     except Exception as e:
         logger.error(f"Error loading file: {str(e)}")
         raise
 
+def _compact_job_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉结果中的文档正文和向量，任务库只保存摘要"""
+    result = dict(result)
+    loaded_content = result.pop("loaded_content", None)
+    if loaded_content is not None:
+        result["total_chunks"] = loaded_content.get("total_chunks")
+        result["total_pages"] = loaded_content.get("total_pages")
+    return result
+
+@app.post("/jobs/load")
+async def submit_load_job(
+    file: UploadFile = File(...),
+    loading_method: str = Form(...),
+    strategy: str = Form(None),
+    chunking_strategy: str = Form(None),
+    chunking_options: str = Form(None),
+    preprocess_options: str = Form(None),
+    quality_check: bool = Form(False)
+):
+    """提交后台加载任务，立即返回任务ID"""
+    temp_path, _, _ = await _save_upload(file)
+    options = {
+        "loading_method": loading_method,
+        "strategy": strategy,
+        "chunking_strategy": chunking_strategy,
+        "chunking_options": chunking_options,
+        "preprocess_options": preprocess_options,
+        "quality_check": quality_check
+    }
+    filename = file.filename
+    # 任务在关闭前未执行时由任务管理器在下次启动时删除临时目录
+    job_id = get_job_manager().submit(
+        "load",
+        lambda progress: _compact_job_result(_run_load(temp_path, filename, options, progress)),
+        {"filename": filename, **options},
+        cleanup=[os.path.dirname(temp_path)]
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/chunk")
+async def submit_chunk_job(data: dict = Body(...)):
+    """提交后台分块任务，立即返回任务ID"""
+    file_path, chunking_option, chunking_params = _resolve_chunk_request(data)
+
+    def run(progress: ProgressCallback) -> Dict[str, Any]:
+        output_path = _run_chunk(file_path, chunking_option, chunking_params, progress)
+        return {"filepath": output_path, **read_document_header(output_path)}
+
+    job_id = get_job_manager().submit("chunk", run, data)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/embed")
+async def submit_embed_job(data: dict = Body(...)):
+    """提交后台嵌入任务，立即返回任务ID"""
+    doc_path = _resolve_embed_source(data)
+    job_id = get_job_manager().submit(
+        "embed",
+        lambda progress: _compact_job_result(_run_embed(doc_path, data, progress)),
+        data
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/index")
+async def submit_index_job(data: dict = Body(...)):
+    """提交后台索引任务，立即返回任务ID"""
+    embedding_file = _resolve_index_file(data)
+    job_id = get_job_manager().submit(
+        "index",
+        lambda progress: _run_index(embedding_file, data, progress),
+        data
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs")
+async def list_jobs(stage: Optional[str] = Query(None), limit: int = Query(50, ge=1, le=500)):
+    """列出最近的后台任务"""
+    return {"jobs": get_job_manager().list(stage, limit)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询任务状态和进度"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """获取已完成任务的结果"""
+    job = get_job_manager().get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if job["status"] not in (SUCCEEDED, FAILED):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job
+
+def _resolve_chunk_request(data: dict) -> Tuple[str, str, dict]:
+    """
+    校验 /chunk 请求参数
+
+    参数:
+        data: /chunk 请求参数
+
+    返回:
+        (已加载文档路径, 分块方法, 分块参数)
+    """
+    doc_id = data.get("doc_id")
+    chunking_option = data.get("chunking_option") or data.get("chunking_method")
+    # 分块参数可以直接放在请求中，也可以放在 chunking_params 里
+    chunking_params = dict(data.get("chunking_params") or {})
+    for key in ("chunk_size", "chunk_overlap", "separators", "embedding_provider", "embedding_model"):
+        if data.get(key) is not None:
+            chunking_params[key] = data[key]
+    # by_tokens 未指定块大小时取嵌入模型的最大输入长度，不使用字符/词的默认值
+    if chunking_option != "by_tokens":
+        chunking_params.setdefault("chunk_size", 1000)
+    
+    if not doc_id or not chunking_option:
+        raise HTTPException(
+            status_code=400, 
+            detail="Missing required parameters: doc_id and chunking_option"
+        )
+    
+    file_path = os.path.join("01-loaded-docs", doc_id)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return file_path, chunking_option, chunking_params
+
+def _run_chunk(file_path: str, chunking_option: str, chunking_params: dict,
+               progress: ProgressCallback = None) -> str:
+    """
+    对已加载的文档分块并写入 01-chunked-docs（在工作线程中执行）
+    
+    参数:
+        file_path: 已加载文档路径
+        chunking_option: 分块方法
+        chunking_params: 分块参数
+        progress: 可选的进度回调
+        
+    返回:
+        分块结果文件路径
+    """
+    doc_data = read_document_header(file_path)
+        
+    # 构建页面映射，文本块逐个从文档中读取
+    page_map = [
+        {
+            'page': chunk['metadata']['page_number'],
+            'text': chunk['content']
+        }
+        for chunk in iter_document_chunks(file_path)
+    ]
+        
+    # 准备元数据
+    metadata = {
+        "filename": doc_data['filename'],
+        "loading_method": doc_data['loading_method'],
+        "total_pages": doc_data['total_pages']
+    }
+        
+    # 生成输出文件名
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    base_name = doc_data['filename'].replace('.pdf', '').split('_')[0]
+    output_filename = f"{base_name}_{chunking_option}_{timestamp}.json"
+    
+    output_path = os.path.join("01-chunked-docs", output_filename)
+    
+    # 分块结果边生成边写入文件，同时建立词法检索索引，不在内存中保留完整块列表
+    if progress:
+        progress(0.1, f"Chunking {len(page_map)} pages")
+    header = ChunkingService().chunk_to_file(
+        method=chunking_option,
+        chunking_params=chunking_params,
+        metadata=metadata,
+        page_map=page_map,
+        output_path=output_path,
+        index_name=output_filename
+    )
+    get_artifact_catalog().upsert("chunked", output_path, header=header)
+    return output_path
+
 @app.post("/chunk")
 async def chunk_document(data: dict = Body(...)):
     try:
-        doc_id = data.get("doc_id")
-        chunking_option = data.get("chunking_option")
-        chunk_size = data.get("chunk_size", 1000)
-        
-        if not doc_id or not chunking_option:
-            raise HTTPException(
-                status_code=400, 
-                detail="Missing required parameters: doc_id and chunking_option"
-            )
-        
-        # 读取已加载的文档
-        file_path = os.path.join("01-loaded-docs", doc_id)
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="Document not found")
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            doc_data = json.load(f)
-            
-        # 构建页面映射
-        page_map = [
-            {
-                'page': chunk['metadata']['page_number'],
-                'text': chunk['content']
-            }
-            for chunk in doc_data['chunks']
-        ]
-            
-        # 准备元数据
-        metadata = {
-            "filename": doc_data['filename'],
-            "loading_method": doc_data['loading_method'],
-            "total_pages": doc_data['total_pages']
-        }
-            
-        chunking_service = ChunkingService()
-        result = chunking_service.chunk_text(
-            text="",  # 不需要传递文本，因为我们使用 page_map
-            method=chunking_option,
-            metadata=metadata,
-            page_map=page_map,
-            chunk_size=chunk_size
-        )
-        
-        # 生成输出文件名
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        base_name = doc_data['filename'].replace('.pdf', '').split('_')[0]
-        output_filename = f"{base_name}_{chunking_option}_{timestamp}.json"
-        
-        output_path = os.path.join("01-chunked-docs", output_filename)
-        os.makedirs("01-chunked-docs", exist_ok=True)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        file_path, chunking_option, chunking_params = _resolve_chunk_request(data)
+        output_path = await asyncio.to_thread(_run_chunk, file_path, chunking_option, chunking_params)
         
-        return result
+        # 从写好的文件流式返回完整文档
+        return StreamingResponse(iter_document_json(output_path), media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error chunking document: {str(e)}")
@@ -789,7 +1267,8 @@ async def evaluate_search(
     file: UploadFile = File(...),
     collection_id: str = Form(...),
     top_k: int = Form(10),
-    threshold: float = Form(0.7)
+    threshold: float = Form(0.7),
+    provider: str = Form(VectorDBProvider.MILVUS.value)
 ):
     try:
         # 读取CSV文件
@@ -804,76 +1283,116 @@ async def evaluate_search(
             axis=1
         )
         
-        # 初始化SearchService
-        search_service = SearchService()
-        
-        results = []
-        total_score_hit = 0
-        total_score_find = 0
-        valid_queries = 0
-        
-        # 处理每个查询
-        for _, row in df.iterrows():
-            # 跳过没有标签的行
-            if pd.isna(row['LABEL']) or row['LABEL'] == '[]':
-                continue
-                
+        # 解析标签页码列表，跳过没有标签的行
+        def parse_label(label) -> Optional[List[int]]:
+            if pd.isna(label) or label == '[]':
+                return None
+            label_str = str(label).strip('[]').replace(' ', '')
             try:
-                # 解析标签页码列表
-                label_str = str(row['LABEL']).strip('[]').replace(' ', '')
-                if label_str:
-                    expected_pages = [int(x.strip()) for x in label_str.split(',') if x.strip()]
-                else:
-                    continue
-                
-                # 执行搜索
-                search_results = await search_service.search(
-                    query=row['combined_text'],
-                    collection_id=collection_id,
-                    top_k=top_k,
-                    threshold=threshold
-                )
-                
-                # 提取找到的页码
-                found_pages = [int(result['metadata']['page']) for result in search_results]
-                
-                # 计算分数
-                hits = sum(1 for page in found_pages if page in expected_pages)
-                score_hit = hits / len(found_pages) if found_pages else 0
-                score_find = len(set(found_pages) & set(expected_pages)) / len(expected_pages)
-                
-                # 添加到结果列表，包括所有top_k结果的文本
-                result_entry = {
-                    "query": row['combined_text'],
-                    "expected_pages": expected_pages,
-                    "found_pages": found_pages,
-                    "score_hit": score_hit,
-                    "score_find": score_find
-                }
-                
-                # 添加每个top_k结果的文本作为单独的字段
-                for i, result in enumerate(search_results, 1):
-                    result_entry[f"text_{i}"] = result['text']
-                    result_entry[f"page_{i}"] = result['metadata']['page']
-                    result_entry[f"score_{i}"] = result['score']
-                
-                results.append(result_entry)
-                
-                total_score_hit += score_hit
-                total_score_find += score_find
-                valid_queries += 1
-                
-            except Exception as e:
-                logger.warning(f"Error processing row: {str(e)}")
-                continue
-        
-        if valid_queries == 0:
+                pages = [int(x.strip()) for x in label_str.split(',') if x.strip()]
+            except ValueError:
+                logger.warning(f"Invalid label: {label}")
+                return None
+            return pages or None
+        
+        df['expected_pages'] = df['LABEL'].map(parse_label)
+        df = df[df['expected_pages'].notna()].reset_index(drop=True)
+        if df.empty:
             raise ValueError("No valid queries found in the CSV file")
         
+        # 所有问题分批执行多向量搜索，批之间并发但限制同时进行的批数
+        search_service = SearchService()
+        queries = df['combined_text'].tolist()
+        batch_size = max(1, int(SEARCH_CONFIG["evaluate_batch_size"]))
+        semaphore = asyncio.Semaphore(max(1, int(SEARCH_CONFIG["evaluate_concurrency"])))
+        
+        async def run_batch(batch_queries: List[str]) -> List[List[Dict[str, Any]]]:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    search_service.search_many,
+                    batch_queries,
+                    collection_id,
+                    top_k,
+                    threshold,
+                    provider=provider
+                )
+        
+        batch_starts = range(0, len(queries), batch_size)
+        batch_results = await asyncio.gather(
+            *[run_batch(queries[start:start + batch_size]) for start in batch_starts],
+            return_exceptions=True
+        )
+        
+        # 失败的批只记录日志，其中的问题不计入评估
+        search_results = []
+        failed_queries = 0
+        for start, batch in zip(batch_starts, batch_results):
+            size = len(queries[start:start + batch_size])
+            if isinstance(batch, BaseException):
+                logger.error(f"Evaluate batch failed: queries {start}-{start + size - 1} | {batch}")
+                search_results.extend([None] * size)
+                failed_queries += size
+            else:
+                search_results.extend(batch)
+        df['search_results'] = search_results
+        df = df[df['search_results'].notna()]
+        if df.empty:
+            raise ValueError("All search batches failed")
+        
+        # 展开为 (查询, 排名) 一行的结果表，在整张表上向量化计算指标
+        hits_df = df[['search_results']].explode('search_results').dropna(subset=['search_results'])
+        hits_df['rank'] = hits_df.groupby(level=0).cumcount() + 1
+        hits_df['score'] = hits_df['search_results'].map(lambda r: r['score'])
+        hits_df['text'] = hits_df['search_results'].map(lambda r: r['text'])
+        hits_df['page_label'] = hits_df['search_results'].map(lambda r: r['metadata'].get('page'))
+        
+        # 页码不是单个整数（如 "1-2" 或空值）的结果仍然输出，但不参与指标计算
+        hits_df['page'] = pd.to_numeric(hits_df['page_label'], errors='coerce')
+        invalid_pages = hits_df['page'].isna() | (hits_df['page'] % 1 != 0)
+        if invalid_pages.any():
+            logger.warning(
+                f"Ignored {int(invalid_pages.sum())} search results with non-integer page labels: "
+                f"{hits_df.loc[invalid_pages, 'page_label'].unique().tolist()[:10]}"
+            )
+        scored_df = hits_df[~invalid_pages].copy()
+        scored_df['page'] = scored_df['page'].astype(int)
+        
+        expected_df = df[['expected_pages']].explode('expected_pages')
+        expected_pairs = pd.MultiIndex.from_arrays([expected_df.index, expected_df['expected_pages'].astype(int)])
+        scored_df['is_hit'] = pd.MultiIndex.from_arrays([scored_df.index, scored_df['page']]).isin(expected_pairs)
+        
+        hit_counts = scored_df.groupby(level=0)['is_hit'].sum()
+        found_counts = scored_df.groupby(level=0).size()
+        distinct_found = scored_df[scored_df['is_hit']].groupby(level=0)['page'].nunique()
+        expected_counts = df['expected_pages'].map(lambda pages: len(set(pages)))
+        
+        df['found_pages'] = scored_df.groupby(level=0)['page'].agg(list).reindex(df.index)
+        df['found_pages'] = df['found_pages'].map(lambda pages: pages if isinstance(pages, list) else [])
+        df['score_hit'] = (hit_counts / found_counts).reindex(df.index).fillna(0.0)
+        df['score_find'] = (distinct_found.reindex(df.index).fillna(0) / expected_counts).astype(float)
+        
+        # 每个top_k结果的文本、页码和分数作为单独的列
+        wide_df = hits_df.set_index('rank', append=True)[['text', 'page_label', 'score']].unstack('rank')
+        wide_df = wide_df.sort_index(axis=1, level='rank', sort_remaining=False)
+        wide_df.columns = [f"{field.replace('_label', '')}_{rank}" for field, rank in wide_df.columns]
+        
+        results_df = df[['combined_text', 'expected_pages', 'found_pages', 'score_hit', 'score_find']] \
+            .rename(columns={'combined_text': 'query'}).join(wide_df)
+        results = [
+            {key: value for key, value in row.items() if not (np.isscalar(value) and pd.isna(value))}
+            for row in results_df.to_dict(orient='records')
+        ]
+        for row in results:
+            for key, value in row.items():
+                if isinstance(value, np.generic):
+                    row[key] = value.item()
+        
+        valid_queries = len(results_df)
+        
         # 计算平均分数
         average_scores = {
-            "score_hit": total_score_hit / valid_queries,
-            "score_find": total_score_find / valid_queries
+            "score_hit": float(results_df['score_hit'].mean()),
+            "score_find": float(results_df['score_find'].mean())
         }
         
         # 保存结果
@@ -888,8 +1407,10 @@ async def evaluate_search(
             "results": results,
             "average_scores": average_scores,
             "total_queries": valid_queries,
+            "failed_queries": failed_queries,
             "parameters": {
                 "collection_id": collection_id,
+                "provider": provider,
                 "top_k": top_k,
                 "threshold": threshold
             }
@@ -899,8 +1420,6 @@ async def evaluate_search(
             json.dump(evaluation_results, f, indent=2)
             
         # 保存CSV格式的结果，每个top_k结果单独一列
-        results_df = pd.DataFrame(results)
-        
         # 重新排列列的顺序，使其更有逻辑性
         column_order = ['query', 'expected_pages', 'found_pages', 'score_hit', 'score_find']
         for i in range(1, top_k + 1):
@@ -958,10 +1477,14 @@ async def generate_response(
     provider: str = Body(...),
     model_name: str = Body(...),
     search_results: List[Dict] = Body(...),
-    api_key: Optional[str] = Body(None)
+    api_key: Optional[str] = Body(None),
+    rerank: bool = Body(False),
+    top_k: Optional[int] = Body(None)
 ):
-    """生成回答"""
+    """生成回答，rerank 为 True 时先用交叉编码器对检索结果重排序并保留前 top_k 个"""
     try:
+        if rerank and search_results:
+            search_results = RerankService().rerank(query, search_results, top_k or len(search_results))
         generation_service = GenerationService()
         result = generation_service.generate(
             provider=provider,
@@ -979,24 +1502,15 @@ async def generate_response(
 async def list_search_results():
     """获取所有搜索结果文件列表"""
     try:
-        search_results_dir = "04-search-results"
-        if not os.path.exists(search_results_dir):
-            return {"files": []}
-            
-        files = []
-        for filename in os.listdir(search_results_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(search_results_dir, filename)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    files.append({
-                        "id": filename,
-                        "name": f"Search: {data.get('query', 'Unknown')} ({filename})",
-                        "timestamp": data.get('timestamp', '')
-                    })
-                    
-        # 按时间戳排序，最新的在前面
-        files.sort(key=lambda x: x['timestamp'], reverse=True)
+        # 产物目录已按时间戳降序排列，最新的在前面
+        files = [
+            {
+                "id": entry["name"],
+                "name": f"Search: {entry['header'].get('query', 'Unknown')} ({entry['name']})",
+                "timestamp": entry["header"].get("timestamp", "")
+            }
+            for entry in get_artifact_catalog().list("search_result")
+        ]
         return {"files": files}
         
     except Exception as e:
@@ -1027,11 +1541,8 @@ async def check_embedding_file(file_id: str):
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="文件不存在")
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 模拟验证过程
-        VectorStoreService()._load_embeddings(file_path)
+        # 模拟验证过程（向量矩阵以内存映射方式打开，不会整体读入内存）
+        data = VectorStoreService()._load_embeddings(file_path)
         
         return {
             "valid": True,
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from utils.config import ARTIFACT_CATALOG_CONFIG
+
+try:
+    import ijson  # 可选依赖：pip install ijson，用于只解析大 JSON 文件的头部字段
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# 各类产物所在目录
+ARTIFACT_DIRS = {
+    "loaded": "01-loaded-docs",
+    "chunked": "01-chunked-docs",
+    "embedded": "02-embedded-docs",
+    "search_result": "04-search-results"
+}
+
+# 体积大、列表接口用不到的顶层字段，不写入目录（blocks 为分块存储文档的数据块索引，
+# duplicate_chunk_ids 为嵌入去重时被合并块的 chunk_id 映射）
+BODY_KEYS = {"chunks", "embeddings", "results", "blocks", "duplicate_chunk_ids"}
+
+def read_artifact_header(path: str) -> Dict[str, Any]:
+    """
+    读取产物 JSON 文件中除正文以外的顶层字段
+
+    安装 ijson 时以流式方式解析，跳过 chunks/embeddings/results 等大字段。
+
+    参数:
+        path: 文件路径
+
+    返回:
+        顶层字段字典
+    """
+    if ijson is None:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {key: value for key, value in data.items() if key not in BODY_KEYS}
+
+    header = {}
+    with open(path, "rb") as f:
+        key, builder = None, None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == "" and event == "map_key":
+                key = value
+                builder = None if value in BODY_KEYS else ObjectBuilder()
+                continue
+            if builder is None or prefix == "":
+                continue
+            builder.event(event, value)
+            if prefix == key and event not in ("start_map", "start_array", "map_key"):
+                header[key] = builder.value
+                builder = None
+    return header
+
+
+class ArtifactCatalog:
+    """
+    产物元数据目录
+
+    用 SQLite 记录 01-loaded-docs、01-chunked-docs、02-embedded-docs、04-search-results
+    中每个文件的头部字段。写文件的地方同步更新目录，启动时按文件大小和修改时间做一次对账，
+    列表和查找接口只查询目录，不再逐个解析文件。
+    """
+    def __init__(self, path: str):
+        """
+        初始化产物目录
+
+        参数:
+            path: SQLite 数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "kind TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+            "source TEXT, timestamp TEXT, header TEXT NOT NULL, PRIMARY KEY (kind, name))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_source ON artifacts(kind, source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_timestamp ON artifacts(kind, timestamp)")
+        self._conn.commit()
+
+    def upsert(self, kind: str, path: str, header: Dict[str, Any] = None) -> None:
+        """
+        登记或更新一个产物文件
+
+        参数:
+            kind: 产物类型，ARTIFACT_DIRS 中的键
+            path: 文件路径
+            header: 已知的头部字段，不提供时从文件中读取
+        """
+        if header is None:
+            header = read_artifact_header(path)
+        else:
+            header = {key: value for key, value in header.items() if key not in BODY_KEYS}
+        stat = os.stat(path)
+        source = header.get("filename") or header.get("document_name") or header.get("collection_id")
+        timestamp = header.get("timestamp") or header.get("created_at")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (kind, name, size, mtime, source, timestamp, header) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, os.path.basename(path), stat.st_size, stat.st_mtime,
+                 source, timestamp, json.dumps(header, ensure_ascii=False, default=str))
+            )
+            self._conn.commit()
+
+    def remove(self, kind: str, name: str) -> None:
+        """从目录中删除一个产物"""
+        with self._lock:
+            self._conn.execute("DELETE FROM artifacts WHERE kind = ? AND name = ?", (kind, name))
+            self._conn.commit()
+
+    def list(self, kind: str) -> List[Dict[str, Any]]:
+        """
+        列出某类产物，按时间戳降序
+
+        参数:
+            kind: 产物类型
+
+        返回:
+            [{"name": 文件名, "header": 头部字段}] 列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, header FROM artifacts WHERE kind = ? ORDER BY timestamp DESC, name",
+                (kind,)
+            ).fetchall()
+        return [{"name": name, "header": json.loads(header)} for name, header in rows]
+
+    def get(self, kind: str, name: str) -> Optional[Dict[str, Any]]:
+        """获取单个产物的头部字段，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT header FROM artifacts WHERE kind = ? AND name = ?", (kind, name)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_latest(self, kind: str, source: str) -> Optional[Dict[str, Any]]:
+        """
+        按来源文档查找最新的产物
+
+        参数:
+            kind: 产物类型
+            source: 来源文档名（头部的 filename）
+
+        返回:
+            {"name": 文件名, "header": 头部字段}，找不到时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, header FROM artifacts WHERE kind = ? AND source = ? "
+                "ORDER BY timestamp DESC LIMIT 1",
+                (kind, source)
+            ).fetchone()
+        return {"name": row[0], "header": json.loads(row[1])} if row else None
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        与磁盘上的文件对账：登记新文件、更新大小或修改时间变化的文件、删除已不存在的记录
+
+        返回:
+            {"added": ..., "updated": ..., "removed": ...} 统计
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        for kind, directory in ARTIFACT_DIRS.items():
+            with self._lock:
+                known = {
+                    name: (size, mtime)
+                    for name, size, mtime in self._conn.execute(
+                        "SELECT name, size, mtime FROM artifacts WHERE kind = ?", (kind,)
+                    )
+                }
+            on_disk = set()
+            if os.path.isdir(directory):
+                for entry in os.scandir(directory):
+                    if not entry.name.endswith(".json") or not entry.is_file():
+                        continue
+                    on_disk.add(entry.name)
+                    stat = entry.stat()
+                    if known.get(entry.name) == (stat.st_size, stat.st_mtime):
+                        continue
+                    try:
+                        self.upsert(kind, entry.path)
+                        stats["updated" if entry.name in known else "added"] += 1
+                    except Exception as e:
+                        logger.error(f"Error cataloging {entry.path}: {str(e)}")
+            for name in set(known) - on_disk:
+                self.remove(kind, name)
+                stats["removed"] += 1
+        logger.info(f"Artifact catalog reconciled: {stats}")
+        return stats
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_artifact_catalog() -> ArtifactCatalog:
+    """
+    获取进程内共享的产物目录实例
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ArtifactCatalog(ARTIFACT_CATALOG_CONFIG["path"])
+        return _catalog
@@ -1,9 +1,27 @@
+import bisect
+from collections import deque
 from datetime import datetime
 import logging
+import re
+from typing import Iterable, Iterator
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.lexical_index_service import LexicalIndexService
+from services.tokenizer_service import TokenCounter, get_token_counter
+from utils.config import EMBEDDING_MODEL_REGISTRY_CONFIG
+from utils.document_storage import DocumentWriter
+from utils.text_utils import count_words
 
 logger = logging.getLogger(__name__)
 
+# 流式分块的默认切分点，按优先级排列：空白类分隔符匹配词后的空白，其余匹配词尾
+DEFAULT_SEPARATORS = ["\n\n", "\n", "。", "！", "？", ".", "!", "?", "；", ";", " "]
+
+# 流式分块的最小单元：连续的非空白字符（在中文句末标点处断开）及其后的空白
+_PIECE_PATTERN = re.compile(r"([^\s。！？；]*[。！？；]+|[^\s。！？；]+)(\s*)")
+
+# 使用流式分块引擎的方法及其长度单位
+STREAMING_METHODS = {"by_chars": "chars", "by_words": "words", "by_tokens": "tokens"}
+
 class ChunkingService:
     """
     文本分块服务，提供多种文本分块策略
@@ -15,11 +33,13 @@ class ChunkingService:
     - by_sentences: 按句子分块
     - by_chars: 按字符分块
     - by_words: 按词分块
+    - by_tokens: 按嵌入模型的 token 数分块
     - by_markdown: 按Markdown结构分块
     - by_html: 按HTML元素分块
     """
     
-    def chunk_text(self, text: str, method: str, chunking_params: dict, metadata: dict, page_map: list = None) -> dict:
+    def chunk_text(self, text: str, method: str, chunking_params: dict, metadata: dict, page_map: list = None,
+                   index_name: str = None) -> dict:
         """
         将文本按指定方法分块
         
@@ -28,6 +48,7 @@ class ChunkingService:
             method: 分块方法，支持:
                 - by_chars: 按字符分块
                 - by_words: 按词分块
+                - by_tokens: 按嵌入模型的 token 数分块，块大小不超过模型最大输入长度
                 - by_sentences: 按句子分块
                 - by_paragraphs: 按段落分块
                 - by_markdown: 按Markdown结构分块
@@ -35,6 +56,7 @@ class ChunkingService:
             chunking_params: 分块参数
             metadata: 文档元数据
             page_map: 页面映射列表
+            index_name: 分块结果的保存文件名，提供时同时为其建立词法检索索引
             
         Returns:
             包含分块结果的文档数据结构
@@ -56,7 +78,7 @@ class ChunkingService:
                         "chunk_id": len(chunks) + 1,
                         "page_number": page_data['page'],
                         "page_range": str(page_data['page']),
-                        "word_count": len(page_data['text'].split())
+                        "word_count": count_words(page_data['text'])
                     }
                     chunks.append({
                         "content": page_data['text'],
@@ -72,7 +94,7 @@ class ChunkingService:
                             "chunk_id": len(chunks) + 1,
                             "page_number": page_data['page'],
                             "page_range": str(page_data['page']),
-                            "word_count": len(chunk["text"].split())
+                            "word_count": count_words(chunk["text"])
                         }
                         chunks.append({
                             "content": chunk["text"],
@@ -89,16 +111,14 @@ class ChunkingService:
                             "chunk_id": len(chunks) + 1,
                             "page_number": page_data['page'],
                             "page_range": str(page_data['page']),
-                            "word_count": len(chunk["text"].split())
+                            "word_count": count_words(chunk["text"])
                         }
                         chunks.append({
                             "content": chunk["text"],
                             "metadata": chunk_metadata
                         })
-            elif method == "by_chars":
-                chunks = self._chunk_by_chars(text, chunking_params)
-            elif method == "by_words":
-                chunks = self._chunk_by_words(text, chunking_params)
+            elif method in STREAMING_METHODS:
+                chunks = list(self._iter_method_chunks(method, chunking_params, page_map))
             elif method == "by_markdown":
                 chunks = self._chunk_by_markdown(text, chunking_params)
             elif method == "by_html":
@@ -117,12 +137,320 @@ class ChunkingService:
                 "chunks": chunks
             }
             
+            if index_name:
+                self.build_lexical_index(index_name, document_data)
+            
             return document_data
             
         except Exception as e:
             logger.error(f"Error in chunk_text: {str(e)}")
             raise
 
+    def iter_chunks(self, page_map: Iterable[dict], unit: str = "chars", chunk_size: int = 1000,
+                    chunk_overlap: int = 200, separators: list = None,
+                    token_counter: TokenCounter = None) -> Iterator[dict]:
+        """
+        流式分块：按顺序遍历一次 page_map，逐个产生文本块
+        
+        文本被切成"词 + 其后空白"的最小单元，依次放入滑动窗口；窗口超过 chunk_size 时，
+        在窗口后半段中优先级最高的分隔符处切出一个块，并保留末尾不超过 chunk_overlap 的
+        单元作为下一块的开头。每个单元只进出窗口一次，耗时与文本长度成线性关系。
+        块可以跨页，page_number 为起始页，page_range 为 "起始页-结束页"。
+        
+        Args:
+            page_map: 页面映射，每项包含 page 和 text
+            unit: 长度单位，chars 按字符数，words 按词数（中日韩文字按字计），
+                tokens 按嵌入模型分词器的 token 数（每页分词一次，再按字符位置分配到各单元）
+            chunk_size: 每块的最大长度
+            chunk_overlap: 相邻块的重叠长度
+            separators: 切分点优先级列表，默认使用 DEFAULT_SEPARATORS
+            token_counter: unit 为 tokens 时使用的 token 计数器
+            
+        Returns:
+            产生标准格式文本块的迭代器
+        """
+        if unit not in ("chars", "words", "tokens"):
+            raise ValueError(f"Unsupported chunk unit: {unit}")
+        if unit == "tokens" and token_counter is None:
+            raise ValueError("token_counter is required for token-based chunking")
+        chunk_size = max(1, int(chunk_size))
+        chunk_overlap = min(max(0, int(chunk_overlap)), chunk_size - 1)
+        separator_rank = self._separator_ranker(separators or DEFAULT_SEPARATORS)
+        # 单元的最大字符数：每个字符至少算一个词；一个字符可能对应多个 token，留出余量
+        max_piece = chunk_size if unit != "tokens" else max(1, chunk_size // 2)
+        # 页与页之间补上的换行计入的长度
+        newline_length = 1 if unit == "chars" else 0
+        
+        # 窗口中的单元: (词, 后随空白, 页码, 长度, 分隔符优先级)
+        window = deque()
+        window_length = 0
+        chunk_id = 0
+        
+        def emit() -> dict:
+            nonlocal chunk_id
+            chunk_id += 1
+            content = "".join(word + space for word, space, _, _, _ in window).strip()
+            first_page, last_page = window[0][2], window[-1][2]
+            return {
+                "content": content,
+                "metadata": {
+                    "chunk_id": chunk_id,
+                    "page_number": first_page,
+                    "page_range": str(first_page) if first_page == last_page else f"{first_page}-{last_page}",
+                    "word_count": count_words(content)
+                }
+            }
+        
+        def cut_point() -> int:
+            # 在窗口后半段找优先级最高的分隔符，返回切分后第一块包含的单元数
+            best_rank, best_index = None, len(window)
+            half = len(window) // 2
+            for index in range(len(window) - 1, half - 1, -1):
+                rank = window[index][4]
+                if best_rank is None or rank < best_rank:
+                    best_rank, best_index = rank, index + 1
+                    if rank == 0:
+                        break
+            return best_index
+        
+        for page_data in page_map:
+            page = page_data['page']
+            text = page_data['text']
+            pieces = self._iter_pieces(text, max_piece, split_ascii=unit != "words")
+            if unit == "tokens":
+                pieces = list(pieces)
+                starts = token_counter.token_starts(text)
+                lengths = token_counter.span_counts(
+                    starts, [(start, start + len(word) + len(space)) for word, space, start in pieces]
+                )
+                if any(length > chunk_size for length in lengths):
+                    pieces, lengths = self._split_token_pieces(pieces, lengths, starts, chunk_size)
+            for index, (word, space, _) in enumerate(pieces):
+                if unit == "chars":
+                    length = len(word) + len(space)
+                elif unit == "words":
+                    length = 1 if word.isascii() else count_words(word)
+                else:
+                    length = lengths[index]
+                while window and window_length + length > chunk_size:
+                    # 切出一块，切分点之后的单元留在窗口中
+                    keep = deque()
+                    for _ in range(len(window) - cut_point()):
+                        keep.appendleft(window.pop())
+                    yield emit()
+                    # 保留重叠部分：从切分点往前取不超过 chunk_overlap 的单元
+                    overlap, overlap_length = deque(), 0
+                    while window and overlap_length + window[-1][3] <= chunk_overlap:
+                        overlap_length += window[-1][3]
+                        overlap.appendleft(window.pop())
+                    window = overlap + keep
+                    window_length = overlap_length + sum(item[3] for item in keep)
+                    # 重叠加新单元仍超长时逐个丢弃重叠单元，保证窗口总能前进
+                    while overlap and window_length + length > chunk_size:
+                        window_length -= overlap.popleft()[3]
+                        window.popleft()
+                window.append((word, space, page, length, separator_rank(word, space)))
+                window_length += length
+            
+            # 页与页之间至少保留一个换行
+            if window and not window[-1][1]:
+                word, _, item_page, length, _ = window.pop()
+                window.append((word, "\n", item_page, length + newline_length,
+                               separator_rank(word, "\n")))
+                window_length += newline_length
+        
+        if window:
+            yield emit()
+
+    def _iter_method_chunks(self, method: str, chunking_params: dict, page_map: list) -> Iterator[dict]:
+        """
+        按分块方法和参数创建流式分块迭代器
+        
+        by_tokens 使用 chunking_params 中 embedding_provider / embedding_model 对应的分词器，
+        块大小不超过模型最大输入长度（未指定时即取该长度），避免嵌入时被截断。
+        """
+        unit = STREAMING_METHODS[method]
+        chunk_size = chunking_params.get('chunk_size') or 1000
+        chunk_overlap = chunking_params.get('chunk_overlap', 200)
+        token_counter = None
+        if unit == "tokens":
+            default_model = (EMBEDDING_MODEL_REGISTRY_CONFIG["preload"] or [{}])[0]
+            token_counter = get_token_counter(
+                chunking_params.get('embedding_provider') or default_model.get("provider", "huggingface"),
+                chunking_params.get('embedding_model') or default_model.get("model", "")
+            )
+            limit = token_counter.max_content_tokens
+            chunk_size = min(chunking_params.get('chunk_size') or limit, limit)
+            chunk_overlap = chunking_params.get('chunk_overlap', chunk_size // 8)
+        return self.iter_chunks(
+            page_map,
+            unit=unit,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=chunking_params.get('separators'),
+            token_counter=token_counter
+        )
+
+    @staticmethod
+    def _iter_pieces(text: str, max_length: int = None, split_ascii: bool = True) -> Iterator[tuple]:
+        """
+        将文本切分为 (词, 后随空白, 起始位置) 单元，超过 max_length 的单元按字符硬切分
+        （split_ascii 为 False 时只切分包含非 ASCII 字符的单元，英文单词保持完整）
+        """
+        for match in _PIECE_PATTERN.finditer(text):
+            word, space = match.groups()
+            if max_length and len(word) + len(space) > max_length and (split_ascii or not word.isascii()):
+                for offset in range(0, len(word), max_length):
+                    part = word[offset:offset + max_length]
+                    yield part, space if offset + max_length >= len(word) else "", match.start() + offset
+            else:
+                yield word, space, match.start()
+
+    @staticmethod
+    def _split_token_pieces(pieces: list, lengths: list, starts: list, chunk_size: int) -> tuple:
+        """
+        按 token 边界再次切分 token 数超过 chunk_size 的单元
+
+        按字符数预切分不能限制 token 数（例如 tiktoken 对一个中文字符可能产生多个 token），
+        超长单元在每第 chunk_size 个 token 的起始位置处切开；同一字符上的多个 token 无法分开。
+
+        Returns:
+            (单元列表, token 数列表) 元组
+        """
+        split_pieces, split_lengths = [], []
+        for (word, space, start), length in zip(pieces, lengths):
+            if length <= chunk_size:
+                split_pieces.append((word, space, start))
+                split_lengths.append(length)
+                continue
+            end, word_end, position = start + len(word) + len(space), start + len(word), start
+            while bisect.bisect_left(starts, end) - bisect.bisect_left(starts, position) > chunk_size:
+                cut = starts[bisect.bisect_left(starts, position) + chunk_size]
+                if cut <= position:
+                    # 多个 token 起始于同一字符，切在下一个字符处
+                    following = bisect.bisect_right(starts, position)
+                    cut = starts[following] if following < len(starts) else end
+                if cut >= word_end:
+                    break
+                split_pieces.append((word[position - start:cut - start], "", position))
+                split_lengths.append(bisect.bisect_left(starts, cut) - bisect.bisect_left(starts, position))
+                position = cut
+            split_pieces.append((word[position - start:], space, position))
+            split_lengths.append(bisect.bisect_left(starts, end) - bisect.bisect_left(starts, position))
+        return split_pieces, split_lengths
+
+    @staticmethod
+    def _separator_ranker(separators: list):
+        """
+        生成计算单元末尾分隔符优先级的函数（数值越小越优先，没有匹配时排在最后）
+        
+        空白类分隔符在单元后的空白中查找，其余分隔符匹配词尾；单字符词尾用字典查找。
+        """
+        default = len(separators)
+        space_separators = [(rank, sep) for rank, sep in enumerate(separators) if not sep.strip()]
+        tail_chars = {}
+        tail_strings = []
+        for rank, sep in enumerate(separators):
+            if sep.strip():
+                if len(sep) == 1:
+                    tail_chars.setdefault(sep, rank)
+                else:
+                    tail_strings.append((rank, sep))
+        
+        def rank_of(word: str, space: str) -> int:
+            rank = tail_chars.get(word[-1:], default)
+            for tail_rank, sep in tail_strings:
+                if tail_rank < rank and word.endswith(sep):
+                    rank = tail_rank
+                    break
+            if space:
+                for space_rank, sep in space_separators:
+                    if space_rank >= rank:
+                        break
+                    if sep in space:
+                        rank = space_rank
+                        break
+            return rank
+        
+        return rank_of
+
+    def chunk_to_file(self, method: str, chunking_params: dict, metadata: dict, page_map: list,
+                      output_path: str, index_name: str = None) -> dict:
+        """
+        分块并将结果直接流式写入文件，不在内存中保留完整的块列表
+        
+        by_chars / by_words / by_tokens 使用流式分块引擎，其他方法先在内存中分块再写入。
+        
+        Args:
+            method: 分块方法
+            chunking_params: 分块参数
+            metadata: 文档元数据
+            page_map: 页面映射列表
+            output_path: 输出文件路径
+            index_name: 提供时同时为其建立词法检索索引
+            
+        Returns:
+            文档头部信息（不含 chunks）
+        """
+        if not page_map:
+            raise ValueError("Page map is required for chunking.")
+        
+        if method in STREAMING_METHODS:
+            chunks = self._iter_method_chunks(method, chunking_params, page_map)
+        else:
+            chunks = self.chunk_text("", method, chunking_params, metadata, page_map)["chunks"]
+        
+        header = {
+            "filename": metadata.get("filename", ""),
+            "total_pages": len(page_map),
+            "loading_method": metadata.get("loading_method", ""),
+            "chunking_method": method,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        writer = DocumentWriter(output_path)
+        try:
+            written = self._write_chunks(writer, chunks)
+            if index_name:
+                # 词法索引与写文件共用同一次遍历
+                LexicalIndexService().build_index(index_name, written, document_name=header["filename"])
+            else:
+                for _ in written:
+                    pass
+        except Exception:
+            writer.abort()
+            raise
+        header = writer.close(header)
+        
+        logger.info(f"Chunked to file: {output_path} | chunks: {header['total_chunks']}")
+        return header
+
+    @staticmethod
+    def _write_chunks(writer: DocumentWriter, chunks: Iterable[dict]) -> Iterator[dict]:
+        """
+        逐块写入文档，写入后再产生该块
+        """
+        for chunk in chunks:
+            writer.write(chunk)
+            yield chunk
+
+    def build_lexical_index(self, doc_name: str, document_data: dict) -> dict:
+        """
+        为分块文档建立 BM25 倒排索引
+        
+        Args:
+            doc_name: 分块文档文件名
+            document_data: 包含 chunks 的文档数据
+            
+        Returns:
+            索引统计信息
+        """
+        return LexicalIndexService().build_index(
+            doc_name,
+            document_data.get("chunks", []),
+            document_name=document_data.get("filename", "")
+        )
+
     def _fixed_size_chunks(self, text: str, chunk_size: int) -> list[dict]:
         """
         将文本按固定大小分块
@@ -139,6 +467,8 @@ class ChunkingService:
         current_chunk = []
         current_length = 0
         
+        # 没有空格的中文段落会被 split 成一个超长"词"，先按 chunk_size 硬切分
+        words = [word[i:i + chunk_size] for word in words for i in range(0, len(word), chunk_size)]
         for word in words:
             word_length = len(word) + (1 if current_length > 0 else 0)
             if current_length + word_length > chunk_size and current_chunk:
@@ -184,24 +514,6 @@ class ChunkingService:
         texts = splitter.split_text(text)
         return [{"text": t} for t in texts]
 
-    def _chunk_by_chars(self, text: str, params: dict) -> list[dict]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=params.get('chunk_size', 1000),
-            chunk_overlap=params.get('chunk_overlap', 200),
-            length_function=len,
-            keep_separator=params.get('keep_separator', True)
-        )
-        return self._create_chunks(splitter.split_text(text))
-
-    def _chunk_by_words(self, text: str, params: dict) -> list[dict]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=params.get('chunk_size', 1000),
-            chunk_overlap=params.get('chunk_overlap', 200),
-            length_function=lambda x: len(x.split()),
-            keep_separator=params.get('keep_separator', True)
-        )
-        return self._create_chunks(splitter.split_text(text))
-
     def _chunk_by_markdown(self, text: str, params: dict) -> list[dict]:
         from langchain.text_splitter import MarkdownTextSplitter
         splitter = MarkdownTextSplitter(
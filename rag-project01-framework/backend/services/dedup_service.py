@@ -0,0 +1,171 @@
+import logging
+import zlib
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from utils.config import DEDUP_CONFIG
+from utils.text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# MinHash 使用的哈希 (a * x + b) mod P，P 为大于 2^32 的最小素数，乘积不会超出 uint64
+_MINHASH_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+class ChunkDeduplicator:
+    """
+    基于 MinHash/LSH 的近似重复文本块检测
+
+    每个块按词项 shingle 计算 MinHash 签名，签名切成若干段做局部敏感哈希，
+    同一段落入同一桶的块才比较签名，估计 Jaccard 相似度达到阈值即视为重复。
+    重复块合并到最早出现的块上，只为它计算嵌入，并在其 metadata 中记录所有块的页码。
+    """
+    def __init__(self, num_perm: int = None, bands: int = None, threshold: float = None,
+                 shingle_size: int = None):
+        """
+        初始化去重器
+
+        参数:
+            num_perm: MinHash 签名长度
+            bands: LSH 分段数，须整除 num_perm
+            threshold: 视为重复的估计 Jaccard 相似度
+            shingle_size: shingle 包含的词项数
+        """
+        self.num_perm = num_perm or DEDUP_CONFIG["num_perm"]
+        self.bands = bands or DEDUP_CONFIG["bands"]
+        self.threshold = threshold if threshold is not None else DEDUP_CONFIG["threshold"]
+        self.shingle_size = shingle_size or DEDUP_CONFIG["shingle_size"]
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be divisible by bands ({self.bands})")
+        self.rows = self.num_perm // self.bands
+        # 固定种子，同一文本在不同进程、不同次运行中签名一致
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, int(_MAX_HASH), size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MAX_HASH), size=self.num_perm, dtype=np.uint64)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """计算文本的 shingle 哈希集合（32 位）"""
+        tokens = tokenize(text)
+        k = self.shingle_size
+        if len(tokens) <= k:
+            shingles = {"\x1f".join(tokens)} if tokens else set()
+        else:
+            shingles = {"\x1f".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+        return np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        计算文本的 MinHash 签名
+
+        参数:
+            text: 文本
+
+        返回:
+            长度为 num_perm 的 uint64 数组；空文本返回 None
+        """
+        hashes = self._shingle_hashes(text)
+        if hashes.size == 0:
+            return None
+        return ((hashes[None, :] * self._a[:, None] + self._b[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+    def find_duplicates(self, texts: List[str]) -> List[int]:
+        """
+        找出每个文本所属重复组的代表
+
+        参数:
+            texts: 文本列表
+
+        返回:
+            与 texts 等长的列表，每项为该文本所属组中最早出现的文本下标（不重复时为自身）
+        """
+        parent = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        signatures = [self.signature(text) for text in texts]
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = {}
+            start = band * self.rows
+            for i, signature in enumerate(signatures):
+                if signature is None:
+                    continue
+                key = signature[start:start + self.rows].tobytes()
+                members = buckets.setdefault(key, [])
+                # 与同桶中尚未归入同一组的每个块比较，估计相似度达到阈值则合并，以下标小者为代表
+                for member in members:
+                    root_i, root_member = find(i), find(member)
+                    if root_i != root_member and np.mean(signatures[member] == signature) >= self.threshold:
+                        parent[max(root_i, root_member)] = min(root_i, root_member)
+                members.append(i)
+        return [find(i) for i in range(len(texts))]
+
+    def deduplicate(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        合并近似重复的文本块
+
+        保留每组中最早出现的块，在其 metadata 中写入：
+            - page_refs: 组内所有块的页码范围，逗号分隔（按出现顺序去重）
+            - duplicate_count: 被合并掉的块数
+            - merged_chunk_ids: 被合并掉的块的 chunk_id，词法索引仍包含这些块，混合检索时映射回保留的块
+
+        参数:
+            chunks: 标准格式的文本块列表
+
+        返回:
+            (去重后的文本块列表, 统计信息) 元组
+        """
+        if not chunks:
+            return chunks, {"input_chunks": 0, "output_chunks": 0, "duplicates_removed": 0}
+
+        canonical = self.find_duplicates([chunk.get("content", "") for chunk in chunks])
+        members: Dict[int, List[int]] = {}
+        for i, root in enumerate(canonical):
+            members.setdefault(root, []).append(i)
+
+        deduplicated = []
+        for i, chunk in enumerate(chunks):
+            if canonical[i] != i:
+                continue
+            group = members[i]
+            metadata = dict(chunk.get("metadata") or {})
+            page_refs = dict.fromkeys(
+                str(chunks[j]["metadata"].get("page_range") or chunks[j]["metadata"].get("page_number", ""))
+                for j in group
+            )
+            metadata["page_refs"] = ",".join(ref for ref in page_refs if ref)
+            metadata["duplicate_count"] = len(group) - 1
+            metadata["merged_chunk_ids"] = [chunks[j]["metadata"].get("chunk_id") for j in group[1:]]
+            deduplicated.append({**chunk, "metadata": metadata})
+
+        stats = {
+            "input_chunks": len(chunks),
+            "output_chunks": len(deduplicated),
+            "duplicates_removed": len(chunks) - len(deduplicated)
+        }
+        logger.info(f"Chunk deduplication: {stats}")
+        return deduplicated, stats
+
+    @staticmethod
+    def duplicate_chunk_ids(chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        由去重后的文本块得到被合并块到保留块的 chunk_id 映射
+
+        参数:
+            chunks: deduplicate 返回的文本块列表
+
+        返回:
+            {被合并块的 chunk_id（字符串，便于写入 JSON）: 保留块的 chunk_id}
+        """
+        return {
+            str(merged_id): chunk["metadata"]["chunk_id"]
+            for chunk in chunks
+            for merged_id in chunk["metadata"].get("merged_chunk_ids") or []
+            if merged_id is not None
+        }
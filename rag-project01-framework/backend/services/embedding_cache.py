@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from utils.config import EMBEDDING_CACHE_CONFIG
+from utils.sqlite_cache import SQLiteLRUCache
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    内容寻址的嵌入向量缓存
+
+    以 (提供商, 模型, 文本SHA-256) 为键持久化保存 float32 向量，
+    同一段文本在不同文档、不同分块方式之间只需计算一次。
+    """
+    def __init__(self, path: str, max_bytes: int):
+        """
+        初始化嵌入缓存
+
+        参数:
+            path: SQLite 数据库文件路径
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.store = SQLiteLRUCache(path, max_bytes)
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        """根据提供商、模型和文本内容生成缓存键"""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{provider}|{model}|{digest}"
+
+    def get_many(self, provider: str, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        批量查询文本的嵌入向量
+
+        参数:
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            texts: 文本列表
+
+        返回:
+            命中的 {文本: 向量} 字典
+        """
+        keys = {self.make_key(provider, model, text): text for text in texts}
+        found = self.store.get_many(keys.keys())
+        return {
+            keys[key]: np.frombuffer(value, dtype=np.float32).tolist()
+            for key, value in found.items()
+        }
+
+    def put_many(self, provider: str, model: str, vectors: Dict[str, List[float]]) -> None:
+        """
+        批量写入文本的嵌入向量
+
+        参数:
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            vectors: {文本: 向量} 字典
+        """
+        self.store.put_many(
+            (self.make_key(provider, model, text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in vectors.items()
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """获取缓存累计统计信息"""
+        return self.store.stats()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    获取进程内共享的嵌入缓存实例，未启用时返回 None
+    """
+    global _cache
+    if not EMBEDDING_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(
+                path=EMBEDDING_CACHE_CONFIG["path"],
+                max_bytes=int(EMBEDDING_CACHE_CONFIG["max_size_mb"] * 1024 * 1024)
+            )
+            logger.info(f"Embedding cache opened: {EMBEDDING_CACHE_CONFIG['path']}")
+        return _cache
@@ -1,11 +1,20 @@
 import os
 import dotenv
 dotenv.load_dotenv()
-import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
 import boto3
+import numpy as np
 from langchain_community.embeddings import BedrockEmbeddings, OpenAIEmbeddings, HuggingFaceEmbeddings
+from utils.embedding_storage import save_embedding_file
+from utils.config import EMBEDDING_CONFIG, EMBEDDING_MODEL_REGISTRY_CONFIG
+from services.embedding_cache import get_embedding_cache
+from services.artifact_catalog import get_artifact_catalog
+from services.model_registry import EmbeddingModelRegistry
+
+logger = logging.getLogger(__name__)
 
 class EmbeddingProvider(str, Enum):
     """
@@ -19,113 +28,171 @@ class EmbeddingConfig:
     """
     嵌入配置类，用于存储嵌入模型的配置信息
     """
-    def __init__(self, provider: str, model_name: str):
+    def __init__(self, provider: str, model_name: str, batch_size: int = None, max_workers: int = None):
         """
         初始化嵌入配置
         
         参数:
             provider: 嵌入提供商名称
             model_name: 嵌入模型名称
+            batch_size: 单批处理的文本数，默认取 EMBEDDING_CONFIG 中该提供商的配置
+            max_workers: Bedrock 并发请求线程数，默认取 EMBEDDING_CONFIG 中的配置
         """
         self.provider = provider
         self.model_name = model_name
         self.aws_region = "ap-southeast-1"  # 可配置
+        self.batch_size = int(batch_size or EMBEDDING_CONFIG["batch_sizes"].get(provider, 20))
+        self.max_workers = int(max_workers or EMBEDDING_CONFIG["bedrock_max_workers"])
 
 class EmbeddingService:
     """
     嵌入服务类，提供创建和管理文本嵌入的功能
     """
     def __init__(self):
-        """初始化嵌入服务，创建嵌入工厂实例"""
+        """初始化嵌入服务，创建嵌入工厂实例并获取共享的嵌入缓存"""
         self.embedding_factory = EmbeddingFactory()
+        self.embedding_cache = get_embedding_cache()
 
-    def create_embeddings(self, input_data: dict, config: EmbeddingConfig) -> tuple:
+    def create_embeddings(self, input_data: dict, config: EmbeddingConfig, progress=None) -> tuple:
         """
         创建文本块的嵌入向量并返回必要的信息
         
         参数:
             input_data: 包含文本块和元数据的输入数据字典
             config: 嵌入配置对象
+            progress: 可选的进度回调，每批完成后以 (已计算数, 需计算总数) 调用
             
         返回:
-            包含嵌入结果和元数据的元组
+            (嵌入结果列表, 缓存统计信息) 元组
         """
-        embedding_function = self.embedding_factory.create_embedding_function(config)
-        
         chunks = input_data.get('chunks', [])
         filename = input_data.get('metadata', {}).get('filename', '')  # 获取文件名
         
-        # 批处理大小
-        BATCH_SIZE = 20
+        # 先查缓存，只对未命中的文本按批计算
+        texts = [chunk.get("content", "") for chunk in chunks]
+        embedding_vectors, cache_stats = self._embed_with_cache(texts, config, progress)
+        
         results = []
+        for chunk, embedding_vector in zip(chunks, embedding_vectors):
+            metadata = {
+                "chunk_id": chunk["metadata"]["chunk_id"],
+                "page_number": chunk["metadata"]["page_number"],
+                "page_range": chunk["metadata"]["page_range"],
+                # 去重后保留的块记录被合并的所有页码
+                "page_refs": chunk["metadata"].get("page_refs", chunk["metadata"]["page_range"]),
+                "duplicate_count": chunk["metadata"].get("duplicate_count", 0),
+                "content": chunk["content"],
+                "word_count": chunk["metadata"]["word_count"],
+                # "chunking_method": input_data.get("chunking_method", "loaded"),
+                "total_chunks": len(chunks),
+                "embedding_provider": config.provider,
+                "embedding_model": config.model_name,
+                "embedding_timestamp": datetime.now().isoformat(),
+                "vector_dimension": len(embedding_vector),
+                "filename": filename  # 添加文件名到metadata
+            }
+            
+            embedding_result = {
+                "embedding": embedding_vector,
+                "metadata": metadata
+            }
+            results.append(embedding_result)
+        
+        logger.info(
+            f"Embeddings created: {len(results)} | cache hits: {cache_stats['cache_hits']} | "
+            f"hit rate: {cache_stats['cache_hit_rate']}"
+        )
+        return results, cache_stats
+
+    def _embed_with_cache(self, texts: list, config: EmbeddingConfig, progress=None) -> tuple:
+        """
+        计算文本嵌入向量，优先使用内容寻址缓存
         
-        # 如果是OpenAI，使用批处理
-        if config.provider == EmbeddingProvider.OPENAI:
-            for i in range(0, len(chunks), BATCH_SIZE):
-                batch = chunks[i:i + BATCH_SIZE]
-                # 提取当前批次的文本内容
-                texts = [chunk.get("content", "") for chunk in batch]
-                
-                # 批量获取embeddings
-                embedding_vectors = embedding_function.embed_documents(texts)
-                
-                # 将结果与原始chunk数据组合
-                for chunk, embedding_vector in zip(batch, embedding_vectors):
-                    metadata = {
-                        "chunk_id": chunk["metadata"]["chunk_id"],
-                        "page_number": chunk["metadata"]["page_number"],
-                        "page_range": chunk["metadata"]["page_range"],
-                        "content": chunk["content"],
-                        "word_count": chunk["metadata"]["word_count"],
-                        # "chunking_method": input_data.get("chunking_method", "loaded"),
-                        "total_chunks": len(chunks),
-                        "embedding_provider": config.provider,
-                        "embedding_model": config.model_name,
-                        "embedding_timestamp": datetime.now().isoformat(),
-                        "vector_dimension": len(embedding_vector),
-                        "filename": filename  # 添加文件名到metadata
-                    }
-                    
-                    embedding_result = {
-                        "embedding": embedding_vector,
-                        "metadata": metadata
-                    }
-                    results.append(embedding_result)
-        else:
-            # 对其他提供商保持原有的逐个处理逻辑
-            for chunk in chunks:
-                embedding_vector = embedding_function.embed_query(chunk["content"])
-                metadata = {
-                    "chunk_id": chunk["metadata"]["chunk_id"],
-                    "page_number": chunk["metadata"]["page_number"],
-                    "page_range": chunk["metadata"]["page_range"],
-                    "content": chunk["content"],
-                    "word_count": chunk["metadata"]["word_count"],
-                    # "chunking_method": input_data.get("chunking_method", "loaded"),
-                    "total_chunks": len(chunks),
-                    "embedding_provider": config.provider,
-                    "embedding_model": config.model_name,
-                    "embedding_timestamp": datetime.now().isoformat(),
-                    "vector_dimension": len(embedding_vector),
-                    "filename": filename  # 添加文件名到metadata
-                }
-                
-                embedding_result = {
-                    "embedding": embedding_vector,
-                    "metadata": metadata
-                }
-                results.append(embedding_result)
+        参数:
+            texts: 文本列表
+            config: 嵌入配置对象
+            progress: 可选的进度回调，只统计缓存未命中、需要计算的文本
+            
+        返回:
+            (与 texts 顺序一致的向量列表, 缓存统计信息) 元组
+        """
+        cached = {}
+        if self.embedding_cache is not None and texts:
+            cached = self.embedding_cache.get_many(config.provider, config.model_name, texts)
+        
+        hits = sum(1 for text in texts if text in cached)
         
-        # 返回结果和空的metadata（因为metadata已经包含在每个embedding中）
-        return results, {}
+        # 同一文本只计算一次
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        if missing:
+            embedding_function = self.embedding_factory.create_embedding_function(config)
+            computed = dict(zip(missing, self._embed_texts(embedding_function, missing, config, progress)))
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(config.provider, config.model_name, computed)
+            cached.update(computed)
+        
+        cache_stats = {
+            "cache_hits": hits,
+            "cache_misses": len(texts) - hits,
+            "cache_hit_rate": round(hits / len(texts), 4) if texts else 0.0
+        }
+        return [cached[text] for text in texts], cache_stats
 
-    def save_embeddings(self, doc_name: str, embeddings: list) -> str:
+    def _embed_texts(self, embedding_function, texts: list, config: EmbeddingConfig, progress=None) -> list:
         """
-        保存嵌入向量到JSON文件
+        按批次计算文本嵌入向量
+        
+        OpenAI 每批调用一次 embed_documents；HuggingFace 每批直接调用 SentenceTransformer.encode，
+        批大小按本次请求传入（注册表中缓存的模型是共享的，不能把批大小固定在模型对象上）；
+        Bedrock 没有批量接口，同一批内的请求通过有界线程池并发发送。
+        
+        参数:
+            embedding_function: 嵌入函数对象
+            texts: 文本列表
+            config: 嵌入配置对象
+            progress: 可选的进度回调，每批完成后以 (已计算数, 总数) 调用
+            
+        返回:
+            与 texts 顺序一致的嵌入向量列表
+        """
+        vectors = []
+        batch_size = max(1, config.batch_size)
+        
+        if config.provider == EmbeddingProvider.BEDROCK:
+            with ThreadPoolExecutor(max_workers=max(1, config.max_workers)) as executor:
+                for i in range(0, len(texts), batch_size):
+                    vectors.extend(executor.map(embedding_function.embed_query, texts[i:i + batch_size]))
+                    logger.debug(f"Embedded {len(vectors)}/{len(texts)} texts")
+                    if progress:
+                        progress(len(vectors), len(texts))
+            return vectors
+        
+        if config.provider == EmbeddingProvider.HUGGINGFACE:
+            # 与 HuggingFaceEmbeddings.embed_documents 相同的预处理，只是批大小取本次请求的配置
+            encode_kwargs = {**embedding_function.encode_kwargs, "batch_size": batch_size}
+            for i in range(0, len(texts), batch_size):
+                batch = [text.replace("\n", " ") for text in texts[i:i + batch_size]]
+                vectors.extend(embedding_function.client.encode(batch, show_progress_bar=False, **encode_kwargs).tolist())
+                logger.debug(f"Embedded {len(vectors)}/{len(texts)} texts")
+                if progress:
+                    progress(len(vectors), len(texts))
+            return vectors
+        
+        for i in range(0, len(texts), batch_size):
+            vectors.extend(embedding_function.embed_documents(texts[i:i + batch_size]))
+            logger.debug(f"Embedded {len(vectors)}/{len(texts)} texts")
+            if progress:
+                progress(len(vectors), len(texts))
+        return vectors
+
+    def save_embeddings(self, doc_name: str, embeddings: list, duplicate_chunk_ids: dict = None) -> str:
+        """
+        保存嵌入向量：元数据写入JSON文件，向量写入同名的.npy文件
         
         参数:
             doc_name: 文档名称
             embeddings: 嵌入向量列表
+            duplicate_chunk_ids: 去重时被合并块到保留块的 chunk_id 映射，索引时与词法索引关联
             
         返回:
             保存的文件路径
@@ -155,34 +222,13 @@ class EmbeddingService:
             "embedding_model": first_embedding["metadata"]["embedding_model"],
             "vector_dimension": first_embedding["metadata"]["vector_dimension"]
         }
+        if duplicate_chunk_ids:
+            config_info["duplicate_chunk_ids"] = duplicate_chunk_ids
         
-        class CompactJSONEncoder(json.JSONEncoder):
-            """自定义JSON编码器，用于优化嵌入向量的存储格式"""
-            def default(self, obj):
-                if isinstance(obj, datetime):
-                    return obj.isoformat()
-                return super().default(obj)
-            
-            def encode(self, obj):
-                # 将 embedding 数组转换为单行，其他保持格式化
-                def format_list(lst):
-                    if isinstance(lst, list):
-                        # 检查是否为 embedding 数组（通过检查第一个元素是否为数字）
-                        if lst and isinstance(lst[0], (int, float)):
-                            return '[' + ','.join(map(str, lst)) + ']'
-                        return [format_list(item) for item in lst]
-                    elif isinstance(lst, dict):
-                        return {k: format_list(v) for k, v in lst.items()}
-                    return lst
-                
-                return super().encode(format_list(obj))
-        
-        # 保存数据，配置信息放在顶层
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump({
-                **config_info,  # 配置信息放在顶层
-                "embeddings": embeddings
-            }, f, ensure_ascii=False, indent=2, cls=CompactJSONEncoder)
+        # 元数据写入JSON，向量写入同名的float32矩阵文件
+        vectors = np.asarray([emb["embedding"] for emb in embeddings], dtype=np.float32)
+        save_embedding_file(filepath, config_info, embeddings, vectors)
+        get_artifact_catalog().upsert("embedded", filepath)
             
         return filepath
 
@@ -199,8 +245,33 @@ class EmbeddingService:
             嵌入向量列表
         """
         config = EmbeddingConfig(provider=provider, model_name=model)
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get_many(provider, model, [text])
+            if text in cached:
+                return cached[text]
         embedding_function = self.embedding_factory.create_embedding_function(config)
-        return embedding_function.embed_query(text)
+        vector = embedding_function.embed_query(text)
+        if self.embedding_cache is not None:
+            self.embedding_cache.put_many(provider, model, {text: vector})
+        return vector
+
+    def create_query_embeddings(self, texts: list, provider: str, model: str) -> list:
+        """
+        批量创建多个查询文本的嵌入向量
+        
+        与 create_embeddings 共用批处理和内容寻址缓存，所有未命中的文本只调用一次模型。
+        
+        参数:
+            texts: 需要嵌入的文本列表
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            
+        返回:
+            与 texts 顺序一致的嵌入向量列表
+        """
+        config = EmbeddingConfig(provider=provider, model_name=model)
+        vectors, _ = self._embed_with_cache(list(texts), config)
+        return vectors
 
     def get_document_embedding_config(self, collection_name: str) -> EmbeddingConfig:
         """
@@ -219,23 +290,27 @@ class EmbeddingService:
             # 只取第一个下划线之前的部分
             doc_name = collection_name.split('_')[0]
             
-            # 查找对应的embedding文件
-            embedded_docs_dir = "02-embedded-docs"
-            for filename in os.listdir(embedded_docs_dir):
-                if filename.endswith('.json'):
-                    with open(os.path.join(embedded_docs_dir, filename), 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        # 使用 filename 而不是 document_name
-                        if data.get("filename") == doc_name:
-                            return EmbeddingConfig(
-                                provider=data.get("embedding_provider"),
-                                model_name=data.get("embedding_model")
-                            )
+            # 从产物目录查找对应的embedding文件，不再逐个解析文件
+            entry = get_artifact_catalog().find_latest("embedded", doc_name)
+            if entry is not None:
+                return EmbeddingConfig(
+                    provider=entry["header"].get("embedding_provider"),
+                    model_name=entry["header"].get("embedding_model")
+                )
                             
             raise ValueError(f"No matching embedding configuration found for collection: {collection_name}")
         except Exception as e:
             raise ValueError(f"Error getting embedding config: {str(e)}")
 
+_model_registry = EmbeddingModelRegistry(
+    max_memory_mb=EMBEDDING_MODEL_REGISTRY_CONFIG["max_memory_mb"],
+    idle_ttl_seconds=EMBEDDING_MODEL_REGISTRY_CONFIG["idle_ttl_seconds"]
+)
+
+def get_model_registry() -> EmbeddingModelRegistry:
+    """获取进程内共享的嵌入模型注册表"""
+    return _model_registry
+
 class EmbeddingFactory:
     """
     嵌入工厂类，负责创建不同提供商的嵌入函数
@@ -243,7 +318,37 @@ class EmbeddingFactory:
     @staticmethod
     def create_embedding_function(config: EmbeddingConfig):
         """
-        根据配置创建嵌入函数
+        根据配置获取嵌入函数，已加载的模型从进程级注册表中复用
+        
+        参数:
+            config: 嵌入配置对象
+            
+        返回:
+            嵌入函数对象
+            
+        异常:
+            ValueError: 当提供商不支持时抛出
+        """
+        return _model_registry.get_or_load(
+            config.provider,
+            config.model_name,
+            lambda: EmbeddingFactory._build_embedding_function(config)
+        )
+
+    @staticmethod
+    def preload_models() -> None:
+        """预加载 EMBEDDING_MODEL_REGISTRY_CONFIG 中配置的模型"""
+        _model_registry.preload(
+            EMBEDDING_MODEL_REGISTRY_CONFIG.get("preload", []),
+            lambda provider, model: EmbeddingFactory._build_embedding_function(
+                EmbeddingConfig(provider=provider, model_name=model)
+            )
+        )
+
+    @staticmethod
+    def _build_embedding_function(config: EmbeddingConfig):
+        """
+        创建新的嵌入函数对象
         
         参数:
             config: 嵌入配置对象
@@ -273,8 +378,7 @@ class EmbeddingFactory:
             )
             
         elif config.provider == EmbeddingProvider.HUGGINGFACE:
-            return HuggingFaceEmbeddings(
-                model_name=config.model_name
-            )
+            # 批大小由 _embed_texts 按请求传入，模型对象在注册表中跨请求共享
+            return HuggingFaceEmbeddings(model_name=config.model_name)
             
         raise ValueError(f"Unsupported embedding provider: {config.provider}")
\ No newline at end of file
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from utils.config import JOBS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# 进度回调：(完成比例 0~1 或 None, 可选的说明文字)
+ProgressCallback = Callable[[Optional[float], Optional[str]], None]
+
+class JobManager:
+    """
+    后台任务管理器
+
+    加载、嵌入、索引等耗时阶段作为任务提交到各自的线程池，每个阶段的并发数单独限制，
+    请求处理协程只负责提交并立即返回任务ID。任务状态、进度和结果保存在 SQLite 中，
+    服务重启后仍可查询；重启时仍在排队或运行的任务标记为失败，并删除这些任务登记的临时文件。
+    """
+    def __init__(self, db_path: str, stage_workers: Dict[str, int]):
+        """
+        初始化任务管理器
+
+        参数:
+            db_path: SQLite 数据库文件路径
+            stage_workers: {阶段名: 最大并发数}
+        """
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, stage TEXT NOT NULL, status TEXT NOT NULL, "
+            "progress REAL, message TEXT, params TEXT, result TEXT, error TEXT, "
+            "created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
+        # 旧版任务库没有 cleanup 列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "cleanup" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN cleanup TEXT")
+        # 关闭时还在排队的任务被取消、从未执行，运行中的任务可能随进程退出而中断，
+        # 两者都不会删除自己的临时文件，在这里统一清理
+        for (cleanup,) in self._conn.execute(
+            "SELECT cleanup FROM jobs WHERE status IN (?, ?) AND cleanup IS NOT NULL", (QUEUED, RUNNING)
+        ).fetchall():
+            self._remove_paths(json.loads(cleanup))
+        interrupted = self._conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+            (FAILED, "Interrupted by server restart", datetime.now().isoformat(), QUEUED, RUNNING)
+        ).rowcount
+        self._conn.commit()
+        if interrupted:
+            logger.warning(f"Marked {interrupted} interrupted jobs as failed")
+
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix=f"job-{stage}")
+            for stage, workers in stage_workers.items()
+        }
+
+    def submit(self, stage: str, fn: Callable[[ProgressCallback], Dict[str, Any]],
+               params: Dict[str, Any] = None, cleanup: List[str] = None) -> str:
+        """
+        提交任务
+
+        参数:
+            stage: 阶段名，决定使用哪个线程池
+            fn: 任务函数，接收进度回调，返回可 JSON 序列化的结果字典
+            params: 任务参数，仅用于记录和查询
+            cleanup: 任务函数负责删除的临时文件或目录；任务未执行完就被中断时，下次启动时删除
+
+        返回:
+            任务ID
+        """
+        if stage not in self._executors:
+            raise ValueError(f"Unsupported job stage: {stage}")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, stage, status, progress, params, cleanup, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, stage, QUEUED, 0.0, json.dumps(params or {}, ensure_ascii=False, default=str),
+                 json.dumps(cleanup, ensure_ascii=False) if cleanup else None, datetime.now().isoformat())
+            )
+            self._conn.commit()
+        self._executors[stage].submit(self._run, job_id, fn)
+        logger.info(f"Job submitted: {job_id} | stage: {stage}")
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[[ProgressCallback], Dict[str, Any]]) -> None:
+        """在线程池中执行任务并记录状态"""
+        self._update(job_id, status=RUNNING, started_at=datetime.now().isoformat())
+        start_time = time.time()
+        last_write = [0.0]
+
+        def progress(fraction: Optional[float] = None, message: Optional[str] = None) -> None:
+            # 进度写入做简单节流，避免每批都提交一次事务
+            now = time.time()
+            if now - last_write[0] < 0.5 and (fraction is None or fraction < 1):
+                return
+            last_write[0] = now
+            fields = {"message": message}
+            if fraction is not None:
+                fields["progress"] = round(min(max(float(fraction), 0.0), 1.0), 4)
+            self._update(job_id, **fields)
+
+        try:
+            result = fn(progress)
+            self._update(
+                job_id,
+                status=SUCCEEDED,
+                progress=1.0,
+                result=json.dumps(result, ensure_ascii=False, default=str),
+                finished_at=datetime.now().isoformat()
+            )
+            logger.info(f"Job succeeded: {job_id} | {time.time() - start_time:.2f}s")
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            self._update(job_id, status=FAILED, error=str(detail), finished_at=datetime.now().isoformat())
+            logger.error(f"Job failed: {job_id} | {detail}", exc_info=True)
+
+    def _update(self, job_id: str, **fields) -> None:
+        """更新任务字段"""
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态
+
+        参数:
+            job_id: 任务ID
+            include_result: 是否包含任务结果
+
+        返回:
+            任务信息字典，不存在时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, stage, status, progress, message, params, result, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = self._row_to_job(row)
+        if include_result:
+            job["result"] = json.loads(row[6]) if row[6] else None
+        return job
+
+    def list(self, stage: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        列出最近的任务
+
+        参数:
+            stage: 只列出指定阶段的任务
+            limit: 最大返回数量
+
+        返回:
+            任务信息列表（不含结果），按创建时间降序
+        """
+        query = ("SELECT id, stage, status, progress, message, params, result, error, "
+                 "created_at, started_at, finished_at FROM jobs")
+        args: tuple = ()
+        if stage:
+            query += " WHERE stage = ?"
+            args = (stage,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*args, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    @staticmethod
+    def _row_to_job(row: tuple) -> Dict[str, Any]:
+        return {
+            "job_id": row[0],
+            "stage": row[1],
+            "status": row[2],
+            "progress": row[3],
+            "message": row[4],
+            "params": json.loads(row[5]) if row[5] else {},
+            "error": row[7],
+            "created_at": row[8],
+            "started_at": row[9],
+            "finished_at": row[10]
+        }
+
+    @staticmethod
+    def _remove_paths(paths: List[str]) -> None:
+        """删除中断任务登记的临时文件或目录"""
+        for path in paths:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+                else:
+                    continue
+                logger.info(f"Removed temp path of interrupted job: {path}")
+            except OSError as e:
+                logger.warning(f"Failed to remove temp path of interrupted job: {path} | {e}")
+
+    def shutdown(self) -> None:
+        """停止接收新任务，不等待正在运行的任务"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """
+    获取进程内共享的任务管理器实例
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(JOBS_CONFIG["db_path"], JOBS_CONFIG["stage_workers"])
+        return _manager
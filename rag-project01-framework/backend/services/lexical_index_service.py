@@ -0,0 +1,261 @@
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from utils.config import LEXICAL_INDEX_CONFIG
+from utils.text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+class LexicalIndexService:
+    """
+    基于 BM25 的词法检索服务
+
+    每个分块文档在分块时建立一份倒排索引，保存在 index_dir/<索引ID>/ 下：
+        - meta.json:     词表 {词项: [倒排起始位置, 文档频率]}、块信息和 BM25 参数
+        - postings.npy:  int32 矩阵，每行为 (块序号, 词频)，按词项连续存放
+        - doc_lens.npy:  每个块的词项数
+    查询时倒排文件以内存映射方式打开，只读取查询词项对应的行。
+    """
+
+    # 已打开的索引在进程内共享：{索引ID: (meta.json 修改时间, 索引数据)}
+    _open_indexes: Dict[str, tuple] = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, index_dir: str = None):
+        """
+        初始化词法检索服务
+
+        参数:
+            index_dir: 索引根目录，默认使用 LEXICAL_INDEX_CONFIG["index_dir"]
+        """
+        self.index_dir = index_dir or LEXICAL_INDEX_CONFIG["index_dir"]
+        self.k1 = LEXICAL_INDEX_CONFIG["k1"]
+        self.b = LEXICAL_INDEX_CONFIG["b"]
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    @staticmethod
+    def index_id_for(doc_name: str) -> str:
+        """由分块文档文件名得到索引ID（去掉 .json 后缀）"""
+        doc_name = os.path.basename(doc_name or "")
+        return doc_name[:-5] if doc_name.endswith(".json") else doc_name
+
+    def build_index(self, doc_name: str, chunks: Iterable[Dict[str, Any]], document_name: str = "") -> Dict[str, Any]:
+        """
+        为一个分块文档建立倒排索引，已存在时覆盖
+
+        参数:
+            doc_name: 分块文档文件名
+            chunks: 文本块列表或迭代器（只遍历一次），每项包含 content（或 text）和 metadata
+            document_name: 原始文档名（与向量库中的 document_name 一致）
+
+        返回:
+            索引统计信息
+        """
+        index_id = self.index_id_for(doc_name)
+        postings: Dict[str, List[tuple]] = {}
+        lengths = []
+        chunk_info = []
+        for idx, chunk in enumerate(chunks):
+            metadata = chunk.get("metadata") or {}
+            content = chunk.get("content") or chunk.get("text") or ""
+            term_freqs = Counter(tokenize(content))
+            lengths.append(sum(term_freqs.values()))
+            for term, tf in term_freqs.items():
+                postings.setdefault(term, []).append((idx, tf))
+            chunk_info.append({
+                "chunk_id": metadata.get("chunk_id", idx + 1),
+                "page_number": metadata.get("page_number"),
+                "page_range": metadata.get("page_range")
+            })
+
+        terms = {}
+        rows = []
+        for term in sorted(postings):
+            terms[term] = [len(rows), len(postings[term])]
+            rows.extend(postings[term])
+        postings_matrix = np.asarray(rows, dtype=np.int32).reshape(-1, 2)
+        doc_lens = np.asarray(lengths, dtype=np.int32)
+        num_chunks = len(lengths)
+
+        # 先写入临时目录再整体替换，查询不会读到写了一半的索引
+        target_dir = os.path.join(self.index_dir, index_id)
+        tmp_dir = target_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "postings.npy"), postings_matrix)
+        np.save(os.path.join(tmp_dir, "doc_lens.npy"), doc_lens)
+        meta = {
+            "index_id": index_id,
+            "document_name": document_name,
+            "num_chunks": num_chunks,
+            "avg_doc_len": float(doc_lens.mean()) if num_chunks else 0.0,
+            "k1": self.k1,
+            "b": self.b,
+            "chunks": chunk_info,
+            "terms": terms
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(target_dir, ignore_errors=True)
+        os.replace(tmp_dir, target_dir)
+
+        with self._open_lock:
+            self._open_indexes.pop(index_id, None)
+        logger.info(f"Lexical index built: {index_id} | chunks: {num_chunks} | terms: {len(terms)}")
+        return {"index_id": index_id, "num_chunks": num_chunks, "num_terms": len(terms)}
+
+    def has_index(self, index_id: str) -> bool:
+        """判断索引是否存在"""
+        return os.path.exists(os.path.join(self.index_dir, index_id, "meta.json"))
+
+    def delete_index(self, doc_name: str) -> None:
+        """删除分块文档对应的索引"""
+        index_id = self.index_id_for(doc_name)
+        with self._open_lock:
+            self._open_indexes.pop(index_id, None)
+        shutil.rmtree(os.path.join(self.index_dir, index_id), ignore_errors=True)
+
+    def _open(self, index_id: str) -> Dict[str, Any]:
+        """打开索引并缓存，索引文件更新后自动重新打开"""
+        index_path = os.path.join(self.index_dir, index_id)
+        meta_path = os.path.join(index_path, "meta.json")
+        mtime = os.path.getmtime(meta_path)
+        with self._open_lock:
+            cached = self._open_indexes.get(index_id)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = {
+            "meta": meta,
+            "postings": np.load(os.path.join(index_path, "postings.npy"), mmap_mode="r"),
+            "doc_lens": np.load(os.path.join(index_path, "doc_lens.npy"))
+        }
+        with self._open_lock:
+            self._open_indexes[index_id] = (mtime, index)
+        return index
+
+    def search(self, index_id: str, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        BM25 检索
+
+        参数:
+            index_id: 索引ID
+            query: 查询文本
+            top_k: 返回的最大结果数量
+
+        返回:
+            按得分降序的结果列表，每项包含 chunk_id、page_number、page_range 和 score
+        """
+        index = self._open(index_id)
+        meta = index["meta"]
+        num_chunks = meta["num_chunks"]
+        if num_chunks == 0:
+            return []
+
+        doc_lens = index["doc_lens"]
+        avg_doc_len = meta["avg_doc_len"] or 1.0
+        k1, b = meta["k1"], meta["b"]
+        length_norm = k1 * (1 - b + b * doc_lens / avg_doc_len)
+
+        scores = np.zeros(num_chunks, dtype=np.float32)
+        for term in set(tokenize(query)):
+            entry = meta["terms"].get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            rows = np.asarray(index["postings"][offset:offset + df])
+            doc_idx, tf = rows[:, 0], rows[:, 1].astype(np.float32)
+            idf = math.log(1 + (num_chunks - df + 0.5) / (df + 0.5))
+            scores[doc_idx] += idf * tf * (k1 + 1) / (tf + length_norm[doc_idx])
+
+        matched = np.flatnonzero(scores > 0)
+        if matched.size == 0:
+            return []
+        if matched.size > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+
+        return [
+            {**meta["chunks"][idx], "score": float(scores[idx])}
+            for idx in matched
+        ]
+
+    def link_collection(self, collection_name: str, doc_name: str,
+                        duplicate_chunk_ids: Dict[str, int] = None) -> bool:
+        """
+        记录向量集合对应的词法索引，供混合检索查找
+
+        词法索引建立在去重前的分块文档上，嵌入时去重合并掉的块不在集合中，
+        它们的 chunk_id 到保留块的映射与链接一起保存，见 get_duplicate_map。
+
+        参数:
+            collection_name: 向量集合名称
+            doc_name: 生成该集合的分块文档文件名
+            duplicate_chunk_ids: 被合并块到保留块的 chunk_id 映射，没有去重时为 None
+
+        返回:
+            对应的词法索引是否存在
+        """
+        index_id = self.index_id_for(doc_name)
+        if not self.has_index(index_id):
+            return False
+        with self._open_lock:
+            links = self._read_links()
+            links[collection_name] = index_id
+            links_path = os.path.join(self.index_dir, "collections.json")
+            with open(links_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(links, f, ensure_ascii=False, indent=2)
+            os.replace(links_path + ".tmp", links_path)
+
+            duplicates_path = self._duplicates_path(collection_name)
+            if duplicate_chunk_ids:
+                os.makedirs(os.path.dirname(duplicates_path), exist_ok=True)
+                with open(duplicates_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(duplicate_chunk_ids, f)
+                os.replace(duplicates_path + ".tmp", duplicates_path)
+            elif os.path.exists(duplicates_path):
+                os.remove(duplicates_path)
+        return True
+
+    def get_duplicate_map(self, collection_name: str) -> Dict[int, int]:
+        """
+        获取集合去重时被合并块到保留块的 chunk_id 映射
+
+        参数:
+            collection_name: 向量集合名称
+
+        返回:
+            {被合并块的 chunk_id: 保留块的 chunk_id}，没有去重时为空字典
+        """
+        duplicates_path = self._duplicates_path(collection_name)
+        if not os.path.exists(duplicates_path):
+            return {}
+        with open(duplicates_path, "r", encoding="utf-8") as f:
+            return {int(merged_id): int(chunk_id) for merged_id, chunk_id in json.load(f).items()}
+
+    def _duplicates_path(self, collection_name: str) -> str:
+        return os.path.join(self.index_dir, "duplicates", f"{collection_name}.json")
+
+    def get_index_for_collection(self, collection_name: str) -> Optional[str]:
+        """获取向量集合对应的词法索引ID，没有时返回 None"""
+        with self._open_lock:
+            index_id = self._read_links().get(collection_name)
+        if index_id and self.has_index(index_id):
+            return index_id
+        return None
+
+    def _read_links(self) -> Dict[str, str]:
+        """读取集合到索引的映射（调用方需持有锁）"""
+        links_path = os.path.join(self.index_dir, "collections.json")
+        if not os.path.exists(links_path):
+            return {}
+        with open(links_path, "r", encoding="utf-8") as f:
+            return json.load(f)
@@ -2,9 +2,16 @@ from pypdf import PdfReader
 import pdfplumber
 import fitz  # PyMuPDF
 import logging
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import json
+from services.artifact_catalog import get_artifact_catalog
+from services.ocr_service import ocr_pdf_pages
+from utils.config import LOADING_CONFIG
+from utils.document_storage import save_document_file
 
 logger = logging.getLogger(__name__)
 """
@@ -18,6 +25,7 @@ PDF文档加载服务类
         - unstructured: 适合需要更好的文档结构识别和灵活分块策略的场景
         - pdf2image: 适合需要OCR处理的场景
         - tabula: 适合需要表格数据提取的场景
+        - auto: 逐页判断，有文本层的页面直接提取，只对扫描页做OCR
     
     2. 文档加载特性：
         - 保持页码信息
@@ -42,6 +50,56 @@ def import_unstructured():
         logger.error(f"Error importing unstructured: {str(e)}")
         return None
 
+def _extract_page_range(method: str, file_path: str, start: int, end: int) -> list:
+    """
+    提取 [start, end) 范围内页面的文本（页序号从 0 开始），可在工作进程中执行
+
+    参数:
+        method (str): 加载方法，'pymupdf'、'pypdf' 或 'pdfplumber'
+        file_path (str): PDF文件路径
+        start (int): 起始页序号
+        end (int): 结束页序号（不含）
+
+    返回:
+        list: [(页码, 文本)] 列表，页码从 1 开始
+    """
+    pages = []
+    if method == "pymupdf":
+        with fitz.open(file_path) as doc:
+            for page_num in range(start, end):
+                pages.append((page_num + 1, doc[page_num].get_text("text")))
+    elif method == "pypdf":
+        with open(file_path, "rb") as file:
+            pdf = PdfReader(file)
+            for page_num in range(start, end):
+                pages.append((page_num + 1, pdf.pages[page_num].extract_text()))
+    elif method == "pdfplumber":
+        # 只打开需要的页面，避免每个进程都构建整本文档的页面对象
+        with pdfplumber.open(file_path, pages=list(range(start + 1, end + 1))) as pdf:
+            for page in pdf.pages:
+                pages.append((page.page_number, page.extract_text()))
+    else:
+        raise ValueError(f"Unsupported page extraction method: {method}")
+    return pages
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    获取进程内共享的页面提取进程池，首次调用时创建
+
+    使用 spawn 方式启动子进程，避免在多线程的服务进程中 fork。
+    """
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
+
 class LoadingService:
     """
     PDF文档加载服务类，提供多种PDF文档加载和处理方法。
@@ -64,7 +122,7 @@ class LoadingService:
 
         参数:
             file_path (str): PDF文件路径
-            method (str): 加载方法，支持 'pymupdf', 'pypdf', 'pdfplumber', 'unstructured', 'pdf2image', 'tabula'
+            method (str): 加载方法，支持 'pymupdf', 'pypdf', 'pdfplumber', 'unstructured', 'pdf2image', 'tabula', 'auto'
             strategy (str, optional): 使用unstructured方法时的策略，可选 'fast', 'hi_res', 'ocr_only'
             chunking_strategy (str, optional): 文本分块策略，可选 'basic', 'by_title', 'by_section'
             chunking_options (dict, optional): 分块选项配置
@@ -104,6 +162,8 @@ class LoadingService:
                 )
             elif method == "pdf2image":
                 return self._load_with_pdf2image(file_path)
+            elif method == "auto":
+                return self._load_with_auto(file_path)
             elif method == "tabula":
                 return self._load_with_tabula(file_path)
             else:
@@ -141,19 +201,8 @@ class LoadingService:
         返回:
             str: 提取的文本内容
         """
-        text_blocks = []
         try:
-            with fitz.open(file_path) as doc:
-                self.total_pages = len(doc)
-                for page_num, page in enumerate(doc, 1):
-                    text = page.get_text("text")
-                    if text.strip():
-                        text_blocks.append({
-                            "text": text.strip(),
-                            "page": page_num
-                        })
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+            return self._load_pages("pymupdf", file_path)
         except Exception as e:
             logger.error(f"PyMuPDF error: {str(e)}")
             raise
@@ -170,19 +219,7 @@ class LoadingService:
             str: 提取的文本内容
         """
         try:
-            text_blocks = []
-            with open(file_path, "rb") as file:
-                pdf = PdfReader(file)
-                self.total_pages = len(pdf.pages)
-                for page_num, page in enumerate(pdf.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text and page_text.strip():
-                        text_blocks.append({
-                            "text": page_text.strip(),
-                            "page": page_num
-                        })
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+            return self._load_pages("pypdf", file_path)
         except Exception as e:
             logger.error(f"PyPDF error: {str(e)}")
             raise
@@ -292,23 +329,63 @@ class LoadingService:
         返回:
             str: 提取的文本内容
         """
-        text_blocks = []
         try:
-            with pdfplumber.open(file_path) as pdf:
-                self.total_pages = len(pdf.pages)
-                for page_num, page in enumerate(pdf.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text and page_text.strip():
-                        text_blocks.append({
-                            "text": page_text.strip(),
-                            "page": page_num
-                        })
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+            return self._load_pages("pdfplumber", file_path)
         except Exception as e:
             logger.error(f"pdfplumber error: {str(e)}")
             raise
     
+    def _load_pages(self, method: str, file_path: str) -> str:
+        """
+        逐页提取文本并生成页面映射。
+        页数达到 parallel_min_pages 时按 pages_per_task 切分页面范围，在进程池中并行提取，
+        结果按页码顺序合并；否则在当前进程中串行提取。
+
+        参数:
+            method (str): 加载方法，'pymupdf'、'pypdf' 或 'pdfplumber'
+            file_path (str): PDF文件路径
+
+        返回:
+            str: 提取的文本内容
+        """
+        with fitz.open(file_path) as doc:
+            self.total_pages = len(doc)
+
+        workers = LOADING_CONFIG["parallel_workers"] or os.cpu_count() or 1
+        if workers > 1 and self.total_pages >= LOADING_CONFIG["parallel_min_pages"]:
+            step = max(1, LOADING_CONFIG["pages_per_task"])
+            ranges = [(start, min(start + step, self.total_pages)) for start in range(0, self.total_pages, step)]
+            start_time = datetime.now()
+            pool = _get_page_pool(workers)
+            # map 按提交顺序返回结果，合并后即为页码顺序
+            pages = [
+                page
+                for range_pages in pool.map(
+                    _extract_page_range,
+                    [method] * len(ranges),
+                    [file_path] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges]
+                )
+                for page in range_pages
+            ]
+            logger.info(
+                f"Parallel {method} extraction: {self.total_pages} pages, {len(ranges)} tasks, "
+                f"{workers} workers, {(datetime.now() - start_time).total_seconds():.2f}s"
+            )
+        else:
+            pages = _extract_page_range(method, file_path, 0, self.total_pages)
+
+        text_blocks = []
+        for page_num, text in pages:
+            if text and text.strip():
+                text_blocks.append({
+                    "text": text.strip(),
+                    "page": page_num
+                })
+        self.current_page_map = text_blocks
+        return "\n".join(block["text"] for block in text_blocks)
+    
     def _preprocess_document(self, file_path: str, options: dict) -> None:
         """
         文档预处理功能
@@ -399,6 +476,7 @@ class LoadingService:
         """
         使用pdf2image库加载PDF文档。
         适合需要OCR处理的场景。
+        页面逐页渲染并在OCR进程池中识别，内存中只保留少量页面。
         
         参数:
             file_path (str): PDF文件路径
@@ -407,17 +485,11 @@ class LoadingService:
             str: 提取的文本内容
         """
         try:
-            from pdf2image import convert_from_path
-            import pytesseract
-            
-            # 将PDF转换为图像
-            images = convert_from_path(file_path)
-            self.total_pages = len(images)
+            with fitz.open(file_path) as doc:
+                self.total_pages = len(doc)
             
             text_blocks = []
-            for page_num, image in enumerate(images, 1):
-                # 使用Tesseract进行OCR
-                text = pytesseract.image_to_string(image)
+            for page_num, text in ocr_pdf_pages(file_path, self.total_pages):
                 if text.strip():
                     text_blocks.append({
                         "text": text.strip(),
@@ -432,6 +504,57 @@ class LoadingService:
             logger.error(f"PDF2Image error: {str(e)}")
             raise
 
+    def _load_with_auto(self, file_path: str) -> str:
+        """
+        按页选择加载方式。
+        用PyMuPDF遍历一次文档：有文本层的页面直接使用提取的文本，
+        文本少于 auto_min_text_chars 且包含图片的页面视为扫描页，只对这些页面做OCR。
+        适合扫描页和电子页混合的文档。
+        
+        参数:
+            file_path (str): PDF文件路径
+            
+        返回:
+            str: 提取的文本内容
+        """
+        try:
+            min_chars = LOADING_CONFIG["auto_min_text_chars"]
+            blocks_by_page = {}
+            ocr_pages = []
+            with fitz.open(file_path) as doc:
+                self.total_pages = len(doc)
+                for page_num, page in enumerate(doc, 1):
+                    text = page.get_text("text").strip()
+                    if text:
+                        blocks_by_page[page_num] = {
+                            "text": text,
+                            "page": page_num
+                        }
+                    if len(text) < min_chars and page.get_images():
+                        ocr_pages.append(page_num)
+            
+            # OCR 结果覆盖扫描页上零星的文本层（如页码），识别为空时保留原文本
+            if ocr_pages:
+                for page_num, text in ocr_pdf_pages(file_path, self.total_pages, page_numbers=ocr_pages):
+                    if text.strip():
+                        blocks_by_page[page_num] = {
+                            "text": text.strip(),
+                            "page": page_num,
+                            "is_ocr": True
+                        }
+            logger.info(
+                f"Auto loading: {self.total_pages} pages, "
+                f"{self.total_pages - len(ocr_pages)} text layer, {len(ocr_pages)} OCR"
+            )
+            
+            text_blocks = [blocks_by_page[page_num] for page_num in sorted(blocks_by_page)]
+            self.current_page_map = text_blocks
+            return "\n".join(block["text"] for block in text_blocks)
+            
+        except Exception as e:
+            logger.error(f"Auto loading error: {str(e)}")
+            raise
+
     def _load_with_tabula(self, file_path: str) -> str:
         """
         使用tabula库加载PDF文档。
@@ -506,12 +629,10 @@ class LoadingService:
                 "chunks": chunks
             }
             
-            # 保存到文件
+            # 保存到文件：头部 JSON + 分块压缩的文本块
             filepath = os.path.join("01-loaded-docs", f"{doc_name}.json")
-            os.makedirs("01-loaded-docs", exist_ok=True)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(document_data, f, ensure_ascii=False, indent=2)
+            header = save_document_file(filepath, document_data, chunks)
+            get_artifact_catalog().upsert("loaded", filepath, header=header)
                 
             return filepath
             
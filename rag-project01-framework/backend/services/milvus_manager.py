@@ -0,0 +1,169 @@
+import logging
+import threading
+from typing import Any, Dict, List
+from pymilvus import connections, utility, Collection
+from utils.config import MILVUS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class MilvusConnectionManager:
+    """
+    Milvus 长连接管理器
+
+    整个进程共用一个连接，并缓存已加载的 Collection 句柄和每个集合的嵌入配置，
+    热查询只需要一次 ANN 调用。所有方法都可以在多个请求线程中并发调用。
+    """
+    def __init__(self, uri: str, alias: str = "rag_shared"):
+        """
+        初始化连接管理器
+
+        参数:
+            uri: Milvus 连接URI
+            alias: 连接别名，与临时连接使用的 "default" 区分
+        """
+        self.uri = uri
+        self.alias = alias
+        self._connected = False
+        self._lock = threading.RLock()
+        self._collections: Dict[str, Collection] = {}
+        self._embedding_configs: Dict[str, Dict[str, str]] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def connect(self) -> str:
+        """
+        建立连接（只在第一次调用时真正连接）
+
+        返回:
+            连接别名
+        """
+        with self._lock:
+            if not self._connected or not connections.has_connection(self.alias):
+                connections.connect(alias=self.alias, uri=self.uri)
+                self._connected = True
+                logger.info(f"Connected to Milvus at {self.uri} (alias={self.alias})")
+        return self.alias
+
+    def list_collections(self) -> List[str]:
+        """列出所有集合名称"""
+        return utility.list_collections(using=self.connect())
+
+    def has_collection(self, name: str) -> bool:
+        """判断集合是否存在"""
+        return utility.has_collection(name, using=self.connect())
+
+    def get_collection(self, name: str, load: bool = True) -> Collection:
+        """
+        获取集合句柄，首次访问时加载到内存并缓存
+
+        参数:
+            name: 集合名称
+            load: 是否确保集合已加载
+
+        返回:
+            Collection 对象
+        """
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is not None:
+                return collection
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is not None:
+                    return collection
+            collection = Collection(name, using=self.connect())
+            if not load:
+                return collection
+            logger.info(f"Loading collection: {name}")
+            collection.load()
+            with self._lock:
+                self._collections[name] = collection
+            return collection
+
+    def register_collection(self, collection: Collection) -> None:
+        """登记一个已创建并加载的集合句柄（索引完成后调用）"""
+        with self._lock:
+            self._collections[collection.name] = collection
+            self._embedding_configs.pop(collection.name, None)
+
+    def get_embedding_config(self, name: str) -> Dict[str, str]:
+        """
+        获取集合使用的嵌入提供商和模型，结果按集合缓存
+
+        参数:
+            name: 集合名称
+
+        返回:
+            {"embedding_provider": ..., "embedding_model": ...}
+
+        异常:
+            ValueError: 集合为空时抛出
+        """
+        with self._lock:
+            config = self._embedding_configs.get(name)
+            if config is not None:
+                return config
+
+        collection = self.get_collection(name)
+        sample_entity = collection.query(
+            expr="id >= 0",
+            output_fields=["embedding_provider", "embedding_model"],
+            limit=1
+        )
+        if not sample_entity:
+            raise ValueError(f"Collection {name} is empty")
+        config = {
+            "embedding_provider": sample_entity[0]["embedding_provider"],
+            "embedding_model": sample_entity[0]["embedding_model"]
+        }
+        with self._lock:
+            self._embedding_configs[name] = config
+        return config
+
+    def get_field_names(self, name: str) -> List[str]:
+        """获取集合 schema 中的字段名"""
+        return [field.name for field in self.get_collection(name).schema.fields]
+
+    def drop_collection(self, name: str) -> None:
+        """删除集合并清除缓存"""
+        self.invalidate(name)
+        utility.drop_collection(name, using=self.connect())
+
+    def invalidate(self, name: str) -> None:
+        """清除集合的缓存句柄和嵌入配置，下次访问时重新加载"""
+        with self._lock:
+            self._collections.pop(name, None)
+            self._embedding_configs.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取连接与缓存状态"""
+        with self._lock:
+            return {
+                "uri": self.uri,
+                "connected": self._connected,
+                "loaded_collections": sorted(self._collections.keys())
+            }
+
+
+_managers: Dict[str, MilvusConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+def get_milvus_manager(uri: str = None) -> MilvusConnectionManager:
+    """
+    获取指定URI的进程级连接管理器
+
+    参数:
+        uri: Milvus 连接URI，默认使用 MILVUS_CONFIG["uri"]
+
+    返回:
+        MilvusConnectionManager 实例
+    """
+    uri = uri or MILVUS_CONFIG["uri"]
+    with _managers_lock:
+        manager = _managers.get(uri)
+        if manager is None:
+            manager = MilvusConnectionManager(uri, alias=f"rag_shared_{len(_managers)}")
+            _managers[uri] = manager
+        return manager
@@ -0,0 +1,154 @@
+import gc
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingModelRegistry:
+    """
+    进程级嵌入模型注册表
+
+    按 (提供商, 模型) 缓存已加载的嵌入函数对象，避免每次请求都从磁盘重新加载模型。
+    空闲超过 idle_ttl_seconds 的模型会被卸载；本地模型占用的内存总量超过预算时，
+    按最近最少使用顺序卸载其他模型。
+    """
+    def __init__(self, max_memory_mb: int, idle_ttl_seconds: int):
+        """
+        初始化模型注册表
+
+        参数:
+            max_memory_mb: 已加载模型的内存预算（MB）
+            idle_ttl_seconds: 模型最长空闲时间（秒），超过后卸载
+        """
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._models: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get_or_load(self, provider: str, model_name: str, loader: Callable[[], Any]) -> Any:
+        """
+        获取已加载的模型，不存在时调用 loader 加载
+
+        参数:
+            provider: 嵌入提供商
+            model_name: 模型名称
+            loader: 加载模型的无参函数
+
+        返回:
+            嵌入函数对象
+        """
+        key = (str(getattr(provider, "value", provider)), model_name)
+        self.evict_idle()
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                entry["last_used"] = time.time()
+                return entry["model"]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # 同一模型只加载一次，不同模型可以并行加载
+        with key_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    entry["last_used"] = time.time()
+                    return entry["model"]
+
+            start_time = time.time()
+            model = loader()
+            size = self._estimate_model_bytes(model)
+            logger.info(
+                f"Loaded embedding model {provider}/{model_name} | "
+                f"{size / 1024 / 1024:.1f} MB | {time.time() - start_time:.2f}s"
+            )
+
+            with self._lock:
+                self._models[key] = {"model": model, "size": size, "last_used": time.time()}
+                self._enforce_budget(keep=key)
+            return model
+
+    def preload(self, models: List[Dict[str, str]], loader: Callable[[str, str], Any]) -> None:
+        """
+        预加载并预热模型
+
+        参数:
+            models: [{"provider": ..., "model": ...}] 列表
+            loader: 根据 (provider, model) 加载模型的函数
+        """
+        for item in models:
+            provider, model_name = item["provider"], item["model"]
+            try:
+                model = self.get_or_load(provider, model_name, lambda: loader(provider, model_name))
+                # 第一次推理会触发延迟初始化，预热后首个请求不再承担这部分开销
+                model.embed_query("warmup")
+            except Exception as e:
+                logger.error(f"Error preloading embedding model {provider}/{model_name}: {str(e)}")
+
+    def evict_idle(self) -> None:
+        """卸载空闲时间超过 idle_ttl_seconds 的模型"""
+        now = time.time()
+        with self._lock:
+            idle = [key for key, entry in self._models.items()
+                    if now - entry["last_used"] > self.idle_ttl_seconds]
+            for key in idle:
+                self._unload(key, reason="idle")
+        if idle:
+            gc.collect()
+
+    def _enforce_budget(self, keep: Tuple[str, str]) -> None:
+        """内存超出预算时按最近最少使用顺序卸载模型（调用方需持有锁）"""
+        total = sum(entry["size"] for entry in self._models.values())
+        candidates = sorted(
+            (key for key in self._models if key != keep),
+            key=lambda k: self._models[k]["last_used"]
+        )
+        evicted = False
+        for key in candidates:
+            if total <= self.max_memory_bytes:
+                break
+            total -= self._models[key]["size"]
+            self._unload(key, reason="memory budget")
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    def _unload(self, key: Tuple[str, str], reason: str) -> None:
+        """从注册表移除模型（调用方需持有锁）"""
+        entry = self._models.pop(key, None)
+        if entry is not None:
+            logger.info(f"Unloaded embedding model {key[0]}/{key[1]} ({reason})")
+
+    @staticmethod
+    def _estimate_model_bytes(model: Any) -> int:
+        """
+        估算模型占用的内存
+
+        本地 HuggingFace 模型统计参数与缓冲区大小；API 类客户端视为不占用预算。
+        """
+        module = getattr(model, "client", None) or getattr(model, "_client", None)
+        if module is None or not hasattr(module, "parameters"):
+            return 0
+        try:
+            size = sum(p.numel() * p.element_size() for p in module.parameters())
+            size += sum(b.numel() * b.element_size() for b in module.buffers())
+            return int(size)
+        except Exception:
+            return 0
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """获取已加载模型列表"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "provider": key[0],
+                    "model": key[1],
+                    "size_mb": round(entry["size"] / 1024 / 1024, 1),
+                    "idle_seconds": round(now - entry["last_used"], 1)
+                }
+                for key, entry in self._models.items()
+            ]
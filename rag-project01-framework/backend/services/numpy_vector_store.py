@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from utils.config import NUMPY_STORE_CONFIG
+from utils.embedding_storage import read_embedding_header, iter_embedding_batches
+
+logger = logging.getLogger(__name__)
+
+# 预先计算为列数组、可用于过滤的数值字段
+NUMERIC_COLUMNS = ("chunk_id", "total_chunks", "word_count")
+
+# 检索时按块计算得分的行数，内存占用为 查询数 x (块行数 + top_k)，与集合大小无关
+SEARCH_BLOCK_ROWS = 65536
+
+class NumpyVectorStore:
+    """
+    进程内 NumPy 向量库
+
+    适合百万向量以内的集合。每个集合保存在 persist_directory/<集合名>/ 下：
+        - vectors.npy:  L2 归一化后的向量矩阵（float32 或 float16），以内存映射方式读取
+        - <字段>.npy:   chunk_id / total_chunks / word_count 等数值列，用于向量化过滤
+        - records.json: 每行的内容和元数据，字段与 Milvus 集合一致
+        - meta.json:    嵌入提供商、模型、维度、数据类型等集合级信息
+    余弦相似度即归一化向量的内积；检索时按行块做矩阵乘法，每块用 argpartition 取 top-k
+    并与之前各块的 top-k 合并，不构造完整的 查询数 x 行数 得分矩阵。
+    """
+    def __init__(self, persist_directory: str):
+        """
+        初始化向量库
+
+        参数:
+            persist_directory: 集合存储目录
+        """
+        self.persist_directory = persist_directory
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._collections: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def _collection_dir(self, name: str) -> str:
+        return os.path.join(self.persist_directory, name)
+
+    def list_collections(self) -> List[str]:
+        """列出所有集合名称"""
+        return sorted(
+            name for name in os.listdir(self.persist_directory)
+            if os.path.exists(os.path.join(self._collection_dir(name), "meta.json"))
+        )
+
+    def has_collection(self, name: str) -> bool:
+        """判断集合是否存在"""
+        return os.path.exists(os.path.join(self._collection_dir(name), "meta.json"))
+
+    def create_collection(self, name: str, embedding_file: str, vector_dtype: str = "float32",
+                          batch_size: int = 1000,
+                          progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict[str, Any]:
+        """
+        从嵌入文件创建集合，同名集合已存在时整体替换
+
+        嵌入记录按批流式读取，归一化后直接写入内存映射的向量文件。
+
+        参数:
+            name: 集合名称
+            embedding_file: 嵌入元数据文件路径
+            vector_dtype: 向量存储类型，float32 或 float16
+            batch_size: 每批读取的向量数
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 向量总数)
+
+        返回:
+            集合的 meta 信息
+        """
+        if vector_dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype: {vector_dtype}")
+        header = read_embedding_header(embedding_file)
+        dim = int(header["vector_dimension"])
+        total = header.get("total_vectors")
+        if total is None:
+            # 旧版内嵌向量的文件需要先数一遍记录数
+            total = sum(len(records) for records, _ in iter_embedding_batches(embedding_file, batch_size))
+        if total == 0:
+            raise ValueError("字段'embeddings'验证失败: 必须是非空数组")
+
+        target_dir = self._collection_dir(name)
+        tmp_dir = target_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            vectors = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, "vectors.npy"), mode="w+", dtype=vector_dtype, shape=(total, dim)
+            )
+            columns = {column: np.zeros(total, dtype=np.int64) for column in NUMERIC_COLUMNS}
+            records = []
+            offset = 0
+            for batch_records, batch_vectors in iter_embedding_batches(embedding_file, batch_size):
+                batch_vectors = np.asarray(batch_vectors, dtype=np.float32)
+                if batch_vectors.shape[1] != dim:
+                    raise ValueError(f"向量维度不匹配: 文件声明 {dim}, 实际 {batch_vectors.shape[1]}")
+                norms = np.linalg.norm(batch_vectors, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                end = offset + len(batch_records)
+                vectors[offset:end] = batch_vectors / norms
+                for i, record in enumerate(batch_records, offset):
+                    metadata = record["metadata"]
+                    for column in NUMERIC_COLUMNS:
+                        columns[column][i] = int(metadata.get(column, 0) or 0)
+                    records.append({
+                        "content": str(metadata.get("content", "")),
+                        "document_name": header.get("filename", ""),
+                        "chunk_id": int(metadata.get("chunk_id", 0)),
+                        "total_chunks": int(metadata.get("total_chunks", 0)),
+                        "word_count": int(metadata.get("word_count", 0)),
+                        "page_number": str(metadata.get("page_number", 0)),
+                        "page_range": str(metadata.get("page_range", "")),
+                        "page_refs": str(metadata.get("page_refs") or metadata.get("page_range", "")),
+                        "embedding_provider": header.get("embedding_provider", ""),
+                        "embedding_model": header.get("embedding_model", ""),
+                        "embedding_timestamp": str(metadata.get("embedding_timestamp", ""))
+                    })
+                offset = end
+                if progress_callback:
+                    progress_callback(offset, total)
+            vectors.flush()
+            del vectors
+
+            for column, values in columns.items():
+                np.save(os.path.join(tmp_dir, f"{column}.npy"), values)
+            with open(os.path.join(tmp_dir, "records.json"), "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+            meta = {
+                "name": name,
+                "document_name": header.get("filename", ""),
+                "embedding_provider": header.get("embedding_provider", ""),
+                "embedding_model": header.get("embedding_model", ""),
+                "vector_dimension": dim,
+                "vector_dtype": vector_dtype,
+                "num_entities": total
+            }
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._collections.pop(name, None)
+            shutil.rmtree(target_dir, ignore_errors=True)
+            os.replace(tmp_dir, target_dir)
+        logger.info(f"NumPy collection created: {name} | vectors: {total} | dtype: {vector_dtype}")
+        return meta
+
+    def drop_collection(self, name: str) -> None:
+        """删除集合"""
+        with self._lock:
+            self._collections.pop(name, None)
+            shutil.rmtree(self._collection_dir(name), ignore_errors=True)
+
+    def _open(self, name: str) -> Dict[str, Any]:
+        """打开集合并缓存，集合被重建后自动重新打开"""
+        collection_dir = self._collection_dir(name)
+        meta_path = os.path.join(collection_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise ValueError(f"Collection {name} not found")
+        mtime = os.path.getmtime(meta_path)
+        with self._lock:
+            cached = self._collections.get(name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(collection_dir, "records.json"), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        collection = {
+            "meta": meta,
+            "vectors": np.load(os.path.join(collection_dir, "vectors.npy"), mmap_mode="r"),
+            "columns": {
+                column: np.load(os.path.join(collection_dir, f"{column}.npy"))
+                for column in NUMERIC_COLUMNS
+            },
+            "records": records
+        }
+        with self._lock:
+            self._collections[name] = (mtime, collection)
+        return collection
+
+    def _read_meta(self, name: str) -> Dict[str, Any]:
+        """只读取集合的 meta.json，不加载记录和向量"""
+        meta_path = os.path.join(self._collection_dir(name), "meta.json")
+        if not os.path.exists(meta_path):
+            raise ValueError(f"Collection {name} not found")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_collection_info(self, name: str) -> Dict[str, Any]:
+        """获取集合的 meta 信息"""
+        return dict(self._read_meta(name))
+
+    def get_embedding_config(self, name: str) -> Dict[str, str]:
+        """获取集合使用的嵌入提供商和模型"""
+        meta = self._read_meta(name)
+        return {
+            "embedding_provider": meta["embedding_provider"],
+            "embedding_model": meta["embedding_model"]
+        }
+
+    def get_records(self, name: str, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """按行号读取记录"""
+        records = self._open(name)["records"]
+        return [records[row] for row in rows]
+
+    def find_rows(self, name: str, column: str, values: Sequence[int]) -> np.ndarray:
+        """查找数值列取值在 values 中的行号"""
+        return np.flatnonzero(np.isin(self._open(name)["columns"][column], np.asarray(values)))
+
+    def search(self,
+               name: str,
+               query_vectors: np.ndarray,
+               top_k: int,
+               score_threshold: Union[float, Sequence[float]] = None,
+               min_values: Dict[str, Union[int, Sequence[int]]] = None) -> List[List[Tuple[int, float]]]:
+        """
+        批量余弦相似度 top-k 检索
+
+        参数:
+            name: 集合名称
+            query_vectors: 形状为 (查询数, 维度) 的查询向量
+            top_k: 每个查询返回的最大结果数
+            score_threshold: 相似度阈值，单个值或每个查询一个值
+            min_values: 数值列过滤条件 {列名: 最小值}，最小值可以是单个值或每个查询一个值
+
+        返回:
+            每个查询的 [(行号, 相似度)] 列表，按相似度降序
+        """
+        collection = self._open(name)
+        vectors = collection["vectors"]
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+        num_queries, total = queries.shape[0], vectors.shape[0]
+        k = min(top_k, total)
+        if k <= 0 or num_queries == 0:
+            return [[] for _ in range(num_queries)]
+
+        thresholds = None
+        if score_threshold is not None:
+            thresholds = np.broadcast_to(np.asarray(score_threshold, dtype=np.float32), (num_queries,))
+        minimums = {
+            column: np.broadcast_to(np.asarray(minimum), (num_queries,))
+            for column, minimum in (min_values or {}).items()
+        }
+
+        # 按行块计算得分，保留到目前为止的 top-k（行号和得分）
+        top = np.zeros((num_queries, 0), dtype=np.int64)
+        top_scores = np.zeros((num_queries, 0), dtype=np.float32)
+        for start in range(0, total, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, total)
+            # float16 没有 BLAS 内核，转换为 float32 后计算
+            scores = queries @ np.asarray(vectors[start:end], dtype=np.float32).T
+            mask = np.ones(scores.shape, dtype=bool)
+            for column, minimum in minimums.items():
+                mask &= collection["columns"][column][None, start:end] >= minimum[:, None]
+            if thresholds is not None:
+                mask &= scores >= thresholds[:, None]
+            scores = np.where(mask, scores, -np.inf)
+
+            rows = np.broadcast_to(np.arange(start, end, dtype=np.int64), scores.shape)
+            if end - start > k:
+                block_top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, block_top, axis=1)
+                rows = block_top + start
+            candidates = np.concatenate([top, rows], axis=1)
+            candidate_scores = np.concatenate([top_scores, scores], axis=1)
+            if candidates.shape[1] > k:
+                keep = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+                candidate_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+            top, top_scores = candidates, candidate_scores
+
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [(int(row), float(score)) for row, score in zip(top[i], top_scores[i]) if np.isfinite(score)]
+            for i in range(num_queries)
+        ]
+
+_stores: Dict[str, NumpyVectorStore] = {}
+_stores_lock = threading.Lock()
+
+def get_numpy_vector_store(persist_directory: str = None) -> NumpyVectorStore:
+    """
+    获取指定目录的进程级 NumPy 向量库
+
+    参数:
+        persist_directory: 集合存储目录，默认使用 NUMPY_STORE_CONFIG["persist_directory"]
+
+    返回:
+        NumpyVectorStore 实例
+    """
+    persist_directory = persist_directory or NUMPY_STORE_CONFIG["persist_directory"]
+    with _stores_lock:
+        store = _stores.get(persist_directory)
+        if store is None:
+            store = NumpyVectorStore(persist_directory)
+            _stores[persist_directory] = store
+        return store
@@ -0,0 +1,230 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from utils.config import OCR_CONFIG, OCR_CACHE_CONFIG
+from utils.sqlite_cache import SQLiteLRUCache
+
+logger = logging.getLogger(__name__)
+
+def _ocr_page_text(file_path: str, page_number: int, dpi: int, lang: str) -> str:
+    """
+    渲染 PDF 的单个页面并做 OCR，可在工作进程中执行
+
+    只渲染这一页，渲染出的图片不会离开工作进程。
+
+    参数:
+        file_path: PDF文件路径
+        page_number: 页码，从 1 开始
+        dpi: 渲染分辨率
+        lang: Tesseract 语言
+
+    返回:
+        识别文本
+    """
+    from pdf2image import convert_from_path
+    import pytesseract
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    return "".join(pytesseract.image_to_string(image, lang=lang) for image in images)
+
+def _ocr_image_bytes(image_bytes: bytes, lang: str) -> str:
+    """
+    对一张编码后的图片（PNG/JPEG 等）做 OCR，可在工作进程中执行
+
+    参数:
+        image_bytes: 图片文件内容
+        lang: Tesseract 语言
+
+    返回:
+        识别文本
+    """
+    from PIL import Image
+    import pytesseract
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return pytesseract.image_to_string(image, lang=lang)
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+def _get_ocr_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    获取进程内共享的 OCR 进程池，首次调用时创建
+
+    使用 spawn 方式启动子进程，避免在多线程的服务进程中 fork。
+    """
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _ocr_pool
+
+def _ocr_workers() -> int:
+    return OCR_CONFIG["workers"] or os.cpu_count() or 1
+
+class OcrCache:
+    """
+    内容寻址的 OCR 结果缓存
+
+    以图片内容的 SHA-256（或 PDF 文件哈希 + 页码 + 分辨率）和语言为键持久化保存识别文本，
+    重复出现的徽标、页眉、印章等图片在整个语料中只需识别一次。
+    """
+    def __init__(self, path: str, max_bytes: int):
+        """
+        初始化 OCR 缓存
+
+        参数:
+            path: SQLite 数据库文件路径
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.store = SQLiteLRUCache(path, max_bytes)
+
+    def get(self, key: str) -> Optional[str]:
+        """读取识别文本，未命中返回 None"""
+        value = self.store.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        """批量写入 {键: 识别文本}"""
+        self.store.put_many((key, text.encode("utf-8")) for key, text in items.items())
+
+    def stats(self) -> Dict[str, float]:
+        """获取缓存累计统计信息"""
+        return self.store.stats()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """
+    获取进程内共享的 OCR 缓存实例，未启用时返回 None
+    """
+    global _cache
+    if not OCR_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache(
+                path=OCR_CACHE_CONFIG["path"],
+                max_bytes=int(OCR_CACHE_CONFIG["max_size_mb"] * 1024 * 1024)
+            )
+            logger.info(f"OCR cache opened: {OCR_CACHE_CONFIG['path']}")
+        return _cache
+
+def _file_sha256(file_path: str) -> str:
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _run_inline(fn: Callable[..., Any], *args) -> Future:
+    """在当前进程中执行，返回已完成的 Future"""
+    future = Future()
+    future.set_result(fn(*args))
+    return future
+
+def _cached_map(fn: Callable[..., str], jobs: Iterable[Tuple[str, tuple]]) -> Iterator[str]:
+    """
+    按输入顺序返回 fn(*args) 的结果，任务在 OCR 进程池中执行
+
+    jobs 产生 (缓存键, 参数)。命中缓存的任务直接返回，同一次调用中重复的键只执行一次，
+    新结果在完成后写入缓存。同时排队的任务数不超过 进程数 x inflight_per_worker，
+    输入按需消费，因此无论文档多大，内存中只保留有限几页的数据。
+    进程数为 1 时在当前进程中逐个执行。
+    """
+    workers = _ocr_workers()
+    submit = _get_ocr_pool(workers).submit if workers > 1 else _run_inline
+    max_inflight = max(1, workers * OCR_CONFIG["inflight_per_worker"])
+    cache = get_ocr_cache()
+    # 本次调用中已提交的键：同一张图片在不同页面重复出现时共用一个任务
+    submitted: Dict[str, Future] = {}
+    pending = deque()
+
+    def resolve(entry: Tuple[str, Future, bool]) -> str:
+        key, future, owner = entry
+        text = future.result()
+        if owner and cache is not None:
+            cache.put_many({key: text})
+        return text
+
+    try:
+        for key, args in jobs:
+            future = submitted.get(key)
+            owner = False
+            if future is None:
+                cached = cache.get(key) if cache is not None else None
+                if cached is not None:
+                    future = Future()
+                    future.set_result(cached)
+                else:
+                    future = submit(fn, *args)
+                    owner = True
+                submitted[key] = future
+            pending.append((key, future, owner))
+            if len(pending) >= max_inflight:
+                yield resolve(pending.popleft())
+        while pending:
+            yield resolve(pending.popleft())
+    finally:
+        # 调用方提前结束或出错时取消尚未开始的任务
+        for _, future, _ in pending:
+            future.cancel()
+
+def ocr_pdf_pages(file_path: str, total_pages: int, dpi: int = None, lang: str = None,
+                  page_numbers: Iterable[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    逐页渲染并 OCR 一个 PDF
+
+    参数:
+        file_path: PDF文件路径
+        total_pages: 总页数
+        page_numbers: 只处理这些页码（从 1 开始），默认处理全部页面
+        dpi: 渲染分辨率，默认使用 OCR_CONFIG["dpi"]
+        lang: Tesseract 语言，默认使用 OCR_CONFIG["lang"]
+
+    返回:
+        按页码顺序产生 (页码, 识别文本) 的迭代器
+    """
+    dpi = dpi or OCR_CONFIG["dpi"]
+    lang = lang or OCR_CONFIG["lang"]
+    page_numbers = list(page_numbers) if page_numbers is not None else list(range(1, total_pages + 1))
+    logger.info(f"OCR {file_path}: {len(page_numbers)}/{total_pages} pages | dpi: {dpi} | workers: {_ocr_workers()}")
+    # 同一文件重新上传时按 (文件哈希, 页码, 分辨率, 语言) 命中缓存
+    file_hash = _file_sha256(file_path)
+    texts = _cached_map(
+        _ocr_page_text,
+        ((f"page|{lang}|{dpi}|{file_hash}|{page_number}", (file_path, page_number, dpi, lang))
+         for page_number in page_numbers)
+    )
+    return zip(page_numbers, texts)
+
+def ocr_images(images: Iterable[bytes], lang: str = None) -> Iterator[str]:
+    """
+    依次 OCR 一组图片
+
+    相同内容的图片只识别一次，结果跨文档缓存。
+
+    参数:
+        images: 图片文件内容的可迭代对象，按需读取
+        lang: Tesseract 语言，默认使用 OCR_CONFIG["lang"]
+
+    返回:
+        按输入顺序产生识别文本的迭代器
+    """
+    lang = lang or OCR_CONFIG["lang"]
+    return _cached_map(
+        _ocr_image_bytes,
+        ((f"image|{lang}|{hashlib.sha256(image_bytes).hexdigest()}", (image_bytes, lang)) for image_bytes in images)
+    )
@@ -6,10 +6,8 @@ from datetime import datetime
 import markdown
 import mammoth  # for docx
 import openpyxl  # for excel
-import pytesseract
-from PIL import Image
-import io
 import re
+from services.ocr_service import ocr_images
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +23,14 @@ class ParsingService:
     - 图片提取和OCR
     """
 
-    def parse_document(self, file_content: bytes, file_type: str, method: str, metadata: dict) -> dict:
+    def parse_document(self, file_path: str, file_type: str, method: str, metadata: dict) -> dict:
         """
         使用指定方法解析文档
 
+        文件直接从磁盘读取，不会整体载入内存后再解析。
+
         参数:
-            file_content (bytes): 文件内容
+            file_path (str): 文件路径
             file_type (str): 文件类型 ('pdf', 'markdown', 'docx', 'excel')
             method (str): 解析方法
             metadata (dict): 文档元数据
@@ -40,13 +40,13 @@ class ParsingService:
         """
         try:
             if file_type == 'pdf':
-                return self._parse_pdf(file_content, method, metadata)
+                return self._parse_pdf(file_path, method, metadata)
             elif file_type == 'markdown':
-                return self._parse_markdown(file_content, method, metadata)
+                return self._parse_markdown(file_path, method, metadata)
             elif file_type == 'docx':
-                return self._parse_docx(file_content, method, metadata)
+                return self._parse_docx(file_path, method, metadata)
             elif file_type == 'excel':
-                return self._parse_excel(file_content, method, metadata)
+                return self._parse_excel(file_path, method, metadata)
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
                 
@@ -54,9 +54,9 @@ class ParsingService:
             logger.error(f"Error in parse_document: {str(e)}")
             raise
 
-    def _parse_pdf(self, file_content: bytes, method: str, metadata: dict) -> dict:
+    def _parse_pdf(self, file_path: str, method: str, metadata: dict) -> dict:
         """解析PDF文档"""
-        doc = fitz.open(stream=file_content, filetype="pdf")
+        doc = fitz.open(file_path)
         page_map = []
         
         for page_num in range(len(doc)):
@@ -68,23 +68,6 @@ class ParsingService:
                 "tables": []
             }
             
-            # 提取图片
-            if method in ["extract_images", "all_text"]:
-                for img_index, img in enumerate(page.get_images()):
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    
-                    # 使用OCR提取图片中的文字
-                    image = Image.open(io.BytesIO(image_bytes))
-                    ocr_text = pytesseract.image_to_string(image, lang='chi_sim+eng')
-                    
-                    page_content["images"].append({
-                        "index": img_index,
-                        "content": f"图片 {img_index + 1}",
-                        "ocr_text": ocr_text.strip()
-                    })
-            
             # 提取表格
             if method in ["extract_tables", "all_text"]:
                 tables = page.find_tables()
@@ -98,11 +81,35 @@ class ParsingService:
             
             page_map.append(page_content)
         
+        # 提取图片，使用OCR提取图片中的文字（图片按需读取，在OCR进程池中识别）
+        if method in ["extract_images", "all_text"]:
+            image_refs = [
+                (page_num, img_index, img[0])
+                for page_num in range(len(doc))
+                for img_index, img in enumerate(doc[page_num].get_images())
+            ]
+            # 每页重复引用的同一图片（xref 相同）只提取和识别一次
+            xrefs = list(dict.fromkeys(xref for _, _, xref in image_refs))
+            image_bytes = (doc.extract_image(xref)["image"] for xref in xrefs)
+            ocr_texts = dict(zip(xrefs, ocr_images(image_bytes, lang='chi_sim+eng')))
+            for page_num, img_index, xref in image_refs:
+                page_map[page_num]["images"].append({
+                    "index": img_index,
+                    "content": f"图片 {img_index + 1}",
+                    "ocr_text": ocr_texts[xref].strip()
+                })
+        doc.close()
+        
         return self._process_content(page_map, method, metadata)
 
-    def _parse_markdown(self, file_content: bytes, method: str, metadata: dict) -> dict:
+    def _parse_markdown(self, file_path: str, method: str, metadata: dict) -> dict:
         """解析Markdown文档"""
-        content = file_content.decode('utf-8')
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return self._parse_markdown_text(content, method, metadata)
+
+    def _parse_markdown_text(self, content: str, method: str, metadata: dict) -> dict:
+        """解析Markdown文本"""
         html = markdown.markdown(content)
         
         # 提取图片
@@ -127,16 +134,17 @@ class ParsingService:
             ]
         }
 
-    def _parse_docx(self, file_content: bytes, method: str, metadata: dict) -> dict:
+    def _parse_docx(self, file_path: str, method: str, metadata: dict) -> dict:
         """解析Word文档"""
-        result = mammoth.convert_to_markdown(io.BytesIO(file_content))
+        with open(file_path, 'rb') as f:
+            result = mammoth.convert_to_markdown(f)
         markdown_content = result.value
         
-        return self._parse_markdown(markdown_content.encode('utf-8'), method, metadata)
+        return self._parse_markdown_text(markdown_content, method, metadata)
 
-    def _parse_excel(self, file_content: bytes, method: str, metadata: dict) -> dict:
+    def _parse_excel(self, file_path: str, method: str, metadata: dict) -> dict:
         """解析Excel文档"""
-        wb = openpyxl.load_workbook(io.BytesIO(file_content))
+        wb = openpyxl.load_workbook(file_path)
         content = []
         
         for sheet_name in wb.sheetnames:
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+from utils.config import RERANK_CONFIG
+from utils.lru_cache import TTLLRUCache
+
+try:
+    import torch
+    from sentence_transformers import CrossEncoder  # 可选依赖：pip install sentence-transformers
+except ImportError:
+    torch = None
+    CrossEncoder = None
+
+logger = logging.getLogger(__name__)
+
+# 交叉编码器和打分缓存在进程内共享（RerankService 按请求创建）
+_model = None
+_model_lock = threading.Lock()
+_score_cache = TTLLRUCache(
+    max_entries=RERANK_CONFIG["score_cache_entries"],
+    ttl_seconds=RERANK_CONFIG["score_cache_ttl_seconds"]
+)
+
+def _load_model():
+    """
+    加载交叉编码器，只在第一次调用时真正加载
+
+    配置 quantize 时对 Linear 层做 int8 动态量化，CPU 推理更快、内存占用更小。
+    """
+    global _model
+    with _model_lock:
+        if _model is not None:
+            return _model
+        if CrossEncoder is None:
+            raise RuntimeError("重排序需要安装 sentence-transformers: pip install sentence-transformers")
+
+        start_time = time.time()
+        model = CrossEncoder(RERANK_CONFIG["model"], max_length=RERANK_CONFIG["max_length"], device="cpu")
+        if RERANK_CONFIG.get("quantize"):
+            try:
+                model.model = torch.quantization.quantize_dynamic(
+                    model.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            except Exception as e:
+                logger.warning(f"Dynamic quantization failed, using float model: {str(e)}")
+        logger.info(f"Loaded rerank model {RERANK_CONFIG['model']} | {time.time() - start_time:.2f}s")
+        _model = model
+        return _model
+
+
+class RerankService:
+    """
+    交叉编码器重排序服务
+
+    对 (查询, 文本块) 对按批打分并按得分重新排序。得分以 (查询哈希, 块ID) 为键缓存，
+    同一查询重复检索时只为新出现的块打分。
+    """
+    def __init__(self):
+        """
+        初始化重排序服务
+        """
+        self.batch_size = RERANK_CONFIG["batch_size"]
+        self.model_name = RERANK_CONFIG["model"]
+
+    @staticmethod
+    def chunk_key(result: Dict[str, Any]) -> str:
+        """
+        生成搜索结果对应的块ID：来源文档 + 块序号 + 内容哈希
+
+        参数:
+            result: 搜索结果，包含 text 和 metadata
+
+        返回:
+            块ID字符串
+        """
+        metadata = result.get("metadata") or {}
+        text_hash = hashlib.sha256(str(result.get("text", "")).encode("utf-8")).hexdigest()[:16]
+        return f"{metadata.get('source', '')}:{metadata.get('chunk', '')}:{text_hash}"
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """
+        对候选结果重排序并返回前 top_k 个
+
+        参数:
+            query: 查询文本
+            results: 候选搜索结果
+            top_k: 返回的最大结果数量
+
+        返回:
+            按 rerank_score 降序的结果，原始相似度保留在 score 字段
+        """
+        if not results:
+            return []
+
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        keys = [(self.model_name, query_hash, self.chunk_key(result)) for result in results]
+        scores = [_score_cache.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            start_time = time.time()
+            model = _load_model()
+            pairs = [(query, str(results[i].get("text", ""))) for i in missing]
+            predicted = model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                _score_cache.set(keys[i], scores[i])
+            logger.info(
+                f"Reranked {len(missing)} pairs ({len(results) - len(missing)} cached) "
+                f"in {time.time() - start_time:.2f}s"
+            )
+
+        order = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [{**results[i], "rerank_score": scores[i]} for i in order]
+
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """获取重排序打分缓存的命中统计"""
+        return _score_cache.stats()
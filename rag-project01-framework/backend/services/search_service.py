@@ -1,14 +1,77 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Union
 import logging
 from datetime import datetime
-from pymilvus import connections, Collection, utility
 from services.embedding_service import EmbeddingService
-from utils.config import VectorDBProvider, MILVUS_CONFIG
+from services.milvus_manager import get_milvus_manager
+from services.numpy_vector_store import get_numpy_vector_store
+from services.lexical_index_service import LexicalIndexService
+from services.rerank_service import RerankService
+from services.artifact_catalog import get_artifact_catalog
+from utils.config import VectorDBProvider, MILVUS_CONFIG, QUERY_EMBEDDING_CACHE_CONFIG, SEARCH_CONFIG, RERANK_CONFIG
+from utils.lru_cache import TTLLRUCache
+import numpy as np
 import os
 import json
+import unicodedata
 
 logger = logging.getLogger(__name__)
 
+# 搜索结果中返回的集合字段
+SEARCH_OUTPUT_FIELDS = [
+    "content",
+    "document_name",
+    "chunk_id",
+    "total_chunks",
+    "word_count",
+    "page_number",
+    "page_range",
+    "embedding_provider",
+    "embedding_model",
+    "embedding_timestamp"
+]
+
+# 较新的集合才有的字段，只在集合 schema 中存在时才请求
+OPTIONAL_OUTPUT_FIELDS = ["page_refs"]
+
+def output_fields_for(collection: Any) -> List[str]:
+    """根据集合 schema 确定搜索/查询时请求的输出字段"""
+    available = {field.name for field in collection.schema.fields}
+    return SEARCH_OUTPUT_FIELDS + [field for field in OPTIONAL_OUTPUT_FIELDS if field in available]
+
+# 查询向量缓存在进程内共享（SearchService 按请求创建）
+_query_embedding_cache = TTLLRUCache(
+    max_entries=QUERY_EMBEDDING_CACHE_CONFIG["max_entries"],
+    ttl_seconds=QUERY_EMBEDDING_CACHE_CONFIG["ttl_seconds"]
+)
+
+def normalize_query(query: str) -> str:
+    """规范化查询文本：Unicode NFKC 归一化并合并空白字符"""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+def load_query_embedding_cache() -> int:
+    """从磁盘加载查询向量缓存，未配置持久化路径时不做任何操作"""
+    path = QUERY_EMBEDDING_CACHE_CONFIG.get("persist_path")
+    if not path:
+        return 0
+    try:
+        loaded = _query_embedding_cache.load(path)
+        logger.info(f"Loaded {loaded} cached query embeddings from {path}")
+        return loaded
+    except Exception as e:
+        logger.error(f"Error loading query embedding cache: {str(e)}")
+        return 0
+
+def save_query_embedding_cache() -> None:
+    """将查询向量缓存保存到磁盘，未配置持久化路径时不做任何操作"""
+    path = QUERY_EMBEDDING_CACHE_CONFIG.get("persist_path")
+    if not path:
+        return
+    try:
+        _query_embedding_cache.save(path)
+        logger.info(f"Saved query embedding cache to {path}")
+    except Exception as e:
+        logger.error(f"Error saving query embedding cache: {str(e)}")
+
 class SearchService:
     """
     搜索服务类，负责向量数据库的连接和向量搜索功能
@@ -32,7 +95,8 @@ class SearchService:
             List[Dict[str, str]]: 支持的向量数据库提供商列表
         """
         return [
-            {"id": VectorDBProvider.MILVUS.value, "name": "Milvus"}
+            {"id": VectorDBProvider.MILVUS.value, "name": "Milvus"},
+            {"id": VectorDBProvider.NUMPY.value, "name": "NumPy"}
         ]
 
     def list_collections(self, provider: str = VectorDBProvider.MILVUS.value) -> List[Dict[str, Any]]:
@@ -49,17 +113,22 @@ class SearchService:
             Exception: 连接或查询集合时发生错误
         """
         try:
-            connections.connect(
-                alias="default",
-                uri=self.milvus_uri
-            )
+            if provider == VectorDBProvider.NUMPY:
+                store = get_numpy_vector_store()
+                return [
+                    {"id": name, "name": name, "count": store.get_collection_info(name)["num_entities"]}
+                    for name in store.list_collections()
+                ]
+            
+            manager = get_milvus_manager(self.milvus_uri)
             
             collections = []
-            collection_names = utility.list_collections()
+            collection_names = manager.list_collections()
             
             for name in collection_names:
                 try:
-                    collection = Collection(name)
+                    # 只读取实体数量，不需要把集合加载到内存
+                    collection = manager.get_collection(name, load=False)
                     collections.append({
                         "id": name,
                         "name": name,
@@ -73,8 +142,73 @@ class SearchService:
         except Exception as e:
             logger.error(f"Error listing collections: {str(e)}")
             raise
-        finally:
-            connections.disconnect("default")
+
+    def get_query_embedding(self, query: str, provider: str, model: str) -> List[float]:
+        """
+        获取查询向量，优先读取进程内的查询向量缓存
+        
+        Args:
+            query (str): 查询文本
+            provider (str): 嵌入提供商
+            model (str): 嵌入模型名称
+            
+        Returns:
+            List[float]: 查询向量
+        """
+        normalized = normalize_query(query)
+        key = (str(getattr(provider, "value", provider)), model, normalized)
+        embedding = _query_embedding_cache.get(key)
+        if embedding is not None:
+            logger.info("Query embedding cache hit")
+            return embedding
+        
+        embedding = self.embedding_service.create_single_embedding(
+            normalized,
+            provider=provider,
+            model=model
+        )
+        _query_embedding_cache.set(key, [float(x) for x in embedding])
+        return embedding
+
+    def get_query_embeddings(self, queries: Sequence[str], provider: str, model: str) -> np.ndarray:
+        """
+        批量获取查询向量，缓存未命中的查询合并为一次批量嵌入调用
+        
+        Args:
+            queries (Sequence[str]): 查询文本列表
+            provider (str): 嵌入提供商
+            model (str): 嵌入模型名称
+            
+        Returns:
+            np.ndarray: 形状为 (len(queries), dim) 的 float32 查询向量矩阵
+        """
+        provider_key = str(getattr(provider, "value", provider))
+        normalized = [normalize_query(query) for query in queries]
+        vectors: Dict[str, List[float]] = {}
+        for text in dict.fromkeys(normalized):
+            embedding = _query_embedding_cache.get((provider_key, model, text))
+            if embedding is not None:
+                vectors[text] = embedding
+        
+        missing = [text for text in dict.fromkeys(normalized) if text not in vectors]
+        logger.info(f"Query embeddings: {len(normalized) - len(missing)} cached, {len(missing)} to embed")
+        if missing:
+            embeddings = self.embedding_service.create_query_embeddings(missing, provider=provider, model=model)
+            for text, embedding in zip(missing, embeddings):
+                embedding = [float(x) for x in embedding]
+                _query_embedding_cache.set((provider_key, model, text), embedding)
+                vectors[text] = embedding
+        
+        return np.asarray([vectors[text] for text in normalized], dtype=np.float32)
+
+    def get_query_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取查询向量缓存的命中统计
+        
+        Returns:
+            Dict[str, Any]: 条目数、命中/未命中次数和命中率
+        """
+        return _query_embedding_cache.stats()
 
     def save_search_results(self, query: str, collection_id: str, results: List[Dict[str, Any]]) -> str:
         """
@@ -108,6 +242,7 @@ class SearchService:
             
             with open(filepath, "w", encoding="utf-8") as f:
                 json.dump(search_data, f, ensure_ascii=False, indent=2)
+            get_artifact_catalog().upsert("search_result", filepath, header=search_data)
             
             logger.info(f"Successfully saved results to: {filepath}")
             return filepath
@@ -122,7 +257,10 @@ class SearchService:
                     top_k: int = 3, 
                     threshold: float = 0.7,
                     word_count_threshold: int = 20,
-                    save_results: Any = None) -> Dict[str, Any]:
+                    save_results: Any = None,
+                    search_mode: str = "vector",
+                    provider: str = VectorDBProvider.MILVUS.value,
+                    rerank: bool = False) -> Dict[str, Any]:
         """
         执行向量搜索
         
@@ -133,6 +271,9 @@ class SearchService:
             threshold (float): 相似度阈值，低于此值的结果将被过滤，默认为0.7
             word_count_threshold (int): 文本字数阈值，低于此值的结果将被过滤，默认为20
             save_results (bool): 是否保存搜索结果，默认为False
+            search_mode (str): "vector" 为向量检索，"hybrid" 为向量与 BM25 词法检索的融合
+            provider (str): 向量数据库提供商，milvus 或 numpy
+            rerank (bool): 是否先多取 RERANK_CONFIG["candidates"] 个候选，再用交叉编码器重排序取前 top_k
             
         Returns:
             Dict[str, Any]: 包含搜索结果的字典，如果保存结果则包含保存路径
@@ -158,97 +299,98 @@ class SearchService:
             logger.info(f"- Threshold: {threshold}")
             logger.info(f"- Word Count Threshold: {word_count_threshold}")
             logger.info(f"- Save Results: {save_results} (type: {type(save_results)}, value: {save_results})")
+            logger.info(f"- Search Mode: {search_mode}")
+            logger.info(f"- Rerank: {rerank}")
+            if search_mode not in ("vector", "hybrid"):
+                raise ValueError(f"Unsupported search mode: {search_mode}")
 
             logger.info(f"Starting search with parameters - Collection: {collection_id}, Query: {query}, Top K: {top_k}")
             
-            # 连接到 Milvus
-            logger.info(f"Connecting to Milvus at {self.milvus_uri}")
-            connections.connect(
-                alias="default",
-                uri=self.milvus_uri
-            )
-            
-            # 获取collection
-            logger.info(f"Loading collection: {collection_id}")
-            collection = Collection(collection_id)
-            collection.load()
-            
-            # 记录collection的基本信息
-            logger.info(f"Collection info - Entities: {collection.num_entities}")
-            
-            # 从collection中读取embedding配置
-            logger.info("Querying sample entity for embedding configuration")
-            sample_entity = collection.query(
-                expr="id >= 0", 
-                output_fields=["embedding_provider", "embedding_model"],
-                limit=1
-            )
-            if not sample_entity:
-                logger.error(f"Collection {collection_id} is empty")
-                raise ValueError(f"Collection {collection_id} is empty")
-            
-            logger.info(f"Sample entity configuration: {sample_entity[0]}")
+            # 复用进程级的 Milvus 连接、已加载的集合句柄和嵌入配置
+            if provider != VectorDBProvider.NUMPY:
+                collection = get_milvus_manager(self.milvus_uri).get_collection(collection_id)
+            embedding_config = self._get_embedding_config(provider, collection_id)
+            logger.info(f"Collection embedding configuration: {embedding_config}")
             
             # 使用collection中存储的配置创建查询向量
             logger.info("Creating query embedding")
-            query_embedding = self.embedding_service.create_single_embedding(
+            query_embedding = self.get_query_embedding(
                 query,
-                provider=sample_entity[0]["embedding_provider"],
-                model=sample_entity[0]["embedding_model"]
+                provider=embedding_config["embedding_provider"],
+                model=embedding_config["embedding_model"]
             )
             logger.info(f"Query embedding created with dimension: {len(query_embedding)}")
             
-            # 执行搜索
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
-            logger.info(f"Executing search with params: {search_params}")
-            logger.info(f"Word count threshold filter: word_count >= {word_count_threshold}")
+            # 重排序时先多取候选
+            fetch_k = max(top_k, int(RERANK_CONFIG["candidates"])) if rerank else top_k
             
-            results = collection.search(
-                data=[query_embedding],
-                anns_field="vector",
-                param=search_params,
-                limit=top_k,
-                expr=f"word_count >= {word_count_threshold}",
-                output_fields=[
-                    "content",
-                    "document_name",
-                    "chunk_id",
-                    "total_chunks",
-                    "word_count",
-                    "page_number",
-                    "page_range",
-                    "embedding_provider",
-                    "embedding_model",
-                    "embedding_timestamp"
-                ]
-            )
+            if search_mode == "hybrid":
+                processed_results = self._hybrid_search(
+                    provider,
+                    collection_id,
+                    query,
+                    query_embedding,
+                    top_k=fetch_k,
+                    threshold=threshold,
+                    word_count_threshold=word_count_threshold
+                )
+                raw_count = len(processed_results)
+            elif provider == VectorDBProvider.NUMPY:
+                processed_results = self._vector_search(
+                    provider,
+                    collection_id,
+                    np.asarray([query_embedding], dtype=np.float32),
+                    fetch_k,
+                    np.asarray([threshold], dtype=np.float32),
+                    np.asarray([word_count_threshold])
+                )[0]
+                raw_count = len(processed_results)
+            else:
+                # 执行搜索
+                search_params = {
+                    "metric_type": "COSINE",
+                    "params": {"nprobe": 10}
+                }
+                logger.info(f"Executing search with params: {search_params}")
+                logger.info(f"Word count threshold filter: word_count >= {word_count_threshold}")
+            
+                results = collection.search(
+                    data=[query_embedding],
+                    anns_field="vector",
+                    param=search_params,
+                    limit=fetch_k,
+                    expr=f"word_count >= {word_count_threshold}",
+                    output_fields=output_fields_for(collection)
+                )
             
-            # 处理结果
-            processed_results = []
-            logger.info(f"Raw search results count: {len(results[0])}")
-            
-            for hits in results:
-                for hit in hits:
-                    word_count = hit.entity.get('word_count') or len(hit.entity.content.split())
-                    logger.info(f"Processing hit - Score: {hit.score}, Word Count: {word_count} (原始值: {hit.entity.get('word_count')})")
-                    if hit.score >= threshold and word_count >= word_count_threshold:
-                        processed_results.append({
-                            "text": hit.entity.content,
-                            "score": float(hit.score),
-                            "metadata": {
-                                "source": hit.entity.document_name,
-                                "page": hit.entity.page_number,
-                                "chunk": hit.entity.chunk_id,
-                                "total_chunks": hit.entity.total_chunks,
-                                "page_range": hit.entity.page_range,
-                                "embedding_provider": hit.entity.embedding_provider,
-                                "embedding_model": hit.entity.embedding_model,
-                                "embedding_timestamp": hit.entity.embedding_timestamp
-                            }
-                        })
+                # 处理结果
+                processed_results = []
+                raw_count = len(results[0])
+                logger.info(f"Raw search results count: {raw_count}")
+            
+                for hits in results:
+                    for hit in hits:
+                        word_count = hit.entity.get('word_count') or len(hit.entity.content.split())
+                        logger.info(f"Processing hit - Score: {hit.score}, Word Count: {word_count} (原始值: {hit.entity.get('word_count')})")
+                        if hit.score >= threshold and word_count >= word_count_threshold:
+                            processed_results.append({
+                                "text": hit.entity.content,
+                                "score": float(hit.score),
+                                "metadata": {
+                                    "source": hit.entity.document_name,
+                                    "page": hit.entity.page_number,
+                                    "chunk": hit.entity.chunk_id,
+                                    "total_chunks": hit.entity.total_chunks,
+                                    "page_range": hit.entity.page_range,
+                                    "page_refs": hit.entity.get("page_refs") or hit.entity.page_range,
+                                    "embedding_provider": hit.entity.embedding_provider,
+                                    "embedding_model": hit.entity.embedding_model,
+                                    "embedding_timestamp": hit.entity.embedding_timestamp
+                                }
+                            })
+
+            if rerank:
+                processed_results = RerankService().rerank(query, processed_results, top_k)
 
             logger.info(f"过滤后有效结果数量: {len(processed_results)}")
 
@@ -283,7 +425,7 @@ class SearchService:
                 else:
                     logger.warning(
                         "⚠️ 跳过保存 | 原因: processed_results为空 | "
-                        f"原始结果数={len(results[0])} | "
+                        f"原始结果数={raw_count} | "
                         f"过滤阈值={threshold}/{word_count_threshold}"
                     )
             
@@ -291,6 +433,333 @@ class SearchService:
             
         except Exception as e:
             logger.error(f"Error performing search: {str(e)}")
+            # 集合可能已被删除或重建，丢弃缓存的句柄
+            get_milvus_manager(self.milvus_uri).invalidate(collection_id)
+            raise
+
+    def search_many(self,
+                    queries: Sequence[str],
+                    collection_id: str,
+                    top_k: int = 3,
+                    threshold: Union[float, Sequence[float]] = 0.7,
+                    word_count_threshold: Union[int, Sequence[int]] = 20,
+                    provider: str = VectorDBProvider.MILVUS.value) -> List[List[Dict[str, Any]]]:
+        """
+        对同一集合批量执行向量搜索
+        
+        所有查询向量一次批量计算，并作为多向量请求交给一次 collection.search；
+        相似度和字数阈值可以按查询分别指定，过滤在得分矩阵上向量化完成。
+        
+        Args:
+            queries (Sequence[str]): 查询文本列表
+            collection_id (str): 要搜索的集合ID
+            top_k (int): 每个查询返回的最大结果数量
+            threshold (float | Sequence[float]): 相似度阈值，单个值或与 queries 等长的列表
+            word_count_threshold (int | Sequence[int]): 字数阈值，单个值或与 queries 等长的列表
+            provider (str): 向量数据库提供商，milvus 或 numpy
+            
+        Returns:
+            List[List[Dict[str, Any]]]: 与 queries 顺序一致的结果列表，每项格式同 search
+            
+        Raises:
+            ValueError: 阈值列表长度与查询数量不一致
+        """
+        if not queries:
+            return []
+        thresholds = self._per_query(threshold, len(queries), "threshold", float)
+        word_count_thresholds = self._per_query(word_count_threshold, len(queries), "word_count_threshold", int)
+        
+        try:
+            embedding_config = self._get_embedding_config(provider, collection_id)
+            query_vectors = self.get_query_embeddings(
+                queries,
+                provider=embedding_config["embedding_provider"],
+                model=embedding_config["embedding_model"]
+            )
+            all_results = self._vector_search(
+                provider, collection_id, query_vectors, top_k, thresholds, word_count_thresholds
+            )
+            
+            logger.info(
+                f"Batch search | collection: {collection_id} | queries: {len(queries)} | "
+                f"results: {sum(len(r) for r in all_results)}"
+            )
+            return all_results
+            
+        except Exception as e:
+            logger.error(f"Error performing batch search: {str(e)}")
+            get_milvus_manager(self.milvus_uri).invalidate(collection_id)
             raise
-        finally:
-            connections.disconnect("default") 
\ No newline at end of file
+
+    async def search_batch(self,
+                           queries: Sequence[str],
+                           collection_id: str,
+                           top_k: int = 3,
+                           threshold: Union[float, Sequence[float]] = 0.7,
+                           word_count_threshold: Union[int, Sequence[int]] = 20,
+                           provider: str = VectorDBProvider.MILVUS.value) -> Dict[str, Any]:
+        """
+        批量向量搜索
+        
+        Args:
+            queries (Sequence[str]): 查询文本列表
+            collection_id (str): 要搜索的集合ID
+            top_k (int): 每个查询返回的最大结果数量
+            threshold (float | Sequence[float]): 相似度阈值
+            word_count_threshold (int | Sequence[int]): 字数阈值
+            provider (str): 向量数据库提供商，milvus 或 numpy
+            
+        Returns:
+            Dict[str, Any]: {"results": [{"query": ..., "results": [...]}, ...]}
+        """
+        results = self.search_many(
+            queries,
+            collection_id=collection_id,
+            top_k=top_k,
+            threshold=threshold,
+            word_count_threshold=word_count_threshold,
+            provider=provider
+        )
+        return {
+            "results": [
+                {"query": query, "results": query_results}
+                for query, query_results in zip(queries, results)
+            ]
+        }
+
+    def _get_embedding_config(self, provider: str, collection_id: str) -> Dict[str, str]:
+        """获取集合使用的嵌入提供商和模型"""
+        if provider == VectorDBProvider.NUMPY:
+            return get_numpy_vector_store().get_embedding_config(collection_id)
+        return get_milvus_manager(self.milvus_uri).get_embedding_config(collection_id)
+
+    def _vector_search(self,
+                       provider: str,
+                       collection_id: str,
+                       query_vectors: np.ndarray,
+                       top_k: int,
+                       thresholds: np.ndarray,
+                       word_count_thresholds: np.ndarray) -> List[List[Dict[str, Any]]]:
+        """
+        在指定向量库中执行多向量检索
+        
+        Args:
+            provider (str): 向量数据库提供商
+            collection_id (str): 集合ID
+            query_vectors (np.ndarray): 查询向量矩阵
+            top_k (int): 每个查询的最大结果数量
+            thresholds (np.ndarray): 每个查询的相似度阈值
+            word_count_thresholds (np.ndarray): 每个查询的字数阈值
+            
+        Returns:
+            List[List[Dict[str, Any]]]: 每个查询通过过滤的结果
+        """
+        if provider == VectorDBProvider.NUMPY:
+            store = get_numpy_vector_store()
+            hits = store.search(
+                collection_id,
+                query_vectors,
+                top_k,
+                score_threshold=thresholds,
+                min_values={"word_count": word_count_thresholds}
+            )
+            return [
+                [
+                    self._format_result(record, score)
+                    for record, (_, score) in zip(store.get_records(collection_id, [row for row, _ in query_hits]), query_hits)
+                ]
+                for query_hits in hits
+            ]
+        
+        collection = get_milvus_manager(self.milvus_uri).get_collection(collection_id)
+        search_params = {
+            "metric_type": "COSINE",
+            "params": {"nprobe": 10}
+        }
+        # 服务端表达式只能是整批共用的条件，按最小字数阈值预过滤，其余在本地按查询过滤
+        expr = f"word_count >= {int(word_count_thresholds.min())}"
+        
+        all_results = []
+        max_batch = max(1, int(SEARCH_CONFIG["max_batch_queries"]))
+        for start in range(0, len(query_vectors), max_batch):
+            end = min(start + max_batch, len(query_vectors))
+            results = collection.search(
+                data=np.asarray(query_vectors[start:end]).tolist(),
+                anns_field="vector",
+                param=search_params,
+                limit=top_k,
+                expr=expr,
+                output_fields=output_fields_for(collection)
+            )
+            all_results.extend(self._filter_hits(
+                results, thresholds[start:end], word_count_thresholds[start:end], top_k
+            ))
+        return all_results
+
+    def _fetch_chunks(self, provider: str, collection_id: str, chunk_ids: List[int],
+                      word_count_threshold: int) -> List[Dict[str, Any]]:
+        """按 chunk_id 从集合中读取块内容，只返回满足字数阈值的块"""
+        if provider == VectorDBProvider.NUMPY:
+            store = get_numpy_vector_store()
+            rows = store.find_rows(collection_id, "chunk_id", chunk_ids)
+            return [
+                record for record in store.get_records(collection_id, rows)
+                if record["word_count"] >= word_count_threshold
+            ]
+        collection = get_milvus_manager(self.milvus_uri).get_collection(collection_id)
+        return collection.query(
+            expr=f"chunk_id in {chunk_ids} and word_count >= {word_count_threshold}",
+            output_fields=output_fields_for(collection)
+        )
+
+    @staticmethod
+    def _per_query(value: Any, count: int, name: str, dtype: type) -> np.ndarray:
+        """把单个阈值或阈值列表展开为长度为 count 的数组"""
+        if isinstance(value, (list, tuple, np.ndarray)):
+            if len(value) != count:
+                raise ValueError(f"{name} 列表长度 {len(value)} 与查询数量 {count} 不一致")
+            return np.asarray(value, dtype=dtype)
+        return np.full(count, dtype(value), dtype=dtype)
+
+    @staticmethod
+    def _filter_hits(results, thresholds: np.ndarray, word_count_thresholds: np.ndarray,
+                     top_k: int) -> List[List[Dict[str, Any]]]:
+        """
+        按查询过滤多向量搜索结果
+        
+        Args:
+            results: collection.search 返回的结果，每个查询一组命中
+            thresholds (np.ndarray): 每个查询的相似度阈值
+            word_count_thresholds (np.ndarray): 每个查询的字数阈值
+            top_k (int): 每个查询的最大命中数
+            
+        Returns:
+            List[List[Dict[str, Any]]]: 每个查询通过过滤的结果
+        """
+        hit_groups = [list(hits) for hits in results]
+        # 命中不足 top_k 的查询用 -inf 填充，使得分和字数构成规则矩阵
+        scores = np.full((len(hit_groups), top_k), -np.inf, dtype=np.float32)
+        word_counts = np.zeros((len(hit_groups), top_k), dtype=np.int64)
+        for row, hits in enumerate(hit_groups):
+            for col, hit in enumerate(hits[:top_k]):
+                scores[row, col] = hit.score
+                word_counts[row, col] = hit.entity.get("word_count") or len(str(hit.entity.get("content")).split())
+        
+        keep = (scores >= thresholds[:, None]) & (word_counts >= word_count_thresholds[:, None])
+        
+        filtered = []
+        for row, hits in enumerate(hit_groups):
+            filtered.append([
+                SearchService._format_result(hits[col].entity, float(scores[row, col]))
+                for col in np.flatnonzero(keep[row])
+            ])
+        return filtered
+
+    @staticmethod
+    def _format_result(entity: Any, score: float) -> Dict[str, Any]:
+        """把命中实体（搜索命中或查询结果行）转换为统一的结果格式"""
+        return {
+            "text": entity.get("content"),
+            "score": score,
+            "metadata": {
+                "source": entity.get("document_name"),
+                "page": entity.get("page_number"),
+                "chunk": entity.get("chunk_id"),
+                "total_chunks": entity.get("total_chunks"),
+                "page_range": entity.get("page_range"),
+                "page_refs": entity.get("page_refs") or entity.get("page_range"),
+                "embedding_provider": entity.get("embedding_provider"),
+                "embedding_model": entity.get("embedding_model"),
+                "embedding_timestamp": entity.get("embedding_timestamp")
+            }
+        }
+
+    def _hybrid_search(self,
+                       provider: str,
+                       collection_id: str,
+                       query: str,
+                       query_embedding: List[float],
+                       top_k: int,
+                       threshold: float,
+                       word_count_threshold: int) -> List[Dict[str, Any]]:
+        """
+        混合检索：向量检索与 BM25 词法检索的结果按倒数排名融合(RRF)
+        
+        两路各取 SEARCH_CONFIG["hybrid_candidates"] 个候选，按 chunk_id 合并，
+        融合得分为 sum(1 / (rrf_k + 排名))。只在词法一路出现的块从集合中补取内容。
+        词法索引包含嵌入去重时合并掉的块，这些命中按去重映射计入保留块的得分。
+        集合没有对应的词法索引时退化为向量检索。
+        
+        Args:
+            provider (str): 向量数据库提供商
+            collection_id (str): 集合ID
+            query (str): 查询文本
+            query_embedding (List[float]): 查询向量
+            top_k (int): 返回的最大结果数量
+            threshold (float): 向量相似度阈值，只作用于向量一路
+            word_count_threshold (int): 文本字数阈值
+            
+        Returns:
+            List[Dict[str, Any]]: 融合后的结果，score 为融合得分，
+            vector_score/lexical_score 为各路原始得分（未命中时为 None）
+        """
+        candidates = max(top_k, int(SEARCH_CONFIG["hybrid_candidates"]))
+        rrf_k = SEARCH_CONFIG["rrf_k"]
+        
+        dense_results = self._vector_search(
+            provider,
+            collection_id,
+            np.asarray([query_embedding], dtype=np.float32),
+            candidates,
+            np.asarray([threshold], dtype=np.float32),
+            np.asarray([word_count_threshold])
+        )[0]
+        
+        lexical_service = LexicalIndexService()
+        index_id = lexical_service.get_index_for_collection(collection_id)
+        if index_id is None:
+            logger.warning(f"No lexical index linked to {collection_id}, falling back to vector search")
+            return dense_results[:top_k]
+        lexical_results = lexical_service.search(index_id, query, top_k=candidates)
+        logger.info(f"Hybrid candidates | vector: {len(dense_results)} | lexical: {len(lexical_results)}")
+        
+        fused: Dict[Any, Dict[str, Any]] = {}
+        for rank, result in enumerate(dense_results, 1):
+            fused[result["metadata"]["chunk"]] = {
+                "result": result,
+                "rrf": 1.0 / (rrf_k + rank),
+                "vector_score": result["score"],
+                "lexical_score": None
+            }
+        duplicates = lexical_service.get_duplicate_map(collection_id)
+        for rank, hit in enumerate(lexical_results, 1):
+            chunk_id = duplicates.get(hit["chunk_id"], hit["chunk_id"])
+            entry = fused.setdefault(
+                chunk_id, {"result": None, "rrf": 0.0, "vector_score": None, "lexical_score": None}
+            )
+            entry["rrf"] += 1.0 / (rrf_k + rank)
+            entry["lexical_score"] = max(entry["lexical_score"] or 0.0, hit["score"])
+        
+        ranked = sorted(fused.items(), key=lambda item: item[1]["rrf"], reverse=True)
+        
+        # 补取只被词法检索命中的块
+        missing_ids = [int(chunk_id) for chunk_id, entry in ranked[:top_k * 2] if entry["result"] is None]
+        if missing_ids:
+            for row in self._fetch_chunks(provider, collection_id, missing_ids, word_count_threshold):
+                entry = fused.get(row["chunk_id"])
+                if entry is not None and entry["result"] is None:
+                    entry["result"] = self._format_result(row, 0.0)
+        
+        results = []
+        for _, entry in ranked:
+            if entry["result"] is None:
+                continue
+            results.append({
+                **entry["result"],
+                "score": float(entry["rrf"]),
+                "vector_score": entry["vector_score"],
+                "lexical_score": entry["lexical_score"]
+            })
+            if len(results) >= top_k:
+                break
+        return results
@@ -0,0 +1,155 @@
+import bisect
+import json
+import logging
+import re
+import threading
+from typing import Dict, List, Tuple
+from utils.config import TOKENIZER_CONFIG
+from utils.text_utils import CJK_RANGES
+
+try:
+    from transformers import AutoTokenizer  # 可选依赖：pip install transformers
+except ImportError:
+    AutoTokenizer = None
+
+try:
+    import tiktoken  # 可选依赖：pip install tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# 没有对应分词器时的估算规则：每个中日韩文字一个 token，其余每个词片段一个 token
+_ESTIMATE_PATTERN = re.compile(rf"[{CJK_RANGES}]|[^\s{CJK_RANGES}]+")
+
+class TokenCounter:
+    """
+    嵌入模型的 token 计数器
+
+    HuggingFace 模型使用对应的快速分词器（Rust 实现），OpenAI 模型使用 tiktoken，
+    其他情况按字/词估算。token_starts 对整段文本分词一次并返回每个 token 的起始字符位置，
+    分块时据此得到任意片段的 token 数，无需对每个片段单独分词。
+    """
+    def __init__(self, provider: str, model: str):
+        """
+        初始化计数器并加载分词器
+
+        参数:
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+        """
+        self.provider = provider
+        self.model = model
+        self.backend = "estimate"
+        # 分词器在文本前后额外添加的 token 数（如 [CLS]、[SEP]）
+        self.special_tokens = 0
+        self._tokenizer = None
+        self._encoding = None
+        max_tokens = None
+
+        if provider == "huggingface" and AutoTokenizer is not None:
+            try:
+                self._tokenizer = AutoTokenizer.from_pretrained(model, use_fast=True)
+                if self._tokenizer.is_fast:
+                    self.backend = "huggingface"
+                    self.special_tokens = self._tokenizer.num_special_tokens_to_add()
+                    max_tokens = self._read_sentence_transformers_max_length(model)
+                    if max_tokens is None and self._tokenizer.model_max_length < 100000:
+                        max_tokens = self._tokenizer.model_max_length
+                else:
+                    self._tokenizer = None
+            except Exception as e:
+                logger.warning(f"Error loading tokenizer for {model}, using estimate: {str(e)}")
+                self._tokenizer = None
+        elif provider == "openai" and tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            self.backend = "tiktoken"
+
+        self.max_tokens = (
+            TOKENIZER_CONFIG["model_max_tokens"].get(model)
+            or max_tokens
+            or TOKENIZER_CONFIG["provider_max_tokens"].get(provider)
+            or TOKENIZER_CONFIG["default_max_tokens"]
+        )
+        logger.info(f"Token counter ready: {provider}/{model} | backend: {self.backend} | max tokens: {self.max_tokens}")
+
+    @staticmethod
+    def _read_sentence_transformers_max_length(model: str):
+        """读取 sentence-transformers 模型配置中的 max_seq_length（比分词器的上限更准确）"""
+        try:
+            from huggingface_hub import hf_hub_download
+            with open(hf_hub_download(model, "sentence_bert_config.json"), "r", encoding="utf-8") as f:
+                return json.load(f).get("max_seq_length")
+        except Exception:
+            return None
+
+    @property
+    def max_content_tokens(self) -> int:
+        """去掉特殊 token 后单个文本块可用的 token 数"""
+        return max(1, self.max_tokens - self.special_tokens)
+
+    def token_starts(self, text: str) -> List[int]:
+        """
+        对文本分词，返回每个 token 的起始字符位置（升序，不含特殊 token）
+
+        参数:
+            text: 原始文本
+
+        返回:
+            起始位置列表
+        """
+        if not text:
+            return []
+        if self.backend == "huggingface":
+            encoding = self._tokenizer(
+                text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+            )
+            return [start for start, _ in encoding["offset_mapping"]]
+        if self.backend == "tiktoken":
+            _, offsets = self._encoding.decode_with_offsets(self._encoding.encode(text, disallowed_special=()))
+            return offsets
+        return [match.start() for match in _ESTIMATE_PATTERN.finditer(text)]
+
+    def count(self, text: str) -> int:
+        """统计文本的 token 数（不含特殊 token）"""
+        return len(self.token_starts(text))
+
+    @staticmethod
+    def span_counts(starts: List[int], spans: List[Tuple[int, int]]) -> List[int]:
+        """
+        统计每个字符区间 [start, end) 内起始的 token 数
+
+        参数:
+            starts: token_starts 返回的起始位置
+            spans: 按位置升序排列、互不重叠的字符区间
+
+        返回:
+            每个区间的 token 数
+        """
+        return [bisect.bisect_left(starts, end) - bisect.bisect_left(starts, start) for start, end in spans]
+
+
+_counters: Dict[Tuple[str, str], TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+def get_token_counter(provider: str, model: str) -> TokenCounter:
+    """
+    获取指定嵌入模型的 token 计数器，分词器在进程内只加载一次
+
+    参数:
+        provider: 嵌入提供商
+        model: 嵌入模型名称
+
+    返回:
+        TokenCounter 实例
+    """
+    key = (provider, model)
+    with _counters_lock:
+        counter = _counters.get(key)
+        if counter is None:
+            counter = TokenCounter(provider, model)
+            _counters[key] = counter
+        return counter
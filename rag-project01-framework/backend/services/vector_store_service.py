@@ -1,14 +1,19 @@
 import os
 from datetime import datetime
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
 import logging
 from pathlib import Path
-from pymilvus import connections, utility
+from pymilvus import utility
 from pymilvus import Collection, DataType, FieldSchema, CollectionSchema
 from utils.config import VectorDBProvider, MILVUS_CONFIG  # Updated import
+from utils.embedding_storage import load_embedding_file, iter_vector_batches, read_embedding_header, iter_embedding_batches
+from services.milvus_manager import get_milvus_manager
+from services.numpy_vector_store import get_numpy_vector_store
+from services.lexical_index_service import LexicalIndexService
 import re
 import hashlib
+import numpy as np
 from pypinyin import lazy_pinyin  # 需要安装：pip install pypinyin
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
@@ -42,6 +47,33 @@ def generate_milvus_name(original_name: str) -> str:
     
     return cleaned.lower()  # Milvus 2.x要求小写
 
+def stable_chunk_id(document_name: str, page_range: str, content: str) -> int:
+    """
+    根据文档名、页码范围和内容哈希生成稳定的块ID
+    
+    同一文档中内容和位置都未变化的块在多次索引之间得到相同的ID，
+    取 SHA-256 的前 63 位，保证是 Milvus INT64 主键可用的非负整数。
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    digest = hashlib.sha256(f"{document_name}\x00{page_range}\x00{content_hash}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & ((1 << 63) - 1)
+
+def milvus_string_literal(value: str) -> str:
+    """将字符串转换为 Milvus 过滤表达式中的字符串字面量，转义反斜杠和双引号"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+# 增量更新时需要比较的元数据字段：块ID相同时这些字段仍可能随重新分块或去重变化
+MUTABLE_METADATA_FIELDS = ("chunk_id", "total_chunks", "page_number", "page_refs")
+
+# 去重合并后的页码引用列表字段长度
+PAGE_REFS_MAX_LENGTH = 2000
+
+def _truncate_page_refs(page_refs: str) -> str:
+    """页码引用超出字段长度时在逗号处截断"""
+    if len(page_refs) <= PAGE_REFS_MAX_LENGTH:
+        return page_refs
+    return page_refs[:PAGE_REFS_MAX_LENGTH].rsplit(",", 1)[0]
+
 class VectorDBConfig:
     """
     向量数据库配置类，用于存储和管理向量数据库的配置信息
@@ -54,7 +86,10 @@ class VectorDBConfig:
         index_types: Dict[str, str] = None,
         index_params: Dict[str, Dict[str, Any]] = None,
         persist_directory: str = None,
-        collection_metadata: Dict[str, Any] = None
+        collection_metadata: Dict[str, Any] = None,
+        insert_batch_size: int = 1000,
+        incremental: bool = False,
+        vector_dtype: str = "float32"
     ):
         """
         初始化向量数据库配置
@@ -67,6 +102,9 @@ class VectorDBConfig:
             index_params: 索引参数字典
             persist_directory: 持久化存储目录
             collection_metadata: 集合元数据
+            insert_batch_size: 每批写入的向量数
+            incremental: 是否增量更新同一个集合，而不是每次新建带时间戳的集合
+            vector_dtype: NumPy 向量库的向量存储类型（float32 或 float16）
         """
         self.provider = provider
         self.index_mode = index_mode
@@ -75,6 +113,9 @@ class VectorDBConfig:
         self.index_params = index_params
         self.persist_directory = persist_directory
         self.collection_metadata = collection_metadata
+        self.insert_batch_size = insert_batch_size
+        self.incremental = incremental
+        self.vector_dtype = vector_dtype
 
     def _get_milvus_index_type(self, index_mode: str) -> str:
         """
@@ -141,30 +182,46 @@ class VectorStoreService:
         """
         return config._get_milvus_index_params(config.index_mode)
     
-    def index_embeddings(self, embedding_file: str, config: VectorDBConfig) -> Dict[str, Any]:
+    def index_embeddings(self, embedding_file: str, config: VectorDBConfig,
+                         progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict[str, Any]:
+        """
+        将嵌入文件索引到指定的向量数据库
+        
+        参数:
+            embedding_file: 嵌入元数据文件路径
+            config: 向量数据库配置对象
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 向量总数或None)
+            
+        返回:
+            索引结果信息字典
+        """
         start_time = datetime.now()
         self.logger.info(f"开始索引流程 | 文件: {embedding_file} | 数据库: {config.provider} | 模式: {config.index_mode}")
         
         try:
-            # 读取并验证文件
-            try:
-                self.logger.debug("开始加载和验证嵌入文件...")
-                embeddings_data = self._load_embeddings(embedding_file)
-                self.logger.debug(f"文件验证完成 | embeddings数量: {len(embeddings_data['embeddings'])}")
-            except Exception as e:
-                self.logger.error(f"文件加载/验证失败: {str(e)}", exc_info=True)
-                raise
-
             # 执行索引
             result = {}
             if config.provider == VectorDBProvider.MILVUS:
+                # Milvus 按批流式写入，不整体加载嵌入文件
                 self.logger.debug("开始Milvus索引流程...")
-                result = self._index_to_milvus(embeddings_data, config)
+                result = self._index_to_milvus(embedding_file, config, progress_callback)
                 self.logger.info(f"Milvus索引完成 | 集合名称: {result.get('collection_name')}")
             elif config.provider == VectorDBProvider.CHROMA:
+                # 读取并验证文件
+                try:
+                    self.logger.debug("开始加载和验证嵌入文件...")
+                    embeddings_data = self._load_embeddings(embedding_file)
+                    self.logger.debug(f"文件验证完成 | embeddings数量: {len(embeddings_data['embeddings'])}")
+                except Exception as e:
+                    self.logger.error(f"文件加载/验证失败: {str(e)}", exc_info=True)
+                    raise
                 self.logger.debug("开始Chroma索引流程...")
                 result = self._index_to_chroma(embeddings_data, config)
                 self.logger.info(f"Chroma索引完成 | 集合名称: {result.get('collection_name')}")
+            elif config.provider == VectorDBProvider.NUMPY:
+                self.logger.debug("开始NumPy索引流程...")
+                result = self._index_to_numpy(embedding_file, config, progress_callback)
+                self.logger.info(f"NumPy索引完成 | 集合名称: {result.get('collection_name')}")
             else:
                 raise ValueError(f"Unsupported vector database provider: {config.provider}")
             
@@ -174,8 +231,12 @@ class VectorStoreService:
             return {
                 "database": config.provider,
                 "collection_name": result.get("collection_name", ""),
-                "total_vectors": len(embeddings_data["embeddings"]),
+                "total_vectors": result.get("index_size", 0),
                 "index_size": result.get("index_size", 0),
+                "inserted": result.get("inserted", result.get("index_size", 0)),
+                "deleted": result.get("deleted", 0),
+                "unchanged": result.get("unchanged", 0),
+                "incremental": bool(config.incremental),
                 "processing_time": processing_time
             }
             
@@ -188,9 +249,17 @@ class VectorStoreService:
             )
     
     def _load_embeddings(self, file_path: str) -> Dict[str, Any]:
+        """
+        读取并验证嵌入文件，向量矩阵以内存映射方式打开并放在返回字典的 vectors 字段中
+        
+        参数:
+            file_path: 嵌入元数据文件路径
+            
+        返回:
+            嵌入数据字典
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data, vectors = load_embedding_file(file_path)
             
             # 修正后的日志输出
             self.logger.debug(
@@ -227,6 +296,10 @@ class VectorStoreService:
                 if not config['check'](data[field]):
                     raise ValueError(f"字段'{field}'验证失败: {config['error']}")
             
+            if vectors.shape[1] != int(data['vector_dimension']):
+                raise ValueError(f"向量维度不匹配: 文件声明 {data['vector_dimension']}, 实际 {vectors.shape[1]}")
+            
+            data['vectors'] = vectors
             return data
             
         except json.JSONDecodeError as e:
@@ -236,33 +309,44 @@ class VectorStoreService:
             self.logger.error(f"文件验证失败: {file_path}", exc_info=True)
             raise
     
-    def _index_to_milvus(self, embeddings_data: Dict[str, Any], config: VectorDBConfig) -> Dict[str, Any]:
+    def _index_to_milvus(self, embedding_file: str, config: VectorDBConfig,
+                         progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict[str, Any]:
         """
-        将嵌入向量索引到Milvus数据库
+        将嵌入向量流式索引到Milvus数据库
+        
+        嵌入记录按 config.insert_batch_size 分批增量读取，每批以列式数据插入，
+        全部写入后再统一创建一次索引，内存占用与文档大小无关。
+        config.incremental 为 True 时改为增量更新同一个集合，见 _upsert_to_milvus。
         
         参数:
-            embeddings_data: 嵌入向量数据
+            embedding_file: 嵌入元数据文件路径
             config: 向量数据库配置对象
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 向量总数或None)
             
         返回:
             索引结果信息字典
         """
+        collection = None
         try:
             self.logger.debug("开始Milvus索引准备...")
+            embeddings_data = read_embedding_header(embedding_file)
             
             # 1. 验证必要字段
-            required_fields = ["embeddings", "vector_dimension", "embedding_provider"]
+            required_fields = ["vector_dimension", "embedding_provider"]
             for field in required_fields:
-                if field not in embeddings_data:
+                if not embeddings_data.get(field):
                     self.logger.error(f"Milvus索引缺少必要字段: {field}")
                     raise ValueError(f"Missing required field: {field}")
             
-            # 2. 生成集合名称
+            # 2. 生成集合名称（增量模式使用不带时间戳的固定名称）
             filename = embeddings_data.get("filename", "")
             base_name = Path(filename).stem if filename else "doc"
             embedding_provider = embeddings_data["embedding_provider"]
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            raw_name = f"{base_name}_{embedding_provider}_{timestamp}"
+            if config.incremental:
+                raw_name = f"{base_name}_{embedding_provider}"
+            else:
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+                raw_name = f"{base_name}_{embedding_provider}_{timestamp}"
             collection_name = generate_milvus_name(raw_name)
             
             self.logger.debug(f"生成集合名称 | 原始名称: {raw_name} → 转换后: {collection_name}")
@@ -275,7 +359,6 @@ class VectorStoreService:
             
             # 4. 验证名称合法性 - 使用新的验证方式
             try:
-                from pymilvus import utility
                 # 新版本验证方式
                 if hasattr(utility, 'check_collection_name'):
                     if not utility.check_collection_name(collection_name):
@@ -288,84 +371,52 @@ class VectorStoreService:
                 self.logger.error(f"集合名称验证失败: {str(e)}")
                 raise ValueError(f"集合名称不合法: {collection_name}")
             
-            # 5. 连接到Milvus
-            connections.connect(
-                alias="default", 
-                uri=config.uri
-            )
+            # 5. 连接到Milvus（复用进程级长连接）
+            manager = get_milvus_manager(config.uri)
+            alias = manager.connect()
             
-            self.logger.info(f"Creating collection with dimension: {vector_dim}")
-            
-            # 6. 定义字段
-            fields = [
-                {"name": "id", "dtype": "INT64", "is_primary": True, "auto_id": True},
-                {"name": "content", "dtype": "VARCHAR", "max_length": 5000},
-                {"name": "document_name", "dtype": "VARCHAR", "max_length": 255},
-                {"name": "chunk_id", "dtype": "INT64"},
-                {"name": "total_chunks", "dtype": "INT64"},
-                {"name": "word_count", "dtype": "INT64"},
-                {"name": "page_number", "dtype": "VARCHAR", "max_length": 10},
-                {"name": "page_range", "dtype": "VARCHAR", "max_length": 10},
-                # {"name": "chunking_method", "dtype": "VARCHAR", "max_length": 50},
-                {"name": "embedding_provider", "dtype": "VARCHAR", "max_length": 50},
-                {"name": "embedding_model", "dtype": "VARCHAR", "max_length": 50},
-                {"name": "embedding_timestamp", "dtype": "VARCHAR", "max_length": 50},
-                {
-                    "name": "vector",
-                    "dtype": "FLOAT_VECTOR",
-                    "dim": vector_dim,
-                    "params": self._get_milvus_index_params(config)
-                }
-            ]
-            
-            # 7. 准备数据为列表格式
-            entities = []
-            for emb in embeddings_data["embeddings"]:
-                entity = {
-                    "content": str(emb["metadata"].get("content", "")),
-                    "document_name": embeddings_data.get("filename", ""),  # 使用 filename 而不是 document_name
-                    "chunk_id": int(emb["metadata"].get("chunk_id", 0)),
-                    "total_chunks": int(emb["metadata"].get("total_chunks", 0)),
-                    "word_count": int(emb["metadata"].get("word_count", 0)),
-                    "page_number": str(emb["metadata"].get("page_number", 0)),
-                    "page_range": str(emb["metadata"].get("page_range", "")),
-                    # "chunking_method": str(emb["metadata"].get("chunking_method", "")),
-                    "embedding_provider": embeddings_data.get("embedding_provider", ""),  # 从顶层配置获取
-                    "embedding_model": embeddings_data.get("embedding_model", ""),  # 从顶层配置获取
-                    "embedding_timestamp": str(emb["metadata"].get("embedding_timestamp", "")),
-                    "vector": [float(x) for x in emb.get("embedding", [])]
-                }
-                entities.append(entity)
-            
-            self.logger.info(f"Creating Milvus collection: {collection_name}")
-            
-            # 8. 创建collection
-            field_schemas = []
-            for field in fields:
-                extra_params = {}
-                if field.get('max_length') is not None:
-                    extra_params['max_length'] = field['max_length']
-                if field.get('dim') is not None:
-                    extra_params['dim'] = field['dim']
-                if field.get('params') is not None:
-                    extra_params['params'] = field['params']
-                field_schema = FieldSchema(
-                    name=field["name"], 
-                    dtype=getattr(DataType, field["dtype"]),
-                    is_primary=field.get("is_primary", False),
-                    auto_id=field.get("auto_id", False),
-                    **extra_params
-                )
-                field_schemas.append(field_schema)
-
-            schema = CollectionSchema(fields=field_schemas, description=f"Collection for {collection_name}")
-            collection = Collection(name=collection_name, schema=schema)
+            # 关联分块时建立的词法索引，供混合检索使用
+            chunked_doc_name = embeddings_data.get("chunked_doc_name")
+            if chunked_doc_name and not LexicalIndexService().link_collection(
+                collection_name, chunked_doc_name, embeddings_data.get("duplicate_chunk_ids")
+            ):
+                self.logger.info(f"No lexical index for {chunked_doc_name}, hybrid search will fall back to vector search")
             
-            # 9. 插入数据
-            self.logger.info(f"Inserting {len(entities)} vectors")
-            insert_result = collection.insert(entities)
+            if config.incremental and manager.has_collection(collection_name):
+                return self._upsert_to_milvus(
+                    embedding_file, embeddings_data, collection_name, config, progress_callback
+                )
             
-            # 10. 创建索引
+            # 6. 创建collection
+            self.logger.info(f"Creating Milvus collection: {collection_name} | dimension: {vector_dim}")
+            collection = self._create_milvus_collection(
+                collection_name, vector_dim, config, alias, auto_id=not config.incremental
+            )
+            insert_fields = [field.name for field in collection.schema.fields if not field.auto_id]
+            
+            # 7. 按批插入列式数据，向量直接使用内存映射矩阵的切片
+            batch_size = max(1, int(config.insert_batch_size))
+            total_vectors = embeddings_data.get("total_vectors")
+            inserted = 0
+            seen_ids = set()
+            for records, vectors in iter_embedding_batches(embedding_file, batch_size):
+                if vectors.shape[1] != vector_dim:
+                    raise ValueError(f"向量维度不匹配: 文件声明 {vector_dim}, 实际 {vectors.shape[1]}")
+                columns = self._build_milvus_columns(records, vectors, embeddings_data)
+                if config.incremental:
+                    columns, _ = self._split_changed_rows(columns, seen_ids, existing_rows={})
+                if columns["vector"]:
+                    insert_result = collection.insert([columns[name] for name in insert_fields])
+                    inserted += insert_result.insert_count
+                self.logger.info(f"Inserted {inserted}/{total_vectors or '?'} vectors into {collection_name}")
+                if progress_callback:
+                    progress_callback(inserted, total_vectors)
+            
+            if inserted == 0:
+                raise ValueError("字段'embeddings'验证失败: 必须是非空数组")
+            
+            # 8. 全部写入后统一创建索引
+            collection.flush()
             index_params = {
                 "metric_type": "COSINE",
                 "index_type": self._get_milvus_index_type(config),
@@ -373,55 +424,356 @@ class VectorStoreService:
             }
             collection.create_index(field_name="vector", index_params=index_params)
             collection.load()
+            manager.register_collection(collection)
             
-            self.logger.info(f"Milvus索引成功 | 集合: {collection_name} | 向量数: {len(embeddings_data['embeddings'])}")
+            self.logger.info(f"Milvus索引成功 | 集合: {collection_name} | 向量数: {inserted}")
             
             return {
-                "index_size": len(insert_result.primary_keys),
-                "collection_name": collection_name
+                "index_size": inserted,
+                "collection_name": collection_name,
+                "inserted": inserted,
+                "updated": 0,
+                "deleted": 0,
+                "unchanged": 0
             }
             
         except Exception as e:
             self.logger.error(f"Milvus索引过程中出错: {str(e)}", exc_info=True)
+            # 清理写入失败的半成品集合
+            if collection is not None:
+                try:
+                    get_milvus_manager(config.uri).drop_collection(collection.name)
+                except Exception:
+                    pass
             raise
+
+    def _upsert_to_milvus(self, embedding_file: str, embeddings_data: Dict[str, Any], collection_name: str,
+                          config: VectorDBConfig,
+                          progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict[str, Any]:
+        """
+        增量更新已存在的集合
+        
+        以稳定的块ID（文档名 + 页码范围 + 内容哈希）为主键：新增或修改的块插入，
+        内容未变但块序号、总块数或页码引用变化的块通过 upsert 更新元数据，
+        完全未变化的块跳过，文档中已不存在的块删除。索引和加载状态保持不变。
+        
+        参数:
+            embedding_file: 嵌入元数据文件路径
+            embeddings_data: 嵌入文件的文档级字段
+            collection_name: 集合名称
+            config: 向量数据库配置对象
+            progress_callback: 可选的进度回调，参数为 (已处理向量数, 向量总数或None)
+            
+        返回:
+            索引结果信息字典，包含插入、更新、删除和未变化的块数
+        """
+        manager = get_milvus_manager(config.uri)
+        collection = manager.get_collection(collection_name)
+        
+        primary_field = next(field for field in collection.schema.fields if field.is_primary)
+        if primary_field.auto_id:
+            raise ValueError(f"集合 {collection_name} 不是以增量模式创建的，无法增量更新")
+        
+        vector_field = next(field for field in collection.schema.fields if field.name == "vector")
+        vector_dim = int(embeddings_data["vector_dimension"])
+        if int(vector_field.params.get("dim", vector_dim)) != vector_dim:
+            raise ValueError(f"向量维度与集合 {collection_name} 不一致，请使用全量索引")
+        existing_config = manager.get_embedding_config(collection_name)
+        if existing_config["embedding_model"] != embeddings_data.get("embedding_model", ""):
+            raise ValueError(f"嵌入模型与集合 {collection_name} 不一致，请使用全量索引")
+        
+        document_name = embeddings_data.get("filename", "")
+        existing_rows = self._query_milvus_rows(
+            collection, f"document_name == {milvus_string_literal(document_name)}", MUTABLE_METADATA_FIELDS
+        )
+        self.logger.info(f"增量索引 | 集合: {collection_name} | 现有块数: {len(existing_rows)}")
+        
+        insert_fields = [field.name for field in collection.schema.fields if not field.auto_id]
+        batch_size = max(1, int(config.insert_batch_size))
+        total_vectors = embeddings_data.get("total_vectors")
+        seen_ids = set()
+        inserted = 0
+        updated = 0
+        processed = 0
+        for records, vectors in iter_embedding_batches(embedding_file, batch_size):
+            if vectors.shape[1] != vector_dim:
+                raise ValueError(f"向量维度不匹配: 文件声明 {vector_dim}, 实际 {vectors.shape[1]}")
+            columns = self._build_milvus_columns(records, vectors, embeddings_data)
+            new_columns, changed_columns = self._split_changed_rows(columns, seen_ids, existing_rows)
+            if new_columns["vector"]:
+                inserted += collection.insert([new_columns[name] for name in insert_fields]).insert_count
+            if changed_columns["vector"]:
+                updated += collection.upsert([changed_columns[name] for name in insert_fields]).upsert_count
+            processed += len(records)
+            if progress_callback:
+                progress_callback(processed, total_vectors)
+        
+        if not seen_ids:
+            raise ValueError("字段'embeddings'验证失败: 必须是非空数组")
+        
+        removed_ids = list(existing_rows.keys() - seen_ids)
+        for i in range(0, len(removed_ids), 1000):
+            collection.delete(f"id in {removed_ids[i:i + 1000]}")
+        collection.flush()
+        
+        unchanged = len(seen_ids) - inserted - updated
+        self.logger.info(
+            f"增量索引完成 | 集合: {collection_name} | 新增: {inserted} | 更新: {updated} | "
+            f"删除: {len(removed_ids)} | 未变化: {unchanged}"
+        )
+        return {
+            "index_size": len(seen_ids),
+            "collection_name": collection_name,
+            "inserted": inserted,
+            "updated": updated,
+            "deleted": len(removed_ids),
+            "unchanged": unchanged
+        }
+
+    def _create_milvus_collection(self, collection_name: str, vector_dim: int, config: VectorDBConfig,
+                                  alias: str, auto_id: bool = True) -> Collection:
+        """
+        按标准字段定义创建Milvus集合
+        
+        参数:
+            collection_name: 集合名称
+            vector_dim: 向量维度
+            config: 向量数据库配置对象
+            alias: 连接别名
+            auto_id: 主键是否自动生成；增量模式使用稳定的块ID作为主键
+            
+        返回:
+            新建的 Collection 对象
+        """
+        # 定义字段
+        fields = [
+            {"name": "id", "dtype": "INT64", "is_primary": True, "auto_id": auto_id},
+            {"name": "content", "dtype": "VARCHAR", "max_length": 5000},
+            {"name": "document_name", "dtype": "VARCHAR", "max_length": 255},
+            {"name": "chunk_id", "dtype": "INT64"},
+            {"name": "total_chunks", "dtype": "INT64"},
+            {"name": "word_count", "dtype": "INT64"},
+            {"name": "page_number", "dtype": "VARCHAR", "max_length": 10},
+            {"name": "page_range", "dtype": "VARCHAR", "max_length": 32},
+            {"name": "page_refs", "dtype": "VARCHAR", "max_length": PAGE_REFS_MAX_LENGTH},
+            # {"name": "chunking_method", "dtype": "VARCHAR", "max_length": 50},
+            {"name": "embedding_provider", "dtype": "VARCHAR", "max_length": 50},
+            {"name": "embedding_model", "dtype": "VARCHAR", "max_length": 50},
+            {"name": "embedding_timestamp", "dtype": "VARCHAR", "max_length": 50},
+            {
+                "name": "vector",
+                "dtype": "FLOAT_VECTOR",
+                "dim": vector_dim,
+                "params": self._get_milvus_index_params(config)
+            }
+        ]
         
-        finally:
-            connections.disconnect("default")
+        field_schemas = []
+        for field in fields:
+            extra_params = {}
+            if field.get('max_length') is not None:
+                extra_params['max_length'] = field['max_length']
+            if field.get('dim') is not None:
+                extra_params['dim'] = field['dim']
+            if field.get('params') is not None:
+                extra_params['params'] = field['params']
+            field_schema = FieldSchema(
+                name=field["name"], 
+                dtype=getattr(DataType, field["dtype"]),
+                is_primary=field.get("is_primary", False),
+                auto_id=field.get("auto_id", False),
+                **extra_params
+            )
+            field_schemas.append(field_schema)
+
+        schema = CollectionSchema(fields=field_schemas, description=f"Collection for {collection_name}")
+        return Collection(name=collection_name, schema=schema, using=alias)
+
+    def _split_changed_rows(self, columns: Dict[str, list], seen_ids: set,
+                            existing_rows: Dict[int, Dict[str, Any]]) -> Tuple[Dict[str, list], Dict[str, list]]:
+        """
+        将一批行分为需要插入的新块和需要更新元数据的已有块，跳过未变化的块和本次重复出现的块
+        
+        参数:
+            columns: 包含 id 列的列式数据
+            seen_ids: 本次已处理的块ID集合（会被更新）
+            existing_rows: 集合中已存在的 {块ID: MUTABLE_METADATA_FIELDS 字段值}
+            
+        返回:
+            (新块的列式数据, 元数据有变化的已有块的列式数据)
+        """
+        new_rows = []
+        changed_rows = []
+        for row, chunk_uid in enumerate(columns["id"]):
+            if chunk_uid in seen_ids:
+                continue
+            seen_ids.add(chunk_uid)
+            existing = existing_rows.get(chunk_uid)
+            if existing is None:
+                new_rows.append(row)
+            elif any(existing.get(name) != columns[name][row] for name in MUTABLE_METADATA_FIELDS):
+                changed_rows.append(row)
+        return (
+            {name: [values[row] for row in new_rows] for name, values in columns.items()},
+            {name: [values[row] for row in changed_rows] for name, values in columns.items()}
+        )
 
-    def _index_to_chroma(self, data: Dict[str, Any], config: VectorDBConfig) -> Dict[str, Any]:
-        collection_name = os.path.splitext(os.path.basename(data["filename"]))[0]
+    def _query_milvus_rows(self, collection: Collection, expr: str,
+                           output_fields: Sequence[str] = ()) -> Dict[int, Dict[str, Any]]:
+        """
+        分页查询满足条件的全部行
+        
+        参数:
+            collection: 集合对象
+            expr: 过滤表达式
+            output_fields: 除主键外需要返回的字段
+            
+        返回:
+            {主键: {字段名: 值}} 字典
+        """
+        fields = ["id", *output_fields]
+        rows_by_id = {}
+        if hasattr(collection, "query_iterator"):
+            iterator = collection.query_iterator(batch_size=1000, expr=expr, output_fields=fields)
+            try:
+                while True:
+                    rows = iterator.next()
+                    if not rows:
+                        break
+                    rows_by_id.update((row["id"], row) for row in rows)
+            finally:
+                iterator.close()
+            return rows_by_id
+        
+        offset = 0
+        while True:
+            rows = collection.query(expr=expr, output_fields=fields, offset=offset, limit=1000)
+            rows_by_id.update((row["id"], row) for row in rows)
+            if len(rows) < 1000:
+                return rows_by_id
+            offset += len(rows)
+
+    def _build_milvus_columns(self, records: List[Dict[str, Any]], vectors: np.ndarray,
+                              embeddings_data: Dict[str, Any]) -> Dict[str, list]:
+        """
+        将一批嵌入记录转换为列式数据
+        
+        参数:
+            records: 当前批次的嵌入记录
+            vectors: 当前批次的向量矩阵
+            embeddings_data: 嵌入文件的文档级字段
+            
+        返回:
+            {字段名: 列数据} 字典，id 列为稳定的块ID（自增主键的集合会忽略该列）
+        """
+        metadatas = [record["metadata"] for record in records]
+        count = len(metadatas)
+        document_name = embeddings_data.get("filename", "")
+        return {
+            "id": [stable_chunk_id(document_name, str(m.get("page_range", "")), str(m.get("content", "")))
+                   for m in metadatas],
+            "content": [str(m.get("content", "")) for m in metadatas],
+            "document_name": [document_name] * count,  # 使用 filename 而不是 document_name
+            "chunk_id": [int(m.get("chunk_id", 0)) for m in metadatas],
+            "total_chunks": [int(m.get("total_chunks", 0)) for m in metadatas],
+            "word_count": [int(m.get("word_count", 0)) for m in metadatas],
+            "page_number": [str(m.get("page_number", 0)) for m in metadatas],
+            "page_range": [str(m.get("page_range", "")) for m in metadatas],
+            "page_refs": [_truncate_page_refs(str(m.get("page_refs") or m.get("page_range", "")))
+                          for m in metadatas],
+            # "chunking_method": [str(m.get("chunking_method", "")) for m in metadatas],
+            "embedding_provider": [embeddings_data.get("embedding_provider", "")] * count,  # 从顶层配置获取
+            "embedding_model": [embeddings_data.get("embedding_model", "")] * count,  # 从顶层配置获取
+            "embedding_timestamp": [str(m.get("embedding_timestamp", "")) for m in metadatas],
+            "vector": list(np.asarray(vectors, dtype=np.float32))
+        }
+
+    def _index_to_numpy(self, embedding_file: str, config: VectorDBConfig,
+                        progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict[str, Any]:
+        """
+        将嵌入向量写入进程内 NumPy 向量库
+        
+        集合命名规则与 Milvus 相同；增量模式下使用不带时间戳的名称并整体重建，
+        对中小规模集合重建一次只是一次顺序写入。
+        
+        参数:
+            embedding_file: 嵌入元数据文件路径
+            config: 向量数据库配置对象
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 向量总数)
+            
+        返回:
+            索引结果信息字典
+        """
+        embeddings_data = read_embedding_header(embedding_file)
+        for field in ["vector_dimension", "embedding_provider"]:
+            if not embeddings_data.get(field):
+                raise ValueError(f"Missing required field: {field}")
+        
+        filename = embeddings_data.get("filename", "")
+        base_name = Path(filename).stem if filename else "doc"
+        raw_name = f"{base_name}_{embeddings_data['embedding_provider']}"
+        if not config.incremental:
+            raw_name += f"_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        collection_name = generate_milvus_name(raw_name)
+        
+        chunked_doc_name = embeddings_data.get("chunked_doc_name")
+        if chunked_doc_name:
+            LexicalIndexService().link_collection(
+                collection_name, chunked_doc_name, embeddings_data.get("duplicate_chunk_ids")
+            )
+        
+        meta = get_numpy_vector_store(config.persist_directory).create_collection(
+            collection_name,
+            embedding_file,
+            vector_dtype=config.vector_dtype,
+            batch_size=max(1, int(config.insert_batch_size)),
+            progress_callback=progress_callback
+        )
+        return {
+            "index_size": meta["num_entities"],
+            "collection_name": collection_name
+        }
+
+    def _index_to_chroma(self, embeddings_data: Dict[str, Any], config: VectorDBConfig) -> Dict[str, Any]:
+        """
+        将嵌入向量索引到Chroma数据库，按批次直接写入向量矩阵切片
+        
+        参数:
+            embeddings_data: 嵌入向量数据
+            config: 向量数据库配置对象
+            
+        返回:
+            索引结果信息字典
+        """
+        filename = embeddings_data.get("filename", "")
+        collection_name = os.path.splitext(os.path.basename(filename))[0] or "doc"
         collection = self.chroma_client.get_or_create_collection(
             name=collection_name,
             metadata=config.collection_metadata
         )
 
-        documents = []
-        metadatas = []
-        ids = []
-        embeddings = []
+        records = embeddings_data["embeddings"]
+        vectors = embeddings_data["vectors"]
+        batch_size = self.chroma_client.get_max_batch_size() if hasattr(self.chroma_client, "get_max_batch_size") else 1000
 
-        for i, chunk in enumerate(data["chunks"]):
-            documents.append(chunk["text"])
-            metadatas.append({
-                "source": data["filename"],
-                "page": chunk.get("page_number", 0),
-                "chunk_id": i,
-                "total_chunks": len(data["chunks"])
-            })
-            ids.append(str(i))
-            embeddings.append(chunk["embedding"])
-
-        collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids,
-            embeddings=embeddings
-        )
+        for start, end, batch_vectors in iter_vector_batches(vectors, batch_size):
+            batch = records[start:end]
+            collection.add(
+                documents=[str(emb["metadata"].get("content", "")) for emb in batch],
+                metadatas=[{
+                    "source": filename,
+                    "page": str(emb["metadata"].get("page_number", 0)),
+                    "chunk_id": int(emb["metadata"].get("chunk_id", i)),
+                    "total_chunks": len(records)
+                } for i, emb in enumerate(batch, start)],
+                ids=[str(i) for i in range(start, end)],
+                embeddings=np.asarray(batch_vectors, dtype=np.float32)
+            )
 
         return {
             "status": "success",
             "collection_name": collection_name,
-            "num_embeddings": len(embeddings)
+            "index_size": len(records)
         }
 
     def list_collections(self, provider: str) -> List[str]:
@@ -435,12 +787,9 @@ class VectorStoreService:
             集合名称列表
         """
         if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=MILVUS_CONFIG["uri"])
-                collections = utility.list_collections()
-                return collections
-            finally:
-                connections.disconnect("default")
+            return get_milvus_manager(MILVUS_CONFIG["uri"]).list_collections()
+        if provider == VectorDBProvider.NUMPY:
+            return get_numpy_vector_store().list_collections()
         return []
 
     def delete_collection(self, provider: str, collection_name: str) -> bool:
@@ -455,12 +804,11 @@ class VectorStoreService:
             是否删除成功
         """
         if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=MILVUS_CONFIG["uri"])
-                utility.drop_collection(collection_name)
-                return True
-            finally:
-                connections.disconnect("default")
+            get_milvus_manager(MILVUS_CONFIG["uri"]).drop_collection(collection_name)
+            return True
+        if provider == VectorDBProvider.NUMPY:
+            get_numpy_vector_store().drop_collection(collection_name)
+            return True
         return False
 
     def get_collection_info(self, provider: str, collection_name: str) -> Dict[str, Any]:
@@ -475,14 +823,17 @@ class VectorStoreService:
             集合信息字典
         """
         if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=MILVUS_CONFIG["uri"])
-                collection = Collection(collection_name)
-                return {
-                    "name": collection_name,
-                    "num_entities": collection.num_entities,
-                    "schema": collection.schema.to_dict()
-                }
-            finally:
-                connections.disconnect("default")
+            collection = get_milvus_manager(MILVUS_CONFIG["uri"]).get_collection(collection_name, load=False)
+            return {
+                "name": collection_name,
+                "num_entities": collection.num_entities,
+                "schema": collection.schema.to_dict()
+            }
+        if provider == VectorDBProvider.NUMPY:
+            meta = get_numpy_vector_store().get_collection_info(collection_name)
+            return {
+                "name": collection_name,
+                "num_entities": meta["num_entities"],
+                "schema": meta
+            }
         return {}
\ No newline at end of file
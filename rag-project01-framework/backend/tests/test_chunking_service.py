@@ -0,0 +1,124 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from services.chunking_service import ChunkingService
+from services.tokenizer_service import TokenCounter
+from utils.document_storage import DocumentWriter, load_document_file
+
+
+class FakeTokenCounter(TokenCounter):
+    """每个 ASCII 单词算一个 token，每个非 ASCII 字符算三个 token"""
+    def __init__(self):
+        pass
+
+    def token_starts(self, text):
+        starts = []
+        for position, char in enumerate(text):
+            if char.isspace():
+                continue
+            if not char.isascii():
+                starts.extend([position] * 3)
+            elif position == 0 or not text[position - 1].isascii() or text[position - 1].isspace():
+                starts.append(position)
+        return starts
+
+
+WORDS = [f"w{i}" for i in range(1, 21)]
+
+
+def _words(text):
+    return text.split()
+
+
+def _chunk(page_map, **kwargs):
+    return list(ChunkingService().iter_chunks(page_map, **kwargs))
+
+
+def test_chunk_spans_pages():
+    chunks = _chunk(
+        [{"page": 1, "text": "aaa bbb"}, {"page": 2, "text": "ccc ddd"}, {"page": 3, "text": "eee"}],
+        unit="chars", chunk_size=100, chunk_overlap=0
+    )
+
+    assert len(chunks) == 1
+    assert chunks[0]["content"] == "aaa bbb\nccc ddd\neee"
+    assert chunks[0]["metadata"]["page_number"] == 1
+    assert chunks[0]["metadata"]["page_range"] == "1-3"
+
+
+def test_overlap_carries_trailing_words():
+    text = " ".join(WORDS)
+    chunks = _chunk([{"page": 1, "text": text}], unit="words", chunk_size=5, chunk_overlap=2)
+
+    assert [chunk["metadata"]["chunk_id"] for chunk in chunks] == list(range(1, len(chunks) + 1))
+    for previous, current in zip(chunks, chunks[1:]):
+        assert len(_words(current["content"])) <= 5
+        assert _words(current["content"])[:2] == _words(previous["content"])[-2:]
+    assert _words(chunks[-1]["content"])[-1] == "w20"
+
+
+def test_overlap_not_smaller_than_chunk_size_is_clamped():
+    text = " ".join(WORDS)
+    chunks = _chunk([{"page": 1, "text": text}], unit="words", chunk_size=5, chunk_overlap=10)
+
+    firsts = [_words(chunk["content"])[0] for chunk in chunks]
+    assert len(firsts) == len(set(firsts))
+    assert all(len(_words(chunk["content"])) <= 5 for chunk in chunks)
+    assert _words(chunks[-1]["content"])[-1] == "w20"
+
+
+def test_cjk_chunks_end_at_sentence_punctuation():
+    text = "第一句话很长。第二句话也长。第三句话更长！第四句"
+    chunks = _chunk([{"page": 1, "text": text}], unit="chars", chunk_size=12, chunk_overlap=0)
+
+    assert [chunk["content"] for chunk in chunks] == ["第一句话很长。", "第二句话也长。", "第三句话更长！第四句"]
+
+
+def test_oversized_word_is_hard_split():
+    text = "x" + "a" * 24 + " end"
+    chunks = _chunk([{"page": 1, "text": text}], unit="chars", chunk_size=10, chunk_overlap=0)
+
+    assert all(len(chunk["content"]) <= 10 for chunk in chunks)
+    assert "".join(chunk["content"] for chunk in chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_token_chunks_never_exceed_chunk_size():
+    counter = FakeTokenCounter()
+    text = "中文文本没有空格" * 5 + " tail words here"
+    chunks = _chunk([{"page": 1, "text": text}], unit="tokens", chunk_size=10, chunk_overlap=0,
+                    token_counter=counter)
+
+    assert all(counter.count(chunk["content"]) <= 10 for chunk in chunks)
+    assert "".join(chunk["content"] for chunk in chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_invalid_unit_is_rejected():
+    with pytest.raises(ValueError):
+        _chunk([{"page": 1, "text": "a"}], unit="lines")
+
+
+def test_write_chunks_round_trip(tmp_path):
+    page_map = [{"page": page, "text": " ".join(WORDS)} for page in range(1, 4)]
+    expected = _chunk(page_map, unit="words", chunk_size=7, chunk_overlap=1)
+    writer = DocumentWriter(str(tmp_path / "doc.json"), block_size=2)
+
+    written = list(ChunkingService._write_chunks(writer, iter(expected)))
+    header = writer.close({"filename": "doc.pdf", "chunking_method": "by_words"})
+
+    assert written == expected
+    assert header["total_chunks"] == len(expected)
+    assert load_document_file(str(tmp_path / "doc.json"))["chunks"] == expected
+
+
+def test_chunk_to_file_matches_streaming_chunks(tmp_path):
+    page_map = [{"page": 1, "text": "第一句。第二句。"}, {"page": 2, "text": "third sentence. fourth one"}]
+    params = {"chunk_size": 8, "chunk_overlap": 0}
+    output_path = str(tmp_path / "doc_by_chars.json")
+
+    header = ChunkingService().chunk_to_file("by_chars", params, {"filename": "doc.pdf"}, page_map, output_path)
+    document = load_document_file(output_path)
+
+    assert header["total_chunks"] == len(document["chunks"])
+    assert document["chunking_method"] == "by_chars"
+    assert document["chunks"] == _chunk(page_map, unit="chars", chunk_size=8, chunk_overlap=0)
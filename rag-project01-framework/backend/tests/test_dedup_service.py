@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from services.dedup_service import ChunkDeduplicator
+
+DISCLAIMER = (
+    "This document is provided for information purposes only and does not constitute an offer "
+    "or solicitation to buy or sell any securities or financial instruments in any jurisdiction"
+)
+
+
+def _chunk(content, page):
+    return {"content": content, "metadata": {"chunk_id": page, "page_number": page, "page_range": str(page)}}
+
+
+def test_near_duplicates_are_merged_into_first_chunk():
+    chunks = [
+        _chunk(DISCLAIMER, 1),
+        _chunk("Revenue grew twelve percent year over year driven by strong demand in the cloud segment", 2),
+        _chunk(DISCLAIMER + " today", 3),
+        _chunk(DISCLAIMER, 4),
+    ]
+
+    deduplicated, stats = ChunkDeduplicator().deduplicate(chunks)
+
+    assert [chunk["metadata"]["chunk_id"] for chunk in deduplicated] == [1, 2]
+    assert deduplicated[0]["metadata"]["page_refs"] == "1,3,4"
+    assert deduplicated[0]["metadata"]["duplicate_count"] == 2
+    assert deduplicated[0]["metadata"]["merged_chunk_ids"] == [3, 4]
+    assert ChunkDeduplicator.duplicate_chunk_ids(deduplicated) == {"3": 1, "4": 1}
+    assert deduplicated[1]["metadata"]["page_refs"] == "2"
+    assert deduplicated[1]["metadata"]["duplicate_count"] == 0
+    assert stats == {"input_chunks": 4, "output_chunks": 2, "duplicates_removed": 2}
+    assert "page_refs" not in chunks[0]["metadata"]
+
+
+def test_candidate_is_compared_with_every_bucket_member(monkeypatch):
+    # 三个签名的第一段相同：A 与 B 不相似，B 与 C 相似，C 须与 B 比较而不只是桶内第一个块 A
+    signatures = {
+        "a": np.array([1, 1, 2, 3], dtype=np.uint64),
+        "b": np.array([1, 1, 5, 6], dtype=np.uint64),
+        "c": np.array([1, 1, 5, 7], dtype=np.uint64),
+    }
+    deduplicator = ChunkDeduplicator(num_perm=4, bands=2, threshold=0.75)
+    monkeypatch.setattr(deduplicator, "signature", signatures.get)
+
+    assert deduplicator.find_duplicates(["a", "b", "c"]) == [0, 1, 1]
+
+
+def test_distinct_chunks_are_kept():
+    chunks = [_chunk(f"section {i} discusses topic number {i} with unique details {i * 7}", i) for i in range(1, 6)]
+
+    deduplicated, stats = ChunkDeduplicator().deduplicate(chunks)
+
+    assert [chunk["content"] for chunk in deduplicated] == [chunk["content"] for chunk in chunks]
+    assert stats["duplicates_removed"] == 0
+
+
+def test_signature_is_deterministic():
+    first, second = ChunkDeduplicator(), ChunkDeduplicator()
+
+    assert (first.signature(DISCLAIMER) == second.signature(DISCLAIMER)).all()
+
+
+def test_empty_input():
+    assert ChunkDeduplicator().deduplicate([]) == (
+        [], {"input_chunks": 0, "output_chunks": 0, "duplicates_removed": 0}
+    )
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(num_perm=100, bands=16)
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from utils import document_storage
+from utils.document_storage import (
+    iter_document_chunks, iter_document_json, load_document_file, read_document_header,
+    read_document_range, save_document_file, delete_document_file, get_chunk_path
+)
+
+
+def _chunks(count):
+    return [
+        {"content": f"块 {i} line", "metadata": {"chunk_id": i + 1, "page_number": i // 3 + 1}}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(params=["zlib", "zstd"])
+def compression(request, monkeypatch):
+    if request.param == "zstd" and document_storage.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    monkeypatch.setitem(document_storage.DOCUMENT_STORAGE_CONFIG, "compression", request.param)
+    monkeypatch.setitem(document_storage.DOCUMENT_STORAGE_CONFIG, "block_size", 4)
+    return request.param
+
+
+def test_save_and_load_round_trip(tmp_path, compression):
+    path = str(tmp_path / "doc.json")
+    chunks = _chunks(10)
+
+    header = save_document_file(path, {"filename": "doc.pdf", "chunks": ["ignored"]}, chunks)
+    document = load_document_file(path)
+
+    assert header["compression"] == compression
+    assert len(header["blocks"]) == 3
+    assert document["filename"] == "doc.pdf"
+    assert document["total_chunks"] == 10
+    assert document["chunks"] == chunks
+    assert "blocks" not in document
+
+
+@pytest.mark.parametrize("start, stop", [(0, 4), (3, 9), (8, None), (9, 100), (10, 12), (5, 5)])
+def test_iter_document_chunks_range(tmp_path, compression, start, stop):
+    path = str(tmp_path / "doc.json")
+    chunks = _chunks(10)
+    save_document_file(path, {"filename": "doc.pdf"}, chunks)
+
+    assert list(iter_document_chunks(path, start, stop)) == chunks[start:stop]
+
+
+def test_read_document_range_and_header(tmp_path, compression):
+    path = str(tmp_path / "doc.json")
+    save_document_file(path, {"filename": "doc.pdf"}, _chunks(10))
+
+    page = read_document_range(path, 2, 3)
+    header = read_document_header(path)
+
+    assert [chunk["metadata"]["chunk_id"] for chunk in page["chunks"]] == [3, 4, 5]
+    assert (page["offset"], page["limit"], page["total_chunks"]) == (2, 3, 10)
+    assert header == {"filename": "doc.pdf", "total_chunks": 10}
+
+
+def test_iter_document_json_is_complete_document(tmp_path, compression):
+    path = str(tmp_path / "doc.json")
+    chunks = _chunks(7)
+    save_document_file(path, {"filename": "doc.pdf"}, chunks)
+
+    document = json.loads("".join(iter_document_json(path, batch_size=3)))
+
+    assert document == {"filename": "doc.pdf", "total_chunks": 7, "chunks": chunks}
+
+
+def test_legacy_json_document_is_readable(tmp_path):
+    path = tmp_path / "legacy.json"
+    chunks = _chunks(5)
+    path.write_text(json.dumps({"filename": "legacy.pdf", "chunks": chunks}), encoding="utf-8")
+
+    assert read_document_header(str(path)) == {"filename": "legacy.pdf", "total_chunks": 5}
+    assert list(iter_document_chunks(str(path), 1, 3)) == chunks[1:3]
+    assert json.loads("".join(iter_document_json(str(path))))["chunks"] == chunks
+
+
+def test_failed_write_leaves_no_files(tmp_path):
+    path = str(tmp_path / "doc.json")
+
+    def broken_chunks():
+        yield from _chunks(2)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        save_document_file(path, {"filename": "doc.pdf"}, broken_chunks())
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_delete_document_file(tmp_path):
+    path = str(tmp_path / "doc.json")
+    save_document_file(path, {"filename": "doc.pdf"}, _chunks(2))
+
+    delete_document_file(path)
+
+    assert list(tmp_path.iterdir()) == []
+    assert get_chunk_path(path).endswith(".chunks")
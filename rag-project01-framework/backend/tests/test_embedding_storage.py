@@ -0,0 +1,89 @@
+import base64
+
+import numpy as np
+import pytest
+
+from utils.embedding_storage import (
+    delete_embedding_file, encode_vectors, iter_embedding_batches, load_embedding_file,
+    read_embedding_header, read_embedding_range, save_embedding_file
+)
+
+CONFIG = {"filename": "doc.pdf", "embedding_provider": "huggingface", "vector_dimension": 4}
+
+
+def _records(count):
+    return [{"metadata": {"chunk_id": i + 1, "content": f"内容 {i}"}} for i in range(count)]
+
+
+def _vectors(count):
+    return np.arange(count * 4, dtype=np.float32).reshape(count, 4) / 7
+
+
+@pytest.mark.parametrize("encoding, dtype", [("base64_float16", "<f2"), ("base64_float32", "<f4")])
+def test_encode_vectors_base64_round_trip(encoding, dtype):
+    vectors = _vectors(3)
+
+    encoded = encode_vectors(vectors, encoding)
+    decoded = np.stack([np.frombuffer(base64.b64decode(row), dtype=dtype) for row in encoded])
+
+    assert len(encoded) == 3
+    np.testing.assert_allclose(decoded, vectors, rtol=1e-3)
+
+
+def test_encode_vectors_json_and_invalid():
+    vectors = _vectors(2)
+
+    assert encode_vectors(vectors, "json") == vectors.tolist()
+    with pytest.raises(ValueError):
+        encode_vectors(vectors, "base85")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "doc.json")
+    records, vectors = _records(5), _vectors(5)
+
+    save_embedding_file(path, CONFIG, records, vectors)
+    data, loaded = load_embedding_file(path)
+
+    assert data["embeddings"] == records
+    np.testing.assert_array_equal(loaded, vectors)
+    assert read_embedding_header(path)["filename"] == "doc.pdf"
+
+
+@pytest.mark.parametrize("start, stop", [(0, 2), (1, 5), (4, 10), (5, 6), (3, 3)])
+def test_read_embedding_range(tmp_path, start, stop):
+    path = str(tmp_path / "doc.json")
+    records, vectors = _records(5), _vectors(5)
+    save_embedding_file(path, CONFIG, records, vectors)
+
+    header, total, page, page_vectors = read_embedding_range(path, start, stop)
+
+    assert header["embedding_provider"] == "huggingface"
+    assert total == 5
+    assert page == records[start:stop]
+    np.testing.assert_array_equal(page_vectors, vectors[start:stop])
+
+
+def test_iter_embedding_batches(tmp_path):
+    path = str(tmp_path / "doc.json")
+    records, vectors = _records(5), _vectors(5)
+    save_embedding_file(path, CONFIG, records, vectors)
+
+    batches = list(iter_embedding_batches(path, 2))
+
+    assert [len(batch) for batch, _ in batches] == [2, 2, 1]
+    np.testing.assert_array_equal(np.concatenate([batch_vectors for _, batch_vectors in batches]), vectors)
+
+
+def test_shape_mismatch_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        save_embedding_file(str(tmp_path / "doc.json"), CONFIG, _records(2), _vectors(3))
+
+
+def test_delete_embedding_file(tmp_path):
+    path = str(tmp_path / "doc.json")
+    save_embedding_file(path, CONFIG, _records(2), _vectors(2))
+
+    delete_embedding_file(path)
+
+    assert list(tmp_path.iterdir()) == []
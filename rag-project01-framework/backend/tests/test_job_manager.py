@@ -0,0 +1,33 @@
+import threading
+
+from services.job_manager import FAILED, JobManager
+
+
+def test_restart_removes_temp_paths_of_interrupted_jobs(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    upload_dir = tmp_path / "temp" / "upload"
+    upload_dir.mkdir(parents=True)
+    (upload_dir / "doc.pdf").write_bytes(b"%PDF")
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_job(progress):
+        started.set()
+        release.wait(5)
+        return {}
+
+    manager = JobManager(db_path, {"load": 1})
+    try:
+        running_id = manager.submit("load", blocking_job)
+        started.wait(5)
+        # 唯一的工作线程被占用，这个任务在关闭时仍在排队，会被取消而不会执行
+        queued_id = manager.submit("load", lambda progress: {}, cleanup=[str(upload_dir)])
+        manager.shutdown()
+
+        restarted = JobManager(db_path, {"load": 1})
+
+        assert not upload_dir.exists()
+        assert restarted.get(queued_id)["status"] == FAILED
+        assert restarted.get(running_id)["status"] == FAILED
+        restarted.shutdown()
+    finally:
+        release.set()
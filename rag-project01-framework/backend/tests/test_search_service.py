@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+for module in ("dotenv", "boto3", "langchain_community", "pymilvus"):
+    pytest.importorskip(module)
+
+from services.dedup_service import ChunkDeduplicator
+from services.embedding_service import EmbeddingService
+from services.lexical_index_service import LexicalIndexService
+from services.numpy_vector_store import get_numpy_vector_store
+from services.search_service import SearchService
+from utils.config import SEARCH_CONFIG, VectorDBProvider
+from utils.embedding_storage import read_embedding_header
+
+DISCLAIMER = (
+    "This document is provided for information purposes only and does not constitute an offer "
+    "or solicitation to buy or sell any securities or financial instruments in any jurisdiction"
+)
+REVENUE = "Revenue grew twelve percent year over year driven by strong demand in the cloud segment"
+
+
+def _chunk(content, chunk_id):
+    return {
+        "content": content,
+        "metadata": {"chunk_id": chunk_id, "page_number": chunk_id, "page_range": str(chunk_id),
+                     "word_count": len(content.split())}
+    }
+
+
+def _index_deduplicated_collection(chunks):
+    """按 /embed 和 numpy 索引的流程：词法索引建立在去重前的块上，集合只包含去重后的块"""
+    chunked_doc_name = "doc_by_words_20260101000000.json"
+    LexicalIndexService().build_index(chunked_doc_name, chunks, document_name="doc.pdf")
+
+    deduplicated, _ = ChunkDeduplicator().deduplicate(chunks)
+    embeddings = []
+    for row, chunk in enumerate(deduplicated):
+        vector = np.zeros(len(deduplicated), dtype=np.float32)
+        vector[row] = 1.0
+        embeddings.append({
+            "embedding": vector.tolist(),
+            "metadata": {
+                **chunk["metadata"],
+                "content": chunk["content"],
+                "embedding_provider": "huggingface",
+                "embedding_model": "test-model",
+                "vector_dimension": len(deduplicated),
+            }
+        })
+    embedding_file = EmbeddingService().save_embeddings(
+        chunked_doc_name, embeddings, ChunkDeduplicator.duplicate_chunk_ids(deduplicated)
+    )
+
+    collection_name = "doc_huggingface"
+    header = read_embedding_header(embedding_file)
+    LexicalIndexService().link_collection(collection_name, chunked_doc_name, header.get("duplicate_chunk_ids"))
+    get_numpy_vector_store().create_collection(collection_name, embedding_file)
+    return collection_name, deduplicated
+
+
+def test_hybrid_search_counts_lexical_hits_on_merged_chunks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    chunks = [_chunk(DISCLAIMER, 1), _chunk(REVENUE, 2), _chunk(DISCLAIMER, 3), _chunk(DISCLAIMER, 4)]
+    collection_name, deduplicated = _index_deduplicated_collection(chunks)
+    assert [chunk["metadata"]["chunk_id"] for chunk in deduplicated] == [1, 2]
+
+    # 查询向量只与第 2 块相似，词法一路命中第 1、3、4 块，其中 3、4 已合并到第 1 块
+    results = SearchService()._hybrid_search(
+        VectorDBProvider.NUMPY.value, collection_name, "securities jurisdiction",
+        [0.0, 1.0], top_k=2, threshold=0.5, word_count_threshold=0
+    )
+
+    rrf_k = SEARCH_CONFIG["rrf_k"]
+    assert [result["metadata"]["chunk"] for result in results] == [1, 2]
+    assert results[0]["score"] == pytest.approx(sum(1.0 / (rrf_k + rank) for rank in (1, 2, 3)))
+    assert results[0]["metadata"]["page_refs"] == "1,3,4"
+    assert results[0]["vector_score"] is None
+    assert results[1]["score"] == pytest.approx(1.0 / (rrf_k + 1))
+    assert results[1]["lexical_score"] is None
@@ -4,11 +4,14 @@ from typing import Dict, Any
 class VectorDBProvider(str, Enum):
     MILVUS = "milvus"
     CHROMA = "chroma"
+    NUMPY = "numpy"
     # More providers can be added later
 
 # 可以在这里添加其他配置相关的内容
 MILVUS_CONFIG = {
     "uri": "03-vector-store/langchain_milvus.db",
+    # 流式写入时每批插入的向量数，批次越小峰值内存越低、gRPC 消息越小
+    "insert_batch_size": 1000,
     "index_types": {
         "flat": "FLAT",
         "ivf_flat": "IVF_FLAT",
@@ -34,4 +37,174 @@ CHROMA_CONFIG = {
         "hnsw:ef_construction": 200,  # 构建时的搜索范围
         "hnsw:ef": 10  # 查询时的搜索范围
     }
-} 
\ No newline at end of file
+}
+
+NUMPY_STORE_CONFIG = {
+    # 进程内 NumPy 向量库，适合百万向量以内的集合
+    "persist_directory": "03-vector-store/numpy",
+    # 向量存储类型："float32"，或占用减半的 "float16"
+    "vector_dtype": "float32",
+    "insert_batch_size": 1000
+}
+
+EMBEDDING_CONFIG = {
+    # 每个提供商单批处理的文本数
+    "batch_sizes": {
+        "openai": 20,
+        "bedrock": 16,
+        "huggingface": 32
+    },
+    # Bedrock 没有批量接口，同一批内的请求由线程池并发发送
+    "bedrock_max_workers": 8
+}
+
+EMBEDDING_CACHE_CONFIG = {
+    "enabled": True,
+    # 以 (提供商, 模型, 文本哈希) 为键的持久化向量缓存
+    "path": "cache/embedding_cache.db",
+    # 超过上限后按最近最少使用淘汰
+    "max_size_mb": 1024
+}
+
+EMBEDDING_MODEL_REGISTRY_CONFIG = {
+    # 应用启动时预加载并预热的嵌入模型
+    "preload": [
+        {"provider": "huggingface", "model": "sentence-transformers/all-mpnet-base-v2"}
+    ],
+    # 已加载本地模型的内存预算，超出后卸载最久未使用的模型
+    "max_memory_mb": 4096,
+    # 模型空闲超过该时间（秒）后卸载
+    "idle_ttl_seconds": 3600
+}
+
+QUERY_EMBEDDING_CACHE_CONFIG = {
+    # 以 (提供商, 模型, 规范化查询文本) 为键的内存缓存
+    "max_entries": 4096,
+    "ttl_seconds": 24 * 3600,
+    # 设置路径后在服务关闭时保存、启动时加载；None 表示仅保存在内存中
+    "persist_path": "cache/query_embeddings.json"
+}
+
+SEARCH_CONFIG = {
+    # 批量搜索时单次 collection.search 携带的最大查询向量数
+    "max_batch_queries": 256,
+    # 检索评估时每批的查询数和同时执行的批数
+    "evaluate_batch_size": 128,
+    "evaluate_concurrency": 4,
+    # 混合检索：向量与词法两路各取的候选数，以及倒数排名融合(RRF)的平滑常数
+    "hybrid_candidates": 50,
+    "rrf_k": 60
+}
+
+RERANK_CONFIG = {
+    # 本地交叉编码器，CPU 上对 Linear 层做 int8 动态量化
+    "model": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    "quantize": True,
+    "max_length": 512,
+    "batch_size": 32,
+    # 开启重排序时向量检索多取的候选数
+    "candidates": 30,
+    # 以 (模型, 查询哈希, 块ID) 为键的打分缓存
+    "score_cache_entries": 100000,
+    "score_cache_ttl_seconds": 7 * 24 * 3600
+}
+
+ARTIFACT_CATALOG_CONFIG = {
+    # 产物元数据目录，可随时删除，启动时会从文件重新对账生成
+    "path": "cache/artifact_catalog.db"
+}
+
+LEXICAL_INDEX_CONFIG = {
+    # 分块时为每个文档建立的 BM25 倒排索引目录
+    "index_dir": "03-vector-store/lexical",
+    "k1": 1.5,
+    "b": 0.75
+}
+
+JOBS_CONFIG = {
+    # 后台任务的状态和结果，重启后仍可查询
+    "db_path": "cache/jobs.db",
+    # 每个阶段的最大并发任务数（嵌入本身已按批并行，默认只跑一个）
+    "stage_workers": {
+        "load": 2,
+        "chunk": 2,
+        "embed": 1,
+        "index": 2
+    }
+}
+
+LOADING_CONFIG = {
+    # 页面并行提取的进程数，None 表示使用 CPU 核数；1 表示始终串行
+    "parallel_workers": None,
+    # 页数达到该值时才启用并行提取，小文档进程间通信的开销不划算
+    "parallel_min_pages": 64,
+    # 每个任务提取的页数，页面较多时切成更多小段便于负载均衡
+    "pages_per_task": 32,
+    # auto 加载方式：文本层少于该字符数且包含图片的页面视为扫描页，送去 OCR
+    "auto_min_text_chars": 20
+}
+
+OCR_CONFIG = {
+    # 渲染扫描页时的分辨率，越高识别越准但越慢
+    "dpi": 200,
+    # OCR 进程数，None 表示使用 CPU 核数；1 表示在当前进程中逐页处理
+    "workers": None,
+    # 同时在处理中的页面/图片数（每个进程的倍数），决定内存中最多保留多少页
+    "inflight_per_worker": 2,
+    # 扫描件 OCR 的语言（pdf2image 加载方式）
+    "lang": "eng"
+}
+
+OCR_CACHE_CONFIG = {
+    "enabled": True,
+    # 以 (图片内容哈希, 语言) 为键的持久化 OCR 结果缓存，跨文档共享
+    "path": "cache/ocr_cache.db",
+    # 超过上限后按最近最少使用淘汰
+    "max_size_mb": 256
+}
+
+UPLOAD_CONFIG = {
+    # 上传文件按块写入临时目录，每块的字节数；单个上传的内存占用与文件大小无关
+    "chunk_size": 1024 * 1024,
+    "temp_dir": "temp"
+}
+
+TOKENIZER_CONFIG = {
+    # 各提供商嵌入模型的最大输入 token 数（HuggingFace 模型从模型配置中读取）
+    "provider_max_tokens": {
+        "openai": 8191,
+        "bedrock": 8192
+    },
+    # 按模型覆盖最大输入 token 数
+    "model_max_tokens": {},
+    # 无法确定时使用的最大输入 token 数
+    "default_max_tokens": 512
+}
+
+DEDUP_CONFIG = {
+    # 嵌入前合并近似重复的文本块（页眉、免责声明、目录等），保留所有页码引用
+    "enabled": True,
+    # MinHash 签名长度，LSH 分段数（每段 num_perm / bands 行）
+    "num_perm": 128,
+    "bands": 16,
+    # 估计 Jaccard 相似度达到该值视为重复
+    "threshold": 0.9,
+    # 以连续几个词项为一个 shingle
+    "shingle_size": 3
+}
+
+DOCUMENT_STORAGE_CONFIG = {
+    # 已加载/已分块文档的文本块按 JSONL 分块压缩存储，每块包含的文本块数
+    "block_size": 64,
+    # zstd（需要 pip install zstandard）或 zlib；未安装 zstandard 时自动使用 zlib
+    "compression": "zstd",
+    "zstd_level": 3,
+    "zlib_level": 6
+}
+
+EMBEDDING_RESPONSE_CONFIG = {
+    # /embed 和 /embedded-docs 每页返回的块数及上限；默认不返回向量
+    "page_size": 100,
+    "max_page_size": 1000,
+    "vector_encoding": "none"
+}
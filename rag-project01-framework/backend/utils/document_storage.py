@@ -0,0 +1,313 @@
+import os
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from utils.config import DOCUMENT_STORAGE_CONFIG
+
+try:
+    import zstandard  # 可选依赖：pip install zstandard，未安装时使用 zlib 压缩
+except ImportError:
+    zstandard = None
+
+"""
+文档文件存储工具
+
+01-loaded-docs 和 01-chunked-docs 中的每个文档由两部分组成：
+    - <name>.json:   文档级字段以及数据块偏移索引（不含文本块）
+    - <name>.chunks: 文本块按 JSONL 每 block_size 行压缩为一个独立的数据块，依次拼接
+
+数据块各自独立压缩，读取第 i 个文本块只需按索引定位到第 i // block_size 个数据块，
+seek 后读取并解压这一块。写入时边接收文本块边压缩，内存中最多保留一个数据块。
+旧版把 chunks 直接写在 JSON 中的文件仍可读取。
+"""
+
+STORAGE_FORMAT = "jsonl-blocks"
+CHUNK_FILE_SUFFIX = ".chunks"
+
+# 存储相关的头部字段，对外返回文档时去掉
+STORAGE_KEYS = ("storage_format", "chunk_file", "compression", "block_size", "blocks")
+
+
+def get_chunk_path(json_path: str) -> str:
+    """
+    获取文档对应的文本块数据文件路径
+
+    参数:
+        json_path: 文档头部文件路径
+
+    返回:
+        文本块数据(.chunks)文件路径
+    """
+    return os.path.splitext(json_path)[0] + CHUNK_FILE_SUFFIX
+
+
+def _resolve_compression(compression: str) -> str:
+    """确定实际使用的压缩算法，zstandard 未安装时回退到 zlib"""
+    if compression == "zstd" and zstandard is None:
+        return "zlib"
+    if compression not in ("zstd", "zlib"):
+        raise ValueError(f"Unsupported compression: {compression}")
+    return compression
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=DOCUMENT_STORAGE_CONFIG["zstd_level"]).compress(data)
+    return zlib.compress(data, DOCUMENT_STORAGE_CONFIG["zlib_level"])
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 压缩的文档需要安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class DocumentWriter:
+    """
+    文档写入器
+
+    逐个接收文本块，凑满一个数据块就压缩写出；close 时写入头部文件。
+    两个文件都先写临时文件再替换，头部最后写入，读取方不会看到指向不完整数据的索引。
+    """
+    def __init__(self, json_path: str, block_size: int = None, compression: str = None):
+        """
+        初始化写入器
+
+        参数:
+            json_path: 文档头部文件路径
+            block_size: 每个数据块的文本块数，默认取 DOCUMENT_STORAGE_CONFIG
+            compression: zstd 或 zlib，默认取 DOCUMENT_STORAGE_CONFIG
+        """
+        self.json_path = json_path
+        self.chunk_path = get_chunk_path(json_path)
+        self.block_size = max(1, int(block_size or DOCUMENT_STORAGE_CONFIG["block_size"]))
+        self.compression = _resolve_compression(compression or DOCUMENT_STORAGE_CONFIG["compression"])
+        directory = os.path.dirname(json_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.chunk_path + ".tmp", "wb")
+        self._lines: List[str] = []
+        self._blocks: List[List[int]] = []
+        self._offset = 0
+        self.total_chunks = 0
+
+    def write(self, chunk: Dict[str, Any]) -> None:
+        """写入一个文本块"""
+        self._lines.append(json.dumps(chunk, ensure_ascii=False))
+        self.total_chunks += 1
+        if len(self._lines) >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._lines:
+            return
+        data = _compress(("\n".join(self._lines) + "\n").encode("utf-8"), self.compression)
+        self._file.write(data)
+        self._blocks.append([self._offset, len(data)])
+        self._offset += len(data)
+        self._lines = []
+
+    def close(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        写完剩余的文本块和头部文件
+
+        参数:
+            header: 文档级字段，total_chunks 由写入器填写
+
+        返回:
+            写入头部文件的完整字段
+        """
+        self._flush_block()
+        self._file.close()
+        os.replace(self.chunk_path + ".tmp", self.chunk_path)
+
+        header = {key: value for key, value in header.items() if key != "chunks"}
+        header.update({
+            "total_chunks": self.total_chunks,
+            "storage_format": STORAGE_FORMAT,
+            "chunk_file": os.path.basename(self.chunk_path),
+            "compression": self.compression,
+            "block_size": self.block_size,
+            "blocks": self._blocks
+        })
+        tmp_json_path = self.json_path + ".tmp"
+        with open(tmp_json_path, "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False)
+        os.replace(tmp_json_path, self.json_path)
+        return header
+
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        self._file.close()
+        if os.path.exists(self.chunk_path + ".tmp"):
+            os.remove(self.chunk_path + ".tmp")
+
+
+def save_document_file(json_path: str, header: Dict[str, Any], chunks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    保存文档
+
+    参数:
+        json_path: 文档头部文件路径
+        header: 文档级字段（其中的 chunks 会被忽略）
+        chunks: 文本块
+
+    返回:
+        写入头部文件的完整字段
+    """
+    writer = DocumentWriter(json_path)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close(header)
+
+
+def _read_raw(json_path: str) -> Dict[str, Any]:
+    with open(json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_document_header(json_path: str, include_storage: bool = False) -> Dict[str, Any]:
+    """
+    读取文档级字段（不含文本块）
+
+    参数:
+        json_path: 文档头部文件路径
+        include_storage: 是否保留数据块索引等存储字段
+
+    返回:
+        顶层字段字典，旧版文件补上 total_chunks
+    """
+    data = _read_raw(json_path)
+    chunks = data.pop("chunks", None)
+    if chunks is not None:
+        data.setdefault("total_chunks", len(chunks))
+    if not include_storage:
+        data = {key: value for key, value in data.items() if key not in STORAGE_KEYS}
+    return data
+
+
+def iter_document_chunks(json_path: str, start: int = 0, stop: Optional[int] = None,
+                         header: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按下标范围读取文本块
+
+    只读取并解压覆盖 [start, stop) 的数据块；旧版文件整体解析后切片。
+
+    参数:
+        json_path: 文档头部文件路径
+        start: 起始下标
+        stop: 结束下标（不含），None 表示读到末尾
+        header: 已读取的头部（含存储字段），不提供时从文件中读取
+
+    返回:
+        文本块迭代器
+    """
+    if header is None or "blocks" not in header:
+        header = _read_raw(json_path)
+    if header.get("storage_format") != STORAGE_FORMAT:
+        yield from (header.get("chunks") or [])[start:stop]
+        return
+
+    total = header["total_chunks"]
+    stop = total if stop is None else min(stop, total)
+    start = max(0, start)
+    if start >= stop:
+        return
+    block_size = header["block_size"]
+    chunk_path = os.path.join(os.path.dirname(json_path), header["chunk_file"])
+    with open(chunk_path, "rb") as f:
+        for block in range(start // block_size, (stop - 1) // block_size + 1):
+            offset, length = header["blocks"][block]
+            f.seek(offset)
+            # json.dumps 会转义换行符，按 "\n" 切分即可（splitlines 还会在 U+2028 等字符处切分）
+            lines = _decompress(f.read(length), header["compression"]).decode("utf-8").rstrip("\n").split("\n")
+            first = block * block_size
+            for line in lines[max(start - first, 0):stop - first]:
+                yield json.loads(line)
+
+
+def read_document_range(json_path: str, offset: int, limit: int) -> Dict[str, Any]:
+    """
+    读取文档级字段和一段文本块
+
+    参数:
+        json_path: 文档头部文件路径
+        offset: 起始下标
+        limit: 最多读取的文本块数
+
+    返回:
+        文档级字段 + offset/limit + 该范围内的 chunks
+    """
+    header = _read_raw(json_path)
+    chunks = list(iter_document_chunks(json_path, offset, offset + limit, header=header))
+    document = {key: value for key, value in header.items() if key not in STORAGE_KEYS and key != "chunks"}
+    document.setdefault("total_chunks", len(header.get("chunks") or []))
+    document.update({"offset": offset, "limit": limit, "chunks": chunks})
+    return document
+
+
+def load_document_file(json_path: str) -> Dict[str, Any]:
+    """
+    读取完整文档
+
+    参数:
+        json_path: 文档头部文件路径
+
+    返回:
+        与旧版 JSON 文件结构相同的字典（文档级字段 + chunks）
+    """
+    header = _read_raw(json_path)
+    if header.get("storage_format") != STORAGE_FORMAT:
+        return header
+    document = {key: value for key, value in header.items() if key not in STORAGE_KEYS}
+    document["chunks"] = list(iter_document_chunks(json_path, header=header))
+    return document
+
+
+def iter_document_json(json_path: str, batch_size: int = 256) -> Iterator[str]:
+    """
+    以 JSON 文本片段的形式流式输出完整文档，用于直接作为响应体返回
+
+    参数:
+        json_path: 文档头部文件路径
+        batch_size: 每个片段包含的文本块数
+
+    返回:
+        拼接后为完整文档 JSON 的字符串迭代器
+    """
+    header = read_document_header(json_path, include_storage=True)
+    if header.get("storage_format") != STORAGE_FORMAT:
+        with open(json_path, "r", encoding="utf-8") as f:
+            while True:
+                text = f.read(1 << 20)
+                if not text:
+                    return
+                yield text
+
+    public = {key: value for key, value in header.items() if key not in STORAGE_KEYS}
+    yield json.dumps(public, ensure_ascii=False)[:-1] + (', "chunks": [' if public else '"chunks": [')
+    batch: List[str] = []
+    first = True
+    for chunk in iter_document_chunks(json_path, header=header):
+        batch.append(json.dumps(chunk, ensure_ascii=False))
+        if len(batch) >= batch_size:
+            yield ("" if first else ",") + ",".join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ("" if first else ",") + ",".join(batch)
+    yield "]}"
+
+
+def delete_document_file(json_path: str) -> None:
+    """删除文档头部文件及其文本块数据文件"""
+    chunk_path = get_chunk_path(json_path)
+    if os.path.exists(chunk_path):
+        os.remove(chunk_path)
+    os.remove(json_path)
@@ -0,0 +1,306 @@
+import os
+import json
+import base64
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+
+try:
+    import ijson  # 可选依赖：pip install ijson，用于增量解析大 JSON 文件
+except ImportError:
+    ijson = None
+
+"""
+嵌入文件存储工具
+
+02-embedded-docs 中的每个嵌入文件由以下部分组成：
+    - <name>.json:         文档级配置以及每个文本块的元数据（不含向量）
+    - <name>.npy:          float32 向量矩阵，第 i 行对应 embeddings[i]
+    - <name>.offsets.npy:  embeddings[i] 在 JSON 文件中的起始字节偏移，用于按范围读取元数据
+
+JSON 文件第一行是文档级配置和 "embeddings": [ 的开头，之后每行一条记录，
+按偏移索引 seek 到第 start 条记录即可读取 [start, stop) 范围，不必解析整个文件。
+
+向量矩阵以内存映射方式读取，索引时按行切片直接交给向量数据库，
+不再构造 Python float 列表。旧版把向量以文本形式写在 JSON 中的文件仍可读取。
+安装 ijson 后，元数据和旧版内嵌向量都按批增量解析，内存占用与文件大小无关。
+"""
+
+STORAGE_FORMAT = "npy"
+VECTOR_FILE_SUFFIX = ".npy"
+OFFSETS_FILE_SUFFIX = ".offsets.npy"
+
+# 接口返回向量时支持的编码：不返回、JSON 浮点数组、小端 float16/float32 字节的 base64
+VECTOR_ENCODINGS = ("none", "json", "base64_float16", "base64_float32")
+
+
+def get_vector_path(json_path: str) -> str:
+    """
+    获取嵌入文件对应的向量矩阵路径
+
+    参数:
+        json_path: 嵌入元数据文件路径
+
+    返回:
+        向量矩阵(.npy)文件路径
+    """
+    return os.path.splitext(json_path)[0] + VECTOR_FILE_SUFFIX
+
+
+def get_offsets_path(json_path: str) -> str:
+    """获取嵌入文件对应的记录偏移索引路径"""
+    return os.path.splitext(json_path)[0] + OFFSETS_FILE_SUFFIX
+
+
+def save_embedding_file(json_path: str, config_info: Dict[str, Any],
+                        records: List[Dict[str, Any]], vectors: np.ndarray) -> str:
+    """
+    将嵌入结果保存为 JSON 元数据 + float32 向量矩阵
+
+    参数:
+        json_path: 元数据文件路径
+        config_info: 文档级配置信息（提供商、模型、维度等）
+        records: 每个文本块的记录，只保存其中的 metadata
+        vectors: 形状为 (len(records), dim) 的向量矩阵
+
+    返回:
+        元数据文件路径
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or vectors.shape[0] != len(records):
+        raise ValueError(f"向量矩阵形状 {vectors.shape} 与记录数 {len(records)} 不匹配")
+
+    vector_path = get_vector_path(json_path)
+    # 先写临时文件再替换，避免读取到写了一半的矩阵
+    tmp_vector_path = vector_path + ".tmp"
+    with open(tmp_vector_path, "wb") as f:
+        np.save(f, vectors)
+    os.replace(tmp_vector_path, vector_path)
+
+    header = {
+        **config_info,
+        "storage_format": STORAGE_FORMAT,
+        "vector_file": os.path.basename(vector_path),
+        "vector_dtype": "float32"
+    }
+    # 每条记录单独一行，同时记录每行的起始字节偏移；最后一个偏移指向结尾的 "]}"
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    with open(json_path, "wb") as f:
+        head = json.dumps(header, ensure_ascii=False)[:-1] + ', "embeddings": [\n'
+        position = f.write(head.encode("utf-8"))
+        for i, record in enumerate(records):
+            offsets[i] = position
+            line = json.dumps({"metadata": record["metadata"]}, ensure_ascii=False)
+            position += f.write((line + (",\n" if i < len(records) - 1 else "\n")).encode("utf-8"))
+        offsets[len(records)] = position
+        f.write(b"]}\n")
+
+    offsets_path = get_offsets_path(json_path)
+    with open(offsets_path + ".tmp", "wb") as f:
+        np.save(f, offsets)
+    os.replace(offsets_path + ".tmp", offsets_path)
+
+    return json_path
+
+
+def load_embedding_file(json_path: str, mmap: bool = True) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    读取嵌入文件
+
+    参数:
+        json_path: 元数据文件路径
+        mmap: 是否以内存映射方式打开向量矩阵
+
+    返回:
+        (元数据字典, 向量矩阵) 元组；旧版 JSON 文件中的向量会被转换为 float32 矩阵
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    embeddings = data.get("embeddings") or []
+    if data.get("vector_file"):
+        vector_path = os.path.join(os.path.dirname(json_path), data["vector_file"])
+        if not os.path.exists(vector_path):
+            raise ValueError(f"向量文件不存在: {vector_path}")
+        vectors = np.load(vector_path, mmap_mode="r" if mmap else None)
+    else:
+        # 旧版格式：向量内嵌在 JSON 中，转换后释放原始列表
+        vectors = np.asarray([emb.get("embedding", []) for emb in embeddings], dtype=np.float32)
+        for emb in embeddings:
+            emb.pop("embedding", None)
+
+    if embeddings and (vectors.ndim != 2 or vectors.shape[0] != len(embeddings)):
+        raise ValueError(f"向量矩阵形状 {vectors.shape} 与 embeddings 数量 {len(embeddings)} 不匹配")
+
+    return data, vectors
+
+
+def delete_embedding_file(json_path: str) -> None:
+    """删除嵌入元数据文件及其向量矩阵、偏移索引"""
+    for path in (get_vector_path(json_path), get_offsets_path(json_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(json_path)
+
+
+def read_embedding_range(json_path: str, start: int, stop: int) -> Tuple[Dict[str, Any], int, List[Dict[str, Any]], np.ndarray]:
+    """
+    读取嵌入文件中 [start, stop) 范围的记录和向量
+
+    有偏移索引的文件只读取第一行（文档级配置）和该范围的记录行；
+    没有索引的旧文件整体解析后切片。
+
+    参数:
+        json_path: 元数据文件路径
+        start: 起始下标
+        stop: 结束下标（不含）
+
+    返回:
+        (文档级配置, 记录总数, 记录列表, 向量切片) 元组，向量为内存映射切片
+    """
+    offsets_path = get_offsets_path(json_path)
+    if not os.path.exists(offsets_path):
+        data, vectors = load_embedding_file(json_path)
+        embeddings = data.pop("embeddings", None) or []
+        return data, len(embeddings), embeddings[start:stop], vectors[start:stop]
+
+    offsets = np.load(offsets_path, mmap_mode="r")
+    total = len(offsets) - 1
+    start, stop = max(0, min(start, total)), max(0, min(stop, total))
+    stop = max(start, stop)
+    with open(json_path, "rb") as f:
+        header = json.loads(f.readline().decode("utf-8").rstrip() + "]}")
+        header.pop("embeddings", None)
+        f.seek(int(offsets[start]))
+        body = f.read(int(offsets[stop]) - int(offsets[start])).decode("utf-8").rstrip().rstrip(",")
+    records = json.loads(f"[{body}]")
+    vectors = np.load(os.path.join(os.path.dirname(json_path), header["vector_file"]), mmap_mode="r")
+    return header, total, records, vectors[start:stop]
+
+
+def iter_vector_batches(vectors: np.ndarray, batch_size: int) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    按批次切分向量矩阵
+
+    参数:
+        vectors: 向量矩阵（可以是内存映射）
+        batch_size: 每批行数
+
+    返回:
+        (起始行, 结束行, 向量切片) 的迭代器
+    """
+    total = vectors.shape[0]
+    for start in range(0, total, batch_size):
+        end = min(start + batch_size, total)
+        yield start, end, vectors[start:end]
+
+
+def read_embedding_header(json_path: str) -> Dict[str, Any]:
+    """
+    读取嵌入文件的文档级字段（不解析 embeddings 数组）
+
+    参数:
+        json_path: 元数据文件路径
+
+    返回:
+        顶层字段字典，另含 total_vectors（向量总数，旧版文件未知时为 None）
+    """
+    if os.path.exists(get_offsets_path(json_path)):
+        header, total, _, _ = read_embedding_range(json_path, 0, 0)
+        header["total_vectors"] = total
+        return header
+
+    if ijson is None:
+        data, vectors = load_embedding_file(json_path)
+        header = {k: v for k, v in data.items() if k != "embeddings"}
+        header["total_vectors"] = int(vectors.shape[0])
+        return header
+
+    header = {}
+    with open(json_path, "rb") as f:
+        key = None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == "" and event == "map_key":
+                # 顶层配置字段都写在 embeddings 之前，读到 embeddings 即可停止
+                if value == "embeddings":
+                    break
+                key = value
+            elif key is not None and prefix == key and event in ("string", "number", "boolean", "null"):
+                header[key] = value
+
+    header["total_vectors"] = None
+    if header.get("vector_file"):
+        vector_path = os.path.join(os.path.dirname(json_path), header["vector_file"])
+        if not os.path.exists(vector_path):
+            raise ValueError(f"向量文件不存在: {vector_path}")
+        header["total_vectors"] = int(np.load(vector_path, mmap_mode="r").shape[0])
+    return header
+
+
+def iter_embedding_batches(json_path: str, batch_size: int) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray]]:
+    """
+    按批次增量读取嵌入记录和向量
+
+    参数:
+        json_path: 元数据文件路径
+        batch_size: 每批记录数
+
+    返回:
+        (记录列表, float32 向量矩阵) 的迭代器，每条记录只包含 metadata
+    """
+    if ijson is None:
+        data, vectors = load_embedding_file(json_path)
+        records = data.get("embeddings") or []
+        for start, end, batch_vectors in iter_vector_batches(vectors, batch_size):
+            yield records[start:end], batch_vectors
+        return
+
+    header = read_embedding_header(json_path)
+    vectors = None
+    if header.get("vector_file"):
+        vectors = np.load(os.path.join(os.path.dirname(json_path), header["vector_file"]), mmap_mode="r")
+
+    with open(json_path, "rb") as f:
+        batch: List[Dict[str, Any]] = []
+        legacy_vectors: List[List[float]] = []
+        offset = 0
+        for item in ijson.items(f, "embeddings.item", use_float=True):
+            if vectors is None:
+                legacy_vectors.append(item.pop("embedding", []))
+            batch.append({"metadata": item.get("metadata", {})})
+            if len(batch) >= batch_size:
+                yield batch, _batch_vectors(vectors, legacy_vectors, offset, len(batch))
+                offset += len(batch)
+                batch, legacy_vectors = [], []
+        if batch:
+            yield batch, _batch_vectors(vectors, legacy_vectors, offset, len(batch))
+
+
+def _batch_vectors(vectors, legacy_vectors: List[List[float]], offset: int, count: int) -> np.ndarray:
+    """取出当前批次的向量：新格式从矩阵切片，旧格式把内嵌列表转换为 float32 矩阵"""
+    if vectors is not None:
+        if offset + count > vectors.shape[0]:
+            raise ValueError(f"向量矩阵行数 {vectors.shape[0]} 少于 embeddings 数量")
+        return vectors[offset:offset + count]
+    return np.asarray(legacy_vectors, dtype=np.float32)
+
+
+def encode_vectors(vectors: np.ndarray, encoding: str) -> List[Any]:
+    """
+    按指定编码转换向量矩阵的每一行，用于接口返回
+
+    base64 编码为逐行的小端字节序列，1024 维 float16 向量约 2.7KB，
+    而 JSON 浮点数组约 20KB。
+
+    参数:
+        vectors: 向量矩阵（可以是内存映射切片）
+        encoding: VECTOR_ENCODINGS 中除 none 以外的编码
+
+    返回:
+        每行一个元素的列表：json 为浮点数列表，base64_* 为字符串
+    """
+    if encoding == "json":
+        return np.asarray(vectors, dtype=np.float32).tolist()
+    if encoding in ("base64_float16", "base64_float32"):
+        rows = np.ascontiguousarray(vectors, dtype="<f2" if encoding == "base64_float16" else "<f4")
+        return [base64.b64encode(row.tobytes()).decode("ascii") for row in rows]
+    raise ValueError(f"Unsupported vector encoding: {encoding}")
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+"""
+进程内有界 LRU 缓存
+
+条目数超过上限时淘汰最久未使用的条目，条目超过 TTL 后视为过期。
+可选地把未过期的条目保存到 JSON 文件，重启后重新加载；
+持久化时键必须是由字符串/数字组成的元组，值必须可 JSON 序列化。
+"""
+
+
+class TTLLRUCache:
+    """
+    带过期时间的线程安全 LRU 缓存
+    """
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        """
+        初始化缓存
+
+        参数:
+            max_entries: 最大条目数
+            ttl_seconds: 条目有效期（秒），None 表示不过期
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """
+        读取缓存
+
+        参数:
+            key: 缓存键
+
+        返回:
+            缓存值，未命中或已过期时返回 None
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        写入缓存，超过容量时淘汰最久未使用的条目
+
+        参数:
+            key: 缓存键
+            value: 缓存值
+        """
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def save(self, path: str) -> None:
+        """
+        将未过期的条目按 LRU 顺序保存到 JSON 文件
+
+        参数:
+            path: 保存路径
+        """
+        now = time.time()
+        with self._lock:
+            items = [
+                [list(key) if isinstance(key, tuple) else key, value, expires_at]
+                for key, (value, expires_at) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        从 JSON 文件加载条目，已过期的条目会被跳过
+
+        参数:
+            path: 文件路径
+
+        返回:
+            加载的条目数
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, value, expires_at in items:
+                if expires_at is not None and expires_at <= now:
+                    continue
+                self._data[tuple(key) if isinstance(key, list) else key] = (value, expires_at)
+                loaded += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return loaded
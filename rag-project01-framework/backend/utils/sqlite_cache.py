@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+"""
+基于 SQLite 的持久化 LRU 缓存
+
+键为字符串，值为二进制数据。每次命中都会刷新访问时间，
+写入后若总大小超过上限，则按最近最少使用顺序淘汰条目。
+"""
+
+
+class SQLiteLRUCache:
+    """
+    持久化的键值缓存，按总字节数做 LRU 淘汰，可在多线程间共享
+    """
+    def __init__(self, path: str, max_bytes: int):
+        """
+        初始化缓存
+
+        参数:
+            path: SQLite 数据库文件路径
+            max_bytes: 缓存值的总字节数上限
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        批量读取缓存并刷新命中条目的访问时间
+
+        参数:
+            keys: 键列表
+
+        返回:
+            命中的 {键: 值} 字典
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # SQLite 单条语句的参数个数有限，分段查询
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", part
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str):
+        """读取单个键，未命中返回 None"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        """
+        批量写入缓存，写入后按需淘汰
+
+        参数:
+            items: (键, 值) 列表
+        """
+        items = list(dict(items).items())
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            keys = [key for key, _ in items]
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                self._total_bytes -= self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM entries WHERE key IN ({placeholders})", part
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                [(key, sqlite3.Binary(value), len(value), now) for key, value in items]
+            )
+            self._total_bytes += sum(len(value) for _, value in items)
+            self._evict()
+            self._conn.commit()
+
+    def put(self, key: str, value: bytes) -> None:
+        """写入单个键"""
+        self.put_many([(key, value)])
+
+    def _evict(self) -> None:
+        """总大小超过上限时，淘汰最久未访问的条目直到低于上限的 90%"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 500"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            evicted: List[str] = []
+            for key, size in rows:
+                evicted.append(key)
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+
+    def stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        返回:
+            包含条目数、总字节数、命中/未命中次数和命中率的字典
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
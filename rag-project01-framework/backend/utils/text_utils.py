@@ -0,0 +1,79 @@
+import re
+import unicodedata
+from typing import List
+
+"""
+文本处理工具
+
+词法检索使用的分词规则：
+    - 文本先做 Unicode NFKC 归一化并转为小写
+    - 英文、数字组成的词按整体保留，型号、错误码等带 - _ . / 连接的标识符
+      （如 rt-ax88u、0x80070005）同时保留整体和各个组成部分
+    - 中日韩文字没有空格分隔，按相邻两字（bigram）切分，单字片段保留单字
+
+词数统计（count_words）：每个中日韩文字计为一个词，其余按空白分隔、至少包含一个字母或数字的片段计为一个词
+"""
+
+CJK_RANGES = (
+    "\u3040-\u30ff"   # 日文平假名、片假名
+    "\u3400-\u4dbf"   # CJK 扩展A
+    "\u4e00-\u9fff"   # CJK 统一表意文字
+    "\uac00-\ud7af"   # 韩文音节
+    "\uf900-\ufaff"   # CJK 兼容表意文字
+)
+
+_TOKEN_PATTERN = re.compile(
+    rf"(?P<word>[0-9a-z]+(?:[-_./][0-9a-z]+)*)|(?P<cjk>[{CJK_RANGES}]+)"
+)
+_IDENTIFIER_SEPARATORS = re.compile(r"[-_./]")
+_WORD_COUNT_PATTERN = re.compile(
+    rf"[{CJK_RANGES}]|[^\s{CJK_RANGES}]*[^\W{CJK_RANGES}][^\s{CJK_RANGES}]*"
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为词法检索使用的词项
+
+    参数:
+        text: 原始文本
+
+    返回:
+        词项列表（保留重复，用于统计词频）
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        word = match.group("word")
+        if word is not None:
+            tokens.append(word)
+            parts = _IDENTIFIER_SEPARATORS.split(word)
+            if len(parts) > 1:
+                tokens.extend(part for part in parts if part)
+            continue
+        cjk = match.group("cjk")
+        if len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def count_words(text: str) -> int:
+    """
+    统计文本词数，中日韩文字按字计数
+
+    text.split() 会把没有空格的整段中文计为一个词，这里改为每个汉字计为一个词，
+    英文等仍按空白分隔计数（单独的标点不计数）。
+
+    参数:
+        text: 原始文本
+
+    返回:
+        词数
+    """
+    if not text:
+        return 0
+    return sum(1 for _ in _WORD_COUNT_PATTERN.finditer(text))
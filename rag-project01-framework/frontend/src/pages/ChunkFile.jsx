@@ -19,16 +19,41 @@ const ChunkFile = () => {
     min_merge_size: 50
   });
   const [chunkSize, setChunkSize] = useState(1000);
+  // by_tokens 按将要使用的嵌入模型分词；块大小留空时取模型最大输入长度
+  const [embeddingProvider, setEmbeddingProvider] = useState('openai');
+  const [embeddingModel, setEmbeddingModel] = useState('text-embedding-3-large');
+  const [tokenChunkSize, setTokenChunkSize] = useState('');
   const [chunks, setChunks] = useState(null);
   const [status, setStatus] = useState('');
   const [activeTab, setActiveTab] = useState('chunks');
   const [processingStatus, setProcessingStatus] = useState('');
   const [chunkedDocuments, setChunkedDocuments] = useState([]);
 
+  const modelOptions = {
+    openai: [
+      { value: 'text-embedding-3-large', label: 'text-embedding-3-large' },
+      { value: 'text-embedding-3-small', label: 'text-embedding-3-small' }
+    ],
+    bedrock: [
+      { value: 'cohere.embed-english-v3', label: 'cohere.embed-english-v3' },
+      { value: 'cohere.embed-multilingual-v3', label: 'cohere.embed-multilingual-v3' }
+    ],
+    huggingface: [
+      { value: 'sentence-transformers/all-mpnet-base-v2', label: 'all-mpnet-base-v2' },
+      { value: 'all-MiniLM-L6-v2', label: 'all-MiniLM-L6-v2' },
+      { value: 'google-bert/bert-base-uncased', label: 'bert-base-uncased' },
+      { value: 'BAAI/bge-base-zh-v1.5', label: 'bge-base-zh-v1.5' }
+    ]
+  };
+
   useEffect(() => {
     fetchLoadedDocuments();
   }, []);
 
+  useEffect(() => {
+    setEmbeddingModel(modelOptions[embeddingProvider][0].value);
+  }, [embeddingProvider]);
+
   const fetchLoadedDocuments = async () => {
     try {
       const response = await fetch(`${apiBaseUrl}/documents?type=loaded`);
@@ -91,6 +116,7 @@ const ChunkFile = () => {
 
     try {
       const docId = selectedDoc.endsWith('.json') ? selectedDoc : `${selectedDoc}.json`;
+      const isTokens = chunkingOption === 'by_tokens';
       
       const response = await fetch(`${apiBaseUrl}/chunk`, {
         method: 'POST',
@@ -102,8 +128,14 @@ const ChunkFile = () => {
           chunking_method: chunkingOption,
           chunking_params: {
             ...chunkingParams,
-            chunk_size: parseInt(chunkingParams.chunk_size),
+            chunk_size: isTokens
+              ? (tokenChunkSize ? parseInt(tokenChunkSize) : undefined)
+              : parseInt(chunkingParams.chunk_size),
             chunk_overlap: parseInt(chunkingParams.chunk_overlap),
+            ...(isTokens && {
+              embedding_provider: embeddingProvider,
+              embedding_model: embeddingModel
+            }),
             min_chunk_size: parseInt(chunkingParams.min_chunk_size),
             max_chunk_size: parseInt(chunkingParams.max_chunk_size),
             min_merge_size: parseInt(chunkingParams.min_merge_size)
@@ -321,6 +353,7 @@ const ChunkFile = () => {
               >
                 <option value="by_chars">By Characters</option>
                 <option value="by_words">By Words</option>
+                <option value="by_tokens">By Tokens (Embedding Model)</option>
                 <option value="by_sentences">By Sentences</option>
                 <option value="by_paragraphs">By Paragraphs</option>
                 <option value="by_markdown">By Markdown</option>
@@ -331,20 +364,61 @@ const ChunkFile = () => {
             <div className="mb-4">
               <label className="block text-sm font-medium mb-1 text-gray-700">Chunking Parameters</label>
               <div className="space-y-3">
-                <div>
-                  <label className="block text-sm text-gray-700 mb-1">Chunk Size</label>
-                  <input
-                    type="number"
-                    value={chunkingParams.chunk_size}
-                    onChange={(e) => setChunkingParams({
-                      ...chunkingParams,
-                      chunk_size: parseInt(e.target.value)
-                    })}
-                    className="block w-full p-2 border rounded text-gray-700 bg-white"
-                    min="100"
-                    max="5000"
-                  />
-                </div>
+                {chunkingOption === 'by_tokens' ? (
+                  <>
+                    <div>
+                      <label className="block text-sm text-gray-700 mb-1">Embedding Provider</label>
+                      <select
+                        value={embeddingProvider}
+                        onChange={(e) => setEmbeddingProvider(e.target.value)}
+                        className="block w-full p-2 border rounded text-gray-700 bg-white"
+                      >
+                        <option value="openai">OpenAI</option>
+                        <option value="bedrock">Bedrock</option>
+                        <option value="huggingface">HuggingFace</option>
+                      </select>
+                    </div>
+                    <div>
+                      <label className="block text-sm text-gray-700 mb-1">Embedding Model</label>
+                      <select
+                        value={embeddingModel}
+                        onChange={(e) => setEmbeddingModel(e.target.value)}
+                        className="block w-full p-2 border rounded text-gray-700 bg-white"
+                      >
+                        {modelOptions[embeddingProvider].map(model => (
+                          <option key={model.value} value={model.value}>
+                            {model.label}
+                          </option>
+                        ))}
+                      </select>
+                    </div>
+                    <div>
+                      <label className="block text-sm text-gray-700 mb-1">Chunk Size (tokens, empty = model max)</label>
+                      <input
+                        type="number"
+                        value={tokenChunkSize}
+                        onChange={(e) => setTokenChunkSize(e.target.value)}
+                        className="block w-full p-2 border rounded text-gray-700 bg-white"
+                        min="1"
+                      />
+                    </div>
+                  </>
+                ) : (
+                  <div>
+                    <label className="block text-sm text-gray-700 mb-1">Chunk Size</label>
+                    <input
+                      type="number"
+                      value={chunkingParams.chunk_size}
+                      onChange={(e) => setChunkingParams({
+                        ...chunkingParams,
+                        chunk_size: parseInt(e.target.value)
+                      })}
+                      className="block w-full p-2 border rounded text-gray-700 bg-white"
+                      min="100"
+                      max="5000"
+                    />
+                  </div>
+                )}
 
                 <div>
                   <label className="block text-sm text-gray-700 mb-1">Chunk Overlap</label>
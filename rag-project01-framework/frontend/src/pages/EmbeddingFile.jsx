@@ -11,6 +11,8 @@ const EmbeddingFile = () => {
   const [availableDocs, setAvailableDocs] = useState([]);
   const [embeddedDocs, setEmbeddedDocs] = useState([]);
   const [embeddings, setEmbeddings] = useState(null);
+  const [embeddingsTotal, setEmbeddingsTotal] = useState(0);
+  const [embeddingsSource, setEmbeddingsSource] = useState('');
   const [activeTab, setActiveTab] = useState('preview'); // 'preview' 或 'documents'
   const [sortBy, setSortBy] = useState('name'); // 'name' 或 'time'
 
@@ -156,6 +158,8 @@ const EmbeddingFile = () => {
       
       const data = await response.json();
       setEmbeddings(data.embeddings);
+      setEmbeddingsTotal(data.total);
+      setEmbeddingsSource(data.filepath.split(/[\\/]/).pop());
       setStatus(`Embedding completed successfully! Saved to: ${data.filepath}`);
       fetchEmbeddedDocs(); // 刷新嵌入文档列表
     } catch (error) {
@@ -194,6 +198,8 @@ const EmbeddingFile = () => {
       }
       const data = await response.json();
       setEmbeddings(data.embeddings);
+      setEmbeddingsTotal(data.total);
+      setEmbeddingsSource(docName);
       setActiveTab('preview');
       setStatus('');
     } catch (error) {
@@ -202,6 +208,23 @@ const EmbeddingFile = () => {
     }
   };
 
+  const handleLoadMoreEmbeddings = async () => {
+    try {
+      const response = await fetch(
+        `${apiBaseUrl}/embedded-docs/${embeddingsSource}?offset=${embeddings.length}`
+      );
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      const data = await response.json();
+      setEmbeddings([...embeddings, ...data.embeddings]);
+      setEmbeddingsTotal(data.total);
+    } catch (error) {
+      console.error('Error loading more embeddings:', error);
+      setStatus(`Error loading more embeddings: ${error.message}`);
+    }
+  };
+
   const renderRightPanel = () => {
     return (
       <div className="p-4">
@@ -266,6 +289,14 @@ const EmbeddingFile = () => {
                     </div>
                   </div>
                 ))}
+                {embeddings.length < embeddingsTotal && (
+                  <button
+                    onClick={handleLoadMoreEmbeddings}
+                    className="w-full px-4 py-2 border rounded text-blue-600 hover:bg-gray-50"
+                  >
+                    Load more ({embeddings.length} of {embeddingsTotal})
+                  </button>
+                )}
               </div>
             </div>
           ) : (
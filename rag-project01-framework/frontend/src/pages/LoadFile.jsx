@@ -296,6 +296,7 @@ const LoadFile = () => {
               <option value="pypdf" className="text-gray-700 bg-white">PyPDF</option>
               <option value="unstructured" className="text-gray-700 bg-white">Unstructured</option>
               <option value="pdf2image" className="text-gray-700 bg-white">PDF2Image (OCR)</option>
+              <option value="auto" className="text-gray-700 bg-white">Auto (Text Layer + OCR)</option>
               <option value="tabula" className="text-gray-700 bg-white">Tabula (Tables)</option>
             </select>
           </div>